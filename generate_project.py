@@ -3,21 +3,89 @@
 LumaTalk Project Generator
 Generates all remaining boilerplate files for the Flutter app, backend, and inference workers.
 Run this script from the project root: python generate_project.py
+
+Files whose content is unchanged are left untouched (mtime included), so
+regenerating does not invalidate build_runner, Maven or Docker layer caches.
+Changed files are replaced atomically. Use --dry-run to see a diff of what
+would change (new files are shown in full), --force to rewrite every file.
 """
 
 import os
 import sys
+import difflib
+import hashlib
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).parent
 
+# Set from the command line in main()
+DRY_RUN = False
+FORCE = False
+# Process umask, read once in main() before any writer thread starts
+UMASK = 0o022
+
+# Each section runs on its own thread and reports into its own buffer
+_section = threading.local()
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def _write_atomic(file_path: Path, data: bytes):
+    """Write via a temp file in the same directory and rename it over the target."""
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=file_path.parent, prefix=f'.{file_path.name}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if file_path.exists():
+            os.chmod(tmp_path, file_path.stat().st_mode & 0o7777)
+        else:
+            os.chmod(tmp_path, 0o666 & ~UMASK)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def _report(status: str, message: str):
+    _section.counts[status] += 1
+    if message:
+        _section.lines.append(message)
+
 def create_file(path: str, content: str):
-    """Create a file with the given content, creating directories as needed."""
+    """Create a file with the given content, creating directories as needed.
+
+    Skips the write when the file on disk already has exactly this content.
+    """
     file_path = PROJECT_ROOT / path
-    file_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(content)
-    print(f"Created {path}")
+    data = content.encode('utf-8')
+    existing = file_path.read_bytes() if file_path.exists() else None
+    if existing is not None and not FORCE and _digest(existing) == _digest(data):
+        _report('unchanged', '')
+        return
+    status = 'created' if existing is None else 'changed'
+    if DRY_RUN:
+        _report(status, f"Would {'create' if existing is None else 'update'} {path}")
+        old_lines = existing.decode('utf-8', errors='replace').splitlines(keepends=True) if existing else []
+        diff = difflib.unified_diff(old_lines, content.splitlines(keepends=True),
+                                    fromfile=f'a/{path}' if existing is not None else '/dev/null',
+                                    tofile=f'b/{path}')
+        _section.lines.append(''.join(diff).rstrip('\n'))
+        return
+    _write_atomic(file_path, data)
+    _report(status, f"{'Created' if existing is None else 'Updated'} {path}")
+
+def run_section(generators):
+    """Run one section's generators in order; returns its output lines and counts."""
+    _section.lines = []
+    _section.counts = Counter()
+    for generate in generators:
+        generate()
+    return _section.lines, _section.counts
 
 def generate_flutter_models():
     """Generate Flutter data models."""
@@ -569,58 +637,259 @@ numpy==1.24.3
 python-multipart==0.0.6
 pydantic==2.5.0
 websockets==12.0
+onnxruntime==1.16.3
 ''')
 
-    create_file('inference/asr_worker/main.py', '''import asyncio
+    create_file('inference/asr_worker/main.py', '''import os
+import sys
+import json
+import time
+import asyncio
 import logging
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from asr_service import ASRService
-from vad_processor import VADProcessor
+from functools import partial
+from pathlib import Path
+from typing import Optional
+from fastapi import FastAPI, File, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.capacity import AdmissionController, load_router
+from common.capture import CaptureStore
+from common.engines import Engines, readiness_router
+from common.instrumentation import (ACTIVE_CONNECTIONS, CLIENT_WAIT_SECONDS, QUEUE_DEPTH, metrics_router,
+                                    new_trace_id, stage)
+from common.profiling import debug_router
+from common.server import process_info
+from common.quality import QualityController, apply_to_engine
+from language_id import LanguageDetector, LanguageLock
+from bulk import BulkTranscriber
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Stream audio is 16 kHz mono PCM16
+BYTES_PER_MS = 32
+
+# Heavy modules (torch, faster-whisper, silero) are imported by the loaders in the
+# background, so the server binds and answers /health before any model is loaded
+
+def load_asr_service():
+    from asr_service import ASRService
+    return ASRService()
+
+def load_vad_processor():
+    # VAD_BACKEND=onnx runs Silero on onnxruntime and never imports torch
+    if os.getenv("VAD_BACKEND", "torch").lower() == "onnx":
+        from onnx_vad import OnnxVADProcessor
+        return OnnxVADProcessor()
+    from vad_processor import VADProcessor
+    return VADProcessor()
+
+engines = Engines()
+asr_engine = engines.add("asr", load_asr_service)
+vad_engine = engines.add("vad", load_vad_processor)
+
 app = FastAPI(title="LumaTalk ASR Worker")
-asr_service = ASRService()
-vad_processor = VADProcessor()
+app.include_router(metrics_router)
+app.include_router(debug_router)
+app.include_router(readiness_router(engines, "asr_worker"))
+
+# Turn new streams away (with a retry hint) once ASR_MAX_STREAMS or the decode latency budget is hit
+admission = AdmissionController.from_env("ASR", "/ws/asr", latency_stage="asr_decode")
+app.include_router(load_router("asr_worker", [admission]))
+
+# Under load, step down to fewer partials, a smaller beam and finally a smaller model tier
+QUALITY_LEVELS = [
+    {"name": "full", "partial_interval_ms": 0, "beam_size": 5},
+    {"name": "fewer_partials", "partial_interval_ms": 300, "beam_size": 5},
+    {"name": "small_beam", "partial_interval_ms": 300, "beam_size": 2},
+    {"name": "greedy", "partial_interval_ms": 600, "beam_size": 1},
+    {"name": "small_model", "partial_interval_ms": 600, "beam_size": 1, "model_tier": "small"},
+]
+quality = QualityController.from_env("ASR", "asr_worker", QUALITY_LEVELS, "asr_decode", default_budget_ms=300)
+if quality:
+    quality.add_listener(apply_to_engine(asr_engine))
+
+# Uploaded recordings; paused whenever live streams are at capacity or running degraded
+bulk = BulkTranscriber(
+    asr_engine, vad_engine, load_vad_processor,
+    should_yield=lambda: admission.remaining() == 0 or bool(quality and quality.index),
+)
+QUEUE_DEPTH.labels("asr_bulk_jobs").set_function(lambda: bulk.queue.qsize())
+# Queued jobs hold their upload until it is decoded, so uploads are capped
+BULK_MAX_UPLOAD_BYTES = int(float(os.getenv("ASR_BULK_MAX_UPLOAD_MB", "100")) * 1024 * 1024)
+UPLOAD_READ_BYTES = 1024 * 1024
+# Jobs live in the process that accepted them; with WORKER_PROCESSES>1 a poll could land elsewhere
+BULK_POLLING = process_info()["processes"] == 1
+
+# Opt-in (ASR_CAPTURE_DIR): record received frames and their arrival times for replay
+capture_store = CaptureStore.from_env()
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Initializing ASR service...")
-    await asr_service.initialize()
-    logger.info("ASR service ready")
+    logger.info("Loading ASR engines in the background...")
+    engines.start()
+    bulk.start()
+    if quality:
+        quality.start()
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "asr_worker"}
 
+async def read_upload(file: UploadFile) -> bytes:
+    """The upload's bytes; 413 once it passes ASR_BULK_MAX_UPLOAD_MB."""
+    data = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_READ_BYTES)
+        if not chunk:
+            return bytes(data)
+        data += chunk
+        if len(data) > BULK_MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413,
+                                detail=f"Upload exceeds {BULK_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+
+@app.post("/transcribe")
+async def transcribe_file(file: UploadFile = File(...), language: Optional[str] = None,
+                          wait: bool = False, stream: bool = False):
+    """Queue a recorded session for offline transcription.
+
+    Returns 202 with a job id to poll at GET /transcribe/{job_id}; `wait=true`
+    returns the finished transcript, `stream=true` streams NDJSON segments as
+    they are decoded. With several server processes a request without either
+    is answered as `wait=true`, since the poll could reach another process.
+    """
+    if not engines.ready:
+        raise HTTPException(status_code=503, detail="ASR engines are still loading", headers={"Retry-After": "5"})
+    if bulk.queue.full():
+        raise HTTPException(status_code=429, detail="Bulk transcription queue is full",
+                            headers={"Retry-After": "30"})
+    audio = await read_upload(file)
+    try:
+        job = bulk.submit(audio, language)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=429, detail="Bulk transcription queue is full",
+                            headers={"Retry-After": "30"})
+    if stream:
+        async def ndjson():
+            async for record in job.stream():
+                yield json.dumps(record) + "\\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    if wait or not BULK_POLLING:
+        await job.done.wait()
+        return job.to_dict()
+    return JSONResponse(job.to_dict(), status_code=202)
+
+@app.get("/transcribe/{job_id}")
+async def transcription_job(job_id: str):
+    job = bulk.jobs.get(job_id)
+    if job is None:
+        detail = "Unknown job" if BULK_POLLING else "Unknown job (jobs are not shared between server processes)"
+        raise HTTPException(status_code=404, detail=detail)
+    return job.to_dict()
+
 @app.websocket("/ws/asr")
 async def websocket_asr(websocket: WebSocket):
+    """Binary PCM16 frames in, JSON results out.
+
+    Each result carries `audio_end_ms`, the stream position (ms of audio
+    received) at the end of the frame it was decoded from.
+
+    `?language=xx` decodes in a fixed language; `?language=auto` detects it
+    from the first seconds of speech, locks it, and tags results with it.
+    """
     await websocket.accept()
+    if not engines.ready:
+        # 1013 Try Again Later: the client should retry once /ready reports ready
+        await websocket.close(code=1013)
+        return
+    if not admission.try_admit():
+        await admission.reject(websocket)
+        return
     logger.info("Client connected to ASR WebSocket")
+    # One trace id per utterance, rotated after every final result
+    trace_id = new_trace_id()
+    last_partial = 0.0
+    received_ms = 0.0
+    capture = None
 
+    # Everything after admission runs inside the try, so the slot is always released
     try:
-        while True:
-            # Receive audio data
-            audio_data = await websocket.receive_bytes()
-
-            # Check VAD
-            has_speech = vad_processor.process(audio_data)
-
-            if has_speech:
-                # Process with ASR
-                async for result in asr_service.transcribe_streaming(audio_data):
-                    await websocket.send_json(result)
+        asr_service = asr_engine.get()
+        vad_processor = vad_engine.get()
+        # Backends with recurrent state hand out one stream per connection
+        if hasattr(vad_processor, "new_stream"):
+            vad_processor = vad_processor.new_stream()
+        language = websocket.query_params.get("language")
+        language_lock = None
+        if language and not LanguageDetector.accepts_hint(asr_service):
+            logger.warning(f"ASR service takes no language hint; ignoring language={language}")
+            language = None
+        if language == "auto":
+            language = None
+            if LanguageDetector.supports(asr_service):
+                language_lock = LanguageLock(LanguageDetector(asr_service))
+            else:
+                logger.warning("ASR service cannot detect languages; decoding without a language hint")
+        if capture_store:
+            # Rotation and log creation touch the disk; keep them off the event loop
+            capture = await asyncio.get_running_loop().run_in_executor(
+                None, partial(capture_store.open, language=websocket.query_params.get("language")))
+
+        with ACTIVE_CONNECTIONS.labels("/ws/asr").track():
+            while True:
+                # Receive audio data (time spent waiting on the client for the next frame)
+                with CLIENT_WAIT_SECONDS.labels("/ws/asr").time():
+                    audio_data = await websocket.receive_bytes()
+                received_ms += len(audio_data) / BYTES_PER_MS
+                if capture:
+                    capture.append(audio_data)
+
+                # Check VAD
+                with stage("asr_vad").time():
+                    has_speech = vad_processor.process(audio_data)
+
+                if has_speech:
+                    if language_lock:
+                        language = await language_lock.observe(audio_data)
+                    options = {"language": language} if language else {}
+
+                    # Process with ASR
+                    started = time.perf_counter()
+                    async for result in asr_service.transcribe_streaming(audio_data, **options):
+                        now = time.perf_counter()
+                        stage("asr_decode").observe(now - started)
+                        if quality and result.get("type") == "asr_partial":
+                            # Degraded levels thin out partials; finals always go through
+                            if now - last_partial < quality.level.get("partial_interval_ms", 0) / 1000:
+                                started = now
+                                continue
+                            last_partial = now
+                        result["trace_id"] = trace_id
+                        result["audio_end_ms"] = round(received_ms)
+                        if language_lock:
+                            language_lock.annotate(result)
+                        with stage("asr_send").time():
+                            await websocket.send_json(result)
+                        if result.get("type") == "asr_final":
+                            trace_id = new_trace_id()
+                            if language_lock:
+                                language_lock.check(result.get("confidence"))
+                        started = time.perf_counter()
 
     except WebSocketDisconnect:
         logger.info("Client disconnected from ASR WebSocket")
     except Exception as e:
         logger.error(f"Error in ASR WebSocket: {e}")
         await websocket.close(code=1011)
+    finally:
+        admission.release()
+        if capture:
+            await asyncio.get_running_loop().run_in_executor(None, capture.close)
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    from common.server import serve
+    serve(app, "main:app", port=8001, app_dir=str(Path(__file__).resolve().parent))
 ''')
 
     # MT Worker
@@ -635,33 +904,79 @@ python-dotenv==1.0.0
 ''')
 
     create_file('inference/mt_worker/main.py', '''import os
+import sys
+import asyncio
 import logging
+import time
+from pathlib import Path
+from typing import Optional
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from translation_service import TranslationService
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.capacity import AdmissionController, load_router
+from common.engines import Engines, readiness_router
+from common.instrumentation import QUEUE_DEPTH, metrics_router, new_trace_id, stage
+from common.profiling import debug_router
+from common.quality import QualityController, apply_to_engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# transformers/torch and the cloud SDKs are imported in the background
+def load_translation_service():
+    from translation_service import TranslationService
+    return TranslationService()
+
+engines = Engines()
+translation_engine = engines.add("translation", load_translation_service)
+
 app = FastAPI(title="LumaTalk MT Worker")
-translation_service = TranslationService()
+app.include_router(metrics_router)
+app.include_router(debug_router)
+app.include_router(readiness_router(engines, "mt_worker"))
+
+# Bound concurrent model/API calls; excess requests queue here instead of piling onto the backend
+MAX_CONCURRENCY = int(os.getenv("MT_MAX_CONCURRENCY", "32"))
+translate_slots = asyncio.Semaphore(MAX_CONCURRENCY)
+queued_requests = 0
+QUEUE_DEPTH.labels("mt_translate").set_function(lambda: queued_requests)
+
+# Reported on /load only; HTTP requests queue on the semaphore rather than being rejected
+capacity = AdmissionController("/translate", max_streams=MAX_CONCURRENCY, latency_stage="mt_translate",
+                               latency_budget_ms=float(os.getenv("MT_LATENCY_BUDGET_MS", "0")))
+app.include_router(load_router("mt_worker", [capacity]))
+
+# Under load, step down from beam search to greedy decoding
+QUALITY_LEVELS = [
+    {"name": "full", "num_beams": 4},
+    {"name": "reduced_beam", "num_beams": 2},
+    {"name": "greedy", "num_beams": 1},
+]
+quality = QualityController.from_env("MT", "mt_worker", QUALITY_LEVELS, "mt_translate", default_budget_ms=400,
+                                     queue_depth=lambda: queued_requests, max_queue=MAX_CONCURRENCY)
+if quality:
+    quality.add_listener(apply_to_engine(translation_engine))
 
 class TranslationRequest(BaseModel):
     text: str
     source_lang: str
     target_lang: str
+    trace_id: Optional[str] = None
 
 class TranslationResponse(BaseModel):
     translated_text: str
     source_lang: str
     target_lang: str
     confidence: float
+    trace_id: Optional[str] = None
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Initializing translation service...")
-    await translation_service.initialize()
-    logger.info("Translation service ready")
+    logger.info("Loading translation service in the background...")
+    engines.start()
+    if quality:
+        quality.start()
 
 @app.get("/health")
 async def health_check():
@@ -669,20 +984,44 @@ async def health_check():
 
 @app.post("/translate", response_model=TranslationResponse)
 async def translate(request: TranslationRequest):
+    global queued_requests
+    if not translation_engine.ready:
+        raise HTTPException(status_code=503, detail="Translation service is still loading",
+                            headers={"Retry-After": "5"})
+    translation_service = translation_engine.get()
+    trace_id = request.trace_id or new_trace_id()
+    capacity.acquire()
     try:
-        result = await translation_service.translate(
-            text=request.text,
-            source_lang=request.source_lang,
-            target_lang=request.target_lang
-        )
-        return result
+        queued_requests += 1
+        try:
+            with stage("mt_queue").time():
+                await translate_slots.acquire()
+        finally:
+            queued_requests -= 1
+
+        try:
+            started = time.perf_counter()
+            result = await translation_service.translate(
+                text=request.text,
+                source_lang=request.source_lang,
+                target_lang=request.target_lang
+            )
+            elapsed = time.perf_counter() - started
+            stage("mt_translate").observe(elapsed)
+        finally:
+            translate_slots.release()
+
+        logger.debug(f"[trace {trace_id}] translated in {elapsed * 1000:.0f}ms")
+        return {**result, "trace_id": trace_id}
     except Exception as e:
-        logger.error(f"Translation error: {e}")
+        logger.error(f"[trace {trace_id}] Translation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        capacity.release()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8002)
+    from common.server import serve
+    serve(app, "main:app", port=8002, app_dir=str(Path(__file__).resolve().parent))
 ''')
 
     # TTS Worker
@@ -695,57 +1034,117 @@ torchaudio==2.1.1
 pydantic==2.5.0
 python-dotenv==1.0.0
 numpy==1.24.3
+httpx==0.25.2
 ''')
 
-    create_file('inference/tts_worker/main.py', '''import logging
+    create_file('inference/tts_worker/main.py', '''import sys
+import time
+import logging
+from pathlib import Path
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from tts_service import TTSService
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.capacity import AdmissionController, load_router
+from common.engines import Engines, readiness_router
+from common.instrumentation import ACTIVE_CONNECTIONS, metrics_router, new_trace_id, stage
+from common.profiling import debug_router
+from synthesis_stack import SynthesisStack
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+engines = Engines()
+tts_engine = engines.add("tts", SynthesisStack)
+
 app = FastAPI(title="LumaTalk TTS Worker")
-tts_service = TTSService()
+app.include_router(metrics_router)
+app.include_router(debug_router)
+app.include_router(readiness_router(engines, "tts_worker"))
+
+# Turn new sessions away (with a retry hint) once TTS_MAX_STREAMS or the first-chunk budget is hit
+admission = AdmissionController.from_env("TTS", "/ws/tts", latency_stage="tts_first_chunk")
+app.include_router(load_router("tts_worker", [admission]))
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Initializing TTS service...")
-    await tts_service.initialize()
-    logger.info("TTS service ready")
+    logger.info("Loading TTS service in the background...")
+    engines.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if tts_engine.ready:
+        await tts_engine.get().close()
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "tts_worker"}
 
+@app.get("/stats")
+async def stats():
+    if not tts_engine.ready:
+        return {}
+    return tts_engine.get().stats()
+
 @app.websocket("/ws/tts")
 async def websocket_tts(websocket: WebSocket):
     await websocket.accept()
+    if not engines.ready:
+        # 1013 Try Again Later: the client should retry once /ready reports ready
+        await websocket.close(code=1013)
+        return
+    if not admission.try_admit():
+        await admission.reject(websocket)
+        return
     logger.info("Client connected to TTS WebSocket")
 
+    # Everything after admission runs inside the try, so the slot is always released
     try:
-        while True:
-            # Receive text to synthesize
-            data = await websocket.receive_json()
-            text = data.get("text")
-            lang = data.get("lang", "en")
-            voice = data.get("voice")
-
-            # Stream TTS audio
-            async for audio_chunk in tts_service.synthesize_streaming(text, lang, voice):
-                await websocket.send_bytes(audio_chunk)
-
-            # Send completion signal
-            await websocket.send_json({"type": "tts_complete"})
+        stack = tts_engine.get()
+        synthesizer = stack.synthesizer
+        postprocessor = stack.new_postprocessor()
+
+        with ACTIVE_CONNECTIONS.labels("/ws/tts").track():
+            while True:
+                # Receive text to synthesize
+                data = await websocket.receive_json()
+                text = data.get("text")
+                lang = data.get("lang", "en")
+                voice = data.get("voice")
+                trace_id = data.get("trace_id") or new_trace_id()
+
+                # Stream TTS audio
+                if postprocessor:
+                    postprocessor.reset()
+                started = time.perf_counter()
+                first_chunk = None
+                async for audio_chunk in synthesizer.synthesize_streaming(text, lang, voice):
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - started
+                        stage("tts_first_chunk").observe(first_chunk)
+                    if postprocessor:
+                        audio_chunk = postprocessor.process(audio_chunk)
+                        if not audio_chunk:
+                            continue
+                    await websocket.send_bytes(audio_chunk)
+                total = time.perf_counter() - started
+                stage("tts_total").observe(total)
+                logger.debug(f"[trace {trace_id}] first chunk {(first_chunk or total) * 1000:.0f}ms, "
+                             f"total {total * 1000:.0f}ms")
+
+                # Send completion signal
+                await websocket.send_json({"type": "tts_complete", "trace_id": trace_id})
 
     except WebSocketDisconnect:
         logger.info("Client disconnected from TTS WebSocket")
     except Exception as e:
         logger.error(f"Error in TTS WebSocket: {e}")
         await websocket.close(code=1011)
+    finally:
+        admission.release()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8003)
+    from common.server import serve
+    serve(app, "main:app", port=8003, app_dir=str(Path(__file__).resolve().parent))
 ''')
 
 def generate_docker_compose():
@@ -788,7 +1187,9 @@ services:
     restart: unless-stopped
 
   asr_worker:
-    build: ./inference/asr_worker
+    build:
+      context: ./inference
+      dockerfile: asr_worker/Dockerfile
     container_name: lumatalk-asr
     ports:
       - "8001:8001"
@@ -804,7 +1205,9 @@ services:
     restart: unless-stopped
 
   mt_worker:
-    build: ./inference/mt_worker
+    build:
+      context: ./inference
+      dockerfile: mt_worker/Dockerfile
     container_name: lumatalk-mt
     ports:
       - "8002:8002"
@@ -815,7 +1218,9 @@ services:
     restart: unless-stopped
 
   tts_worker:
-    build: ./inference/tts_worker
+    build:
+      context: ./inference
+      dockerfile: tts_worker/Dockerfile
     container_name: lumatalk-tts
     ports:
       - "8003:8003"
@@ -824,6 +1229,31 @@ services:
       AZURE_SPEECH_REGION: ${AZURE_SPEECH_REGION}
     restart: unless-stopped
 
+  # Fused ASR -> MT -> TTS worker for single-node deployments (docker-compose --profile fused up)
+  pipeline_worker:
+    build:
+      context: ./inference
+      dockerfile: pipeline_worker/Dockerfile
+    container_name: lumatalk-pipeline
+    profiles: ["fused"]
+    ports:
+      - "8004:8004"
+    environment:
+      GOOGLE_APPLICATION_CREDENTIALS: /app/credentials/gcp-key.json
+      AZURE_SPEECH_KEY: ${AZURE_SPEECH_KEY}
+      AZURE_SPEECH_REGION: ${AZURE_SPEECH_REGION}
+    volumes:
+      - model_cache:/root/.cache
+      - ./credentials:/app/credentials:ro
+    deploy:
+      resources:
+        reservations:
+          devices:
+            - driver: nvidia
+              count: 1
+              capabilities: [gpu]
+    restart: unless-stopped
+
   coturn:
     image: coturn/coturn:latest
     container_name: lumatalk-turn
@@ -848,9 +1278,8 @@ volumes:
 ''')
 
 def generate_dockerfiles():
-    """Generate Dockerfiles for all services."""
+    """Generate the backend Dockerfile."""
 
-    # Backend Dockerfile
     create_file('backend/Dockerfile', '''FROM eclipse-temurin:17-jdk-alpine AS build
 WORKDIR /app
 COPY pom.xml .
@@ -871,9 +1300,10 @@ WORKDIR /app
 RUN apt-get update && apt-get install -y \\
     build-essential \\
     && rm -rf /var/lib/apt/lists/*
-COPY requirements.txt .
+COPY asr_worker/requirements.txt .
 RUN pip install --no-cache-dir -r requirements.txt
-COPY . .
+COPY common ./common
+COPY asr_worker/ .
 EXPOSE 8001
 CMD ["python", "main.py"]
 ''')
@@ -881,9 +1311,10 @@ CMD ["python", "main.py"]
     # MT Worker Dockerfile
     create_file('inference/mt_worker/Dockerfile', '''FROM python:3.10-slim
 WORKDIR /app
-COPY requirements.txt .
+COPY mt_worker/requirements.txt .
 RUN pip install --no-cache-dir -r requirements.txt
-COPY . .
+COPY common ./common
+COPY mt_worker/ .
 EXPOSE 8002
 CMD ["python", "main.py"]
 ''')
@@ -891,37 +1322,57 @@ CMD ["python", "main.py"]
     # TTS Worker Dockerfile
     create_file('inference/tts_worker/Dockerfile', '''FROM python:3.10-slim
 WORKDIR /app
-COPY requirements.txt .
+COPY tts_worker/requirements.txt .
 RUN pip install --no-cache-dir -r requirements.txt
-COPY . .
+COPY common ./common
+COPY tts_worker/ .
 EXPOSE 8003
 CMD ["python", "main.py"]
 ''')
 
+SECTIONS = [
+    ("Flutter models", [generate_flutter_models]),
+    ("Flutter database", [generate_flutter_database]),
+    ("Flutter services", [generate_flutter_services]),
+    ("Spring Boot backend", [generate_spring_boot_backend]),
+    ("Python inference workers", [generate_python_workers]),
+    ("Docker configuration", [generate_docker_compose, generate_dockerfiles]),
+]
+
 def main():
-    print("LumaTalk Project Generator")
+    global DRY_RUN, FORCE, UMASK
+
+    parser = argparse.ArgumentParser(description="Generate the LumaTalk project boilerplate")
+    parser.add_argument('--dry-run', action='store_true', help="Show a diff of what would change without writing")
+    parser.add_argument('--force', action='store_true', help="Rewrite every file even if its content is unchanged")
+    parser.add_argument('--jobs', type=int, default=len(SECTIONS), help="Sections generated concurrently")
+    args = parser.parse_args()
+    DRY_RUN, FORCE = args.dry_run, args.force
+    # os.umask can only be read by setting it; do that here, while no other thread is creating files
+    UMASK = os.umask(0)
+    os.umask(UMASK)
+
+    print("LumaTalk Project Generator" + (" (dry run)" if DRY_RUN else ""))
     print("=" * 50)
 
-    print("\nGenerating Flutter models...")
-    generate_flutter_models()
-
-    print("\nGenerating Flutter database...")
-    generate_flutter_database()
-
-    print("\nGenerating Flutter services...")
-    generate_flutter_services()
-
-    print("\nGenerating Spring Boot backend...")
-    generate_spring_boot_backend()
-
-    print("\nGenerating Python inference workers...")
-    generate_python_workers()
-
-    print("\nGenerating Docker configuration...")
-    generate_docker_compose()
-    generate_dockerfiles()
+    # Sections write disjoint files, so they can run concurrently; output is printed in order
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        futures = [(title, executor.submit(run_section, generators)) for title, generators in SECTIONS]
+        totals = Counter()
+        for title, future in futures:
+            lines, counts = future.result()
+            totals.update(counts)
+            print(f"\nGenerating {title}... ({counts['created']} created, {counts['changed']} changed, "
+                  f"{counts['unchanged']} unchanged)")
+            for line in lines:
+                print(line)
 
     print("\n" + "=" * 50)
+    verb = "would be " if DRY_RUN else ""
+    print(f"{totals['created']} files {verb}created, {totals['changed']} {verb}changed, "
+          f"{totals['unchanged']} unchanged")
+    if DRY_RUN:
+        return
     print("Project structure generated successfully!")
     print("\nNext steps:")
     print("1. Run: cd flutter_app && flutter pub get")
@@ -0,0 +1,118 @@
+"""Compare the torch and onnxruntime VAD backends: per-frame latency and memory.
+
+Usage: python bench_vad.py [--backends torch onnx] [--streams 16] [--seconds 30] [--audio speech.wav]
+
+Each backend runs in its own process so import cost and RSS are measured in
+isolation. The onnx backend is also timed with batched multi-stream scoring.
+"""
+import sys
+import json
+import time
+import wave
+import argparse
+import resource
+import subprocess
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def load_audio(args) -> bytes:
+    if args.audio:
+        with wave.open(args.audio, "rb") as wav:
+            return wav.readframes(wav.getnframes())
+    # Alternating voiced bursts and near-silence so both decisions are exercised
+    rng = np.random.default_rng(0)
+    t = np.arange(int(args.seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    voiced = (np.sin(2 * np.pi * 140 * t) + 0.5 * np.sin(2 * np.pi * 280 * t)) * (np.sin(2 * np.pi * 0.5 * t) > 0)
+    signal = 6000 * voiced + 200 * rng.standard_normal(len(t))
+    return signal.astype("<i2").tobytes()
+
+
+def rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(timings) -> dict:
+    timings = np.asarray(timings) * 1e6
+    return {"mean_us": timings.mean(), "p50_us": np.percentile(timings, 50), "p99_us": np.percentile(timings, 99)}
+
+
+def child(args):
+    audio = load_audio(args)
+    frame_bytes = int(SAMPLE_RATE * args.frame_ms / 1000) * 2
+    frames = [audio[i:i + frame_bytes] for i in range(0, len(audio) - frame_bytes + 1, frame_bytes)]
+    baseline_rss = rss_mb()
+
+    started = time.perf_counter()
+    if args.child == "onnx":
+        from onnx_vad import OnnxVADProcessor
+        processor = OnnxVADProcessor()
+    else:
+        from vad_processor import VADProcessor
+        processor = VADProcessor()
+    load_s = time.perf_counter() - started
+
+    result = {"backend": args.child, "load_s": load_s, "frames": len(frames)}
+    streams = [processor.new_stream() if hasattr(processor, "new_stream") else processor
+               for _ in range(args.streams)]
+
+    # One process() call per frame per stream, as in websocket_asr
+    timings = []
+    for frame in frames:
+        for stream in streams:
+            started = time.perf_counter()
+            stream.process(frame)
+            timings.append(time.perf_counter() - started)
+    result["per_frame"] = percentiles(timings)
+
+    if hasattr(processor, "score_batch"):
+        streams = [processor.new_stream() for _ in range(args.streams)]
+        timings = []
+        for frame in frames:
+            started = time.perf_counter()
+            processor.score_batch(streams, [frame] * len(streams))
+            timings.append((time.perf_counter() - started) / len(streams))
+        result["batched_per_frame"] = percentiles(timings)
+
+    result["rss_mb"] = rss_mb()
+    result["rss_added_mb"] = result["rss_mb"] - baseline_rss
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--streams", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--frame-ms", type=float, default=20)
+    parser.add_argument("--audio", help="Mono 16kHz PCM16 WAV instead of synthetic audio")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args)
+        return
+
+    for backend in args.backends:
+        command = [sys.executable, __file__, "--child", backend, "--streams", str(args.streams),
+                   "--seconds", str(args.seconds), "--frame-ms", str(args.frame_ms)]
+        if args.audio:
+            command += ["--audio", args.audio]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(f"{backend}: failed ({completed.stderr.strip().splitlines()[-1:]})")
+            continue
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"{backend}: load {result['load_s']:.2f}s, RSS {result['rss_mb']:.0f}MB "
+              f"(+{result['rss_added_mb']:.0f}MB), {result['frames']} frames x {args.streams} streams")
+        for key, label in (("per_frame", "per frame"), ("batched_per_frame", "batched, per frame")):
+            if key in result:
+                stats = result[key]
+                print(f"  {label}: mean {stats['mean_us']:.1f}us  p50 {stats['p50_us']:.1f}us  "
+                      f"p99 {stats['p99_us']:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
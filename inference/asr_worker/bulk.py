@@ -0,0 +1,316 @@
+"""Offline bulk transcription of uploaded recordings.
+
+VAD runs once over the whole file to find speech regions. Regions longer than
+`max_segment_s` are cut into overlapping chunks, and chunks decode in parallel
+(up to `concurrency` at a time, on a dedicated thread pool). Overlaps are
+stitched on word timestamps. Jobs go through a bounded queue served by
+`workers` tasks, and back off while `should_yield()` reports live streams
+under pressure, so bulk work never starves `/ws/asr`.
+"""
+import io
+import os
+import time
+import uuid
+import wave
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+import numpy as np
+
+from common.instrumentation import stage
+from language_id import LanguageDetector
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+VAD_FRAME_SAMPLES = 512
+FINISHED_JOBS_KEPT = 100
+
+
+def decode_upload(data: bytes) -> np.ndarray:
+    """PCM16 mono 16kHz samples from a WAV upload, or any format PyAV can read."""
+    if data[:4] == b"RIFF":
+        with wave.open(io.BytesIO(data), "rb") as wav:
+            if wav.getsampwidth() != 2:
+                raise ValueError("WAV uploads must be 16-bit PCM")
+            samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+            channels, rate = wav.getnchannels(), wav.getframerate()
+        if channels > 1:
+            samples = samples.reshape(-1, channels).mean(axis=1)
+        if rate != SAMPLE_RATE:
+            positions = np.arange(0, len(samples) - 1, rate / SAMPLE_RATE)
+            samples = np.interp(positions, np.arange(len(samples)), samples)
+        return samples.astype(np.int16)
+    from faster_whisper import decode_audio
+    return (decode_audio(io.BytesIO(data), sampling_rate=SAMPLE_RATE) * 32767).astype(np.int16)
+
+
+def split_speech(vad, audio: np.ndarray, min_silence_ms: float = 300, pad_ms: float = 200,
+                 min_speech_ms: float = 250) -> List[Tuple[int, int]]:
+    """Speech regions as (start, end) sample offsets, from one VAD pass over the file."""
+    detector = vad.new_stream() if hasattr(vad, "new_stream") else vad
+    n_frames = len(audio) // VAD_FRAME_SAMPLES
+    frames = audio[:n_frames * VAD_FRAME_SAMPLES].reshape(n_frames, VAD_FRAME_SAMPLES)
+    flags = np.fromiter((detector.process(frame.tobytes()) for frame in frames), dtype=bool, count=n_frames)
+
+    frame_ms = VAD_FRAME_SAMPLES * 1000 / SAMPLE_RATE
+    regions = []
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.astype(np.int8), [0]))))
+    for start, end in zip(edges[::2], edges[1::2]):
+        if regions and (start - regions[-1][1]) * frame_ms < min_silence_ms:
+            regions[-1][1] = end
+        else:
+            regions.append([start, end])
+
+    pad = int(pad_ms * SAMPLE_RATE / 1000)
+    return [(max(0, start * VAD_FRAME_SAMPLES - pad), min(len(audio), end * VAD_FRAME_SAMPLES + pad))
+            for start, end in regions if (end - start) * frame_ms >= min_speech_ms]
+
+
+def chunk_region(start: int, end: int, max_samples: int, overlap_samples: int) -> List[Tuple[int, int]]:
+    chunks = []
+    while True:
+        chunks.append((start, min(end, start + max_samples)))
+        if start + max_samples >= end:
+            return chunks
+        start += max_samples - overlap_samples
+
+
+def stitch(chunks: List[List[dict]], bounds: List[Tuple[float, float]]) -> List[dict]:
+    """Merge per-chunk word lists: words in an overlap go to whichever chunk they sit
+    further inside of (cut at the overlap midpoint). Chunks without word timing
+    drop the longest word run that repeats the previous chunk's tail."""
+    merged: List[dict] = []
+    for i, words in enumerate(chunks):
+        if i and words and words[0].get("timed"):
+            cut = (bounds[i][0] + bounds[i - 1][1]) / 2
+            merged = [w for w in merged if (w["start"] + w["end"]) / 2 < cut]
+            words = [w for w in words if (w["start"] + w["end"]) / 2 >= cut]
+        elif i and words:
+            tail = [w["text"].strip().lower() for w in merged[-20:]]
+            head = [w["text"].strip().lower() for w in words[:20]]
+            repeat = next((k for k in range(min(len(tail), len(head)), 0, -1) if tail[-k:] == head[:k]), 0)
+            words = words[repeat:]
+        merged.extend(words)
+    return merged
+
+
+def group_segments(words: List[dict]) -> List[dict]:
+    """Words back into timestamped segments, split where the decoder split them."""
+    segments = []
+    for word in words:
+        if segments and segments[-1]["key"] == word["segment"]:
+            segment = segments[-1]
+            segment["end"] = word["end"]
+            segment["text"] += word["text"]
+        else:
+            segments.append({"key": word["segment"], "start": word["start"], "end": word["end"],
+                             "text": word["text"]})
+    return [{"start": round(float(s["start"]), 2), "end": round(float(s["end"]), 2), "text": s["text"].strip()}
+            for s in segments]
+
+
+class BulkDecoder:
+    """Decodes one chunk with the ASR service: the faster-whisper model directly when
+    available (word timestamps, run on the bulk thread pool), otherwise by feeding
+    the chunk through `transcribe_streaming` and keeping the final results."""
+
+    def __init__(self, asr_service, executor: ThreadPoolExecutor):
+        self.asr_service = asr_service
+        self.executor = executor
+        self.model = getattr(asr_service, "model", None)
+        self.accepts_hint = LanguageDetector.accepts_hint(asr_service)
+
+    def _transcribe(self, audio: np.ndarray, offset: float, key: str, language: Optional[str]):
+        segments, info = self.model.transcribe(audio.astype(np.float32) / 32768, language=language,
+                                               word_timestamps=True, vad_filter=False)
+        words = []
+        for n, segment in enumerate(segments):
+            for word in segment.words or []:
+                words.append({"start": offset + word.start, "end": offset + word.end, "text": word.word,
+                              "segment": f"{key}.{n}", "timed": True})
+        return words, info.language
+
+    async def decode(self, audio: np.ndarray, offset: float, key: str, language: Optional[str]):
+        if hasattr(self.model, "transcribe"):
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._transcribe, audio, offset, key, language)
+
+        options = {"language": language} if language and self.accepts_hint else {}
+        texts, last_partial = [], ""
+        async for result in self.asr_service.transcribe_streaming(audio.tobytes(), **options):
+            if result.get("type") == "asr_final":
+                texts.append(result.get("text", ""))
+                last_partial = ""
+            else:
+                last_partial = result.get("text", "")
+        text = " ".join(texts + [last_partial]).strip()
+        end = offset + len(audio) / SAMPLE_RATE
+        words = [{"start": offset, "end": end, "text": f" {w}", "segment": key} for w in text.split()]
+        return words, language
+
+
+class BulkJob:
+    def __init__(self, audio: bytes, language: Optional[str]):
+        self.id = uuid.uuid4().hex[:16]
+        self.audio = audio
+        self.language = language
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.duration_s = 0.0
+        self.processing_s = 0.0
+        self.regions_total = 0
+        self.segments: List[dict] = []
+        self.done = asyncio.Event()
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def add_segments(self, segments: List[dict]):
+        self.segments.extend(segments)
+        self._notify()
+
+    def finish(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.audio = b""
+        if self.started_at is not None:
+            self.processing_s = time.perf_counter() - self.started_at
+        self.done.set()
+        self._notify()
+
+    async def stream(self) -> AsyncIterator[dict]:
+        """Segments in order as their regions finish, then a final status record."""
+        sent = 0
+        while True:
+            changed = self._changed
+            while sent < len(self.segments):
+                yield {"type": "segment", **self.segments[sent]}
+                sent += 1
+            if self.done.is_set():
+                yield {"type": "job_complete", **self.to_dict(include_segments=False)}
+                return
+            await changed.wait()
+
+    def to_dict(self, include_segments: bool = True) -> dict:
+        body = {
+            "job_id": self.id,
+            "status": self.status,
+            "language": self.language,
+            "duration_s": round(self.duration_s, 2),
+            "processing_s": round(self.processing_s, 2),
+            "realtime_factor": round(self.duration_s / self.processing_s, 1) if self.processing_s else None,
+            "segments_done": len(self.segments),
+        }
+        if self.error:
+            body["error"] = self.error
+        if include_segments and self.status == "done":
+            body["segments"] = self.segments
+            body["text"] = " ".join(segment["text"] for segment in self.segments)
+        return body
+
+
+class BulkTranscriber:
+    """`load_vad` builds the bulk threads' own VAD when the shared one has no
+    `new_stream()`: a backend like that keeps state in the processor itself,
+    so it cannot be run from the bulk pool while live streams use it."""
+
+    def __init__(self, asr_engine, vad_engine, load_vad: Callable[[], object],
+                 should_yield: Callable[[], bool] = lambda: False):
+        self.asr_engine = asr_engine
+        self.vad_engine = vad_engine
+        self.load_vad = load_vad
+        self._thread_vad = threading.local()
+        self.should_yield = should_yield
+        self.workers = int(os.getenv("ASR_BULK_WORKERS", "1"))
+        self.concurrency = int(os.getenv("ASR_BULK_CONCURRENCY", "4"))
+        self.max_segment_s = float(os.getenv("ASR_BULK_MAX_SEGMENT_S", "30"))
+        self.overlap_s = float(os.getenv("ASR_BULK_OVERLAP_S", "1"))
+        self.executor = ThreadPoolExecutor(int(os.getenv("ASR_BULK_THREADS", "2")), thread_name_prefix="bulk")
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=int(os.getenv("ASR_BULK_MAX_QUEUED", "16")))
+        self.jobs: "OrderedDict[str, BulkJob]" = OrderedDict()
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def submit(self, audio: bytes, language: Optional[str] = None) -> BulkJob:
+        """Queue a job; raises asyncio.QueueFull when the backlog is at its limit."""
+        job = BulkJob(audio, language)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        finished = [job_id for job_id, j in self.jobs.items() if j.done.is_set()]
+        for job_id in finished[:max(0, len(finished) - FINISHED_JOBS_KEPT)]:
+            del self.jobs[job_id]
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run(job)
+                job.finish("done")
+            except Exception as e:
+                logger.error(f"Bulk job {job.id} failed: {e}")
+                job.finish("failed", str(e))
+
+    def _split_speech(self, audio: np.ndarray) -> List[Tuple[int, int]]:
+        vad = self.vad_engine.get()
+        if not hasattr(vad, "new_stream"):
+            vad = getattr(self._thread_vad, "vad", None)
+            if vad is None:
+                vad = self._thread_vad.vad = self.load_vad()
+        return split_speech(vad, audio)
+
+    async def _yield_to_live(self):
+        while self.should_yield():
+            await asyncio.sleep(0.2)
+
+    async def _run(self, job: BulkJob):
+        loop = asyncio.get_running_loop()
+        job.status = "running"
+        job.started_at = time.perf_counter()
+        audio = await loop.run_in_executor(self.executor, decode_upload, job.audio)
+        job.audio = b""
+        job.duration_s = len(audio) / SAMPLE_RATE
+        with stage("asr_bulk_vad").time():
+            regions = await loop.run_in_executor(self.executor, self._split_speech, audio)
+        job.regions_total = len(regions)
+
+        decoder = BulkDecoder(self.asr_engine.get(), self.executor)
+        slots = asyncio.Semaphore(self.concurrency)
+        max_samples = int(self.max_segment_s * SAMPLE_RATE)
+        overlap = int(self.overlap_s * SAMPLE_RATE)
+
+        async def decode_chunk(key: str, start: int, end: int):
+            async with slots:
+                await self._yield_to_live()
+                with stage("asr_bulk_decode").time():
+                    return await decoder.decode(audio[start:end], start / SAMPLE_RATE, key, job.language)
+
+        async def decode_region(r: int, start: int, end: int):
+            chunks = chunk_region(start, end, max_samples, overlap)
+            results = await asyncio.gather(*(decode_chunk(f"{r}.{c}", s, e) for c, (s, e) in enumerate(chunks)))
+            if job.language is None:
+                job.language = next((language for _, language in results if language), None)
+            bounds = [(s / SAMPLE_RATE, e / SAMPLE_RATE) for s, e in chunks]
+            return group_segments(stitch([words for words, _ in results], bounds))
+
+        # Regions decode concurrently (bounded by the chunk slots) but are published in order
+        tasks = [asyncio.create_task(decode_region(r, start, end)) for r, (start, end) in enumerate(regions)]
+        try:
+            for task in tasks:
+                job.add_segments(await task)
+        finally:
+            for task in tasks:
+                task.cancel()
+        logger.info(f"Bulk job {job.id}: {job.duration_s:.0f}s of audio, {len(regions)} speech regions "
+                    f"in {time.perf_counter() - job.started_at:.1f}s")
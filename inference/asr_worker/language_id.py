@@ -0,0 +1,114 @@
+"""Per-stream language identification with early lock-in.
+
+In auto-language mode, whisper's language detection runs only on the first
+few seconds of speech. It re-runs every `step_s` of additional speech until
+the probability passes `lock_confidence` or `window_s` is used up, and then
+the language is locked for the stream. Decoding uses the locked language
+from then on. A final result whose confidence drops below
+`recheck_confidence` unlocks the stream and detection runs again on the
+speech that follows.
+"""
+import os
+import asyncio
+import inspect
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+from common.instrumentation import stage
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+
+
+class LanguageDetector:
+    """Language detection through the ASR service: its own `detect_language(audio)`
+    if it has one, else the faster-whisper model's `transcribe` info (decoding is
+    lazy there, so only the detection pass runs)."""
+
+    def __init__(self, asr_service):
+        self.asr_service = asr_service
+
+    @staticmethod
+    def supports(asr_service) -> bool:
+        return hasattr(asr_service, "detect_language") or hasattr(getattr(asr_service, "model", None), "transcribe")
+
+    @staticmethod
+    def accepts_hint(asr_service) -> bool:
+        """Whether `transcribe_streaming` takes a `language=` keyword."""
+        try:
+            parameters = inspect.signature(asr_service.transcribe_streaming).parameters.values()
+        except (AttributeError, TypeError, ValueError):
+            return False
+        return any(p.name == "language" or p.kind is p.VAR_KEYWORD for p in parameters)
+
+    def _detect(self, audio: np.ndarray) -> Tuple[str, float]:
+        if hasattr(self.asr_service, "detect_language"):
+            return self.asr_service.detect_language(audio)
+        _, info = self.asr_service.model.transcribe(audio, language=None, beam_size=1)
+        return info.language, info.language_probability
+
+    async def detect(self, pcm16: bytes) -> Tuple[str, float]:
+        audio = np.frombuffer(pcm16, dtype="<i2").astype(np.float32) / 32768
+        with stage("asr_language_id").time():
+            return await asyncio.get_running_loop().run_in_executor(None, self._detect, audio)
+
+
+class LanguageLock:
+    def __init__(self, detector: LanguageDetector, window_s: Optional[float] = None,
+                 step_s: Optional[float] = None, lock_confidence: Optional[float] = None,
+                 recheck_confidence: Optional[float] = None):
+        self.detector = detector
+        self.window_bytes = int((window_s or float(os.getenv("ASR_LID_WINDOW_S", "3"))) * SAMPLE_RATE) * 2
+        self.step_bytes = int((step_s or float(os.getenv("ASR_LID_STEP_S", "1"))) * SAMPLE_RATE) * 2
+        self.lock_confidence = lock_confidence or float(os.getenv("ASR_LID_LOCK_CONFIDENCE", "0.8"))
+        self.recheck_confidence = recheck_confidence or float(os.getenv("ASR_LID_RECHECK_CONFIDENCE", "0.5"))
+        self.language: Optional[str] = None
+        self.probability = 0.0
+        self.locked = False
+        self.detections = 0
+        self._speech = bytearray()
+
+    async def observe(self, speech: bytes) -> Optional[str]:
+        """Feed a speech chunk; returns the language to decode with (None until the first detection)."""
+        if self.locked:
+            return self.language
+        self._speech += speech
+        collected = len(self._speech)
+        if collected >= self.window_bytes or collected >= self.step_bytes * (self.detections + 1):
+            await self._detect()
+        return self.language
+
+    async def resolve(self) -> Optional[str]:
+        """The language now, detecting on the speech collected so far if no detection has run.
+
+        For a final result that arrives before the first scheduled detection, so
+        it is never passed on without a language.
+        """
+        if self.language is None and self._speech:
+            await self._detect()
+        return self.language
+
+    async def _detect(self):
+        collected = len(self._speech)
+        self.language, self.probability = await self.detector.detect(bytes(self._speech[:self.window_bytes]))
+        self.detections += 1
+        if self.probability >= self.lock_confidence or collected >= self.window_bytes:
+            self.locked = True
+            self._speech = bytearray()
+            logger.info(f"Language locked to {self.language} (p={self.probability:.2f}) "
+                        f"after {collected / 2 / SAMPLE_RATE:.1f}s of speech")
+
+    def check(self, confidence: Optional[float]):
+        """Called with each final result's confidence; a drop re-opens detection."""
+        if self.locked and confidence is not None and confidence < self.recheck_confidence:
+            logger.info(f"ASR confidence dropped to {confidence:.2f}, re-checking language {self.language}")
+            self.locked = False
+            self.detections = 0
+
+    def annotate(self, result: dict):
+        if self.language:
+            result["language"] = self.language
+            result["language_probability"] = round(float(self.probability), 3)
@@ -1,50 +1,250 @@
+import os
+import sys
+import json
+import time
 import asyncio
 import logging
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from asr_service import ASRService
-from vad_processor import VADProcessor
+from functools import partial
+from pathlib import Path
+from typing import Optional
+from fastapi import FastAPI, File, HTTPException, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.capacity import AdmissionController, load_router
+from common.capture import CaptureStore
+from common.engines import Engines, readiness_router
+from common.instrumentation import (ACTIVE_CONNECTIONS, CLIENT_WAIT_SECONDS, QUEUE_DEPTH, metrics_router,
+                                    new_trace_id, stage)
+from common.profiling import debug_router
+from common.server import process_info
+from common.quality import QualityController, apply_to_engine
+from language_id import LanguageDetector, LanguageLock
+from bulk import BulkTranscriber
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Stream audio is 16 kHz mono PCM16
+BYTES_PER_MS = 32
+
+# Heavy modules (torch, faster-whisper, silero) are imported by the loaders in the
+# background, so the server binds and answers /health before any model is loaded
+
+def load_asr_service():
+    from asr_service import ASRService
+    return ASRService()
+
+def load_vad_processor():
+    # VAD_BACKEND=onnx runs Silero on onnxruntime and never imports torch
+    if os.getenv("VAD_BACKEND", "torch").lower() == "onnx":
+        from onnx_vad import OnnxVADProcessor
+        return OnnxVADProcessor()
+    from vad_processor import VADProcessor
+    return VADProcessor()
+
+engines = Engines()
+asr_engine = engines.add("asr", load_asr_service)
+vad_engine = engines.add("vad", load_vad_processor)
+
 app = FastAPI(title="LumaTalk ASR Worker")
-asr_service = ASRService()
-vad_processor = VADProcessor()
+app.include_router(metrics_router)
+app.include_router(debug_router)
+app.include_router(readiness_router(engines, "asr_worker"))
+
+# Turn new streams away (with a retry hint) once ASR_MAX_STREAMS or the decode latency budget is hit
+admission = AdmissionController.from_env("ASR", "/ws/asr", latency_stage="asr_decode")
+app.include_router(load_router("asr_worker", [admission]))
+
+# Under load, step down to fewer partials, a smaller beam and finally a smaller model tier
+QUALITY_LEVELS = [
+    {"name": "full", "partial_interval_ms": 0, "beam_size": 5},
+    {"name": "fewer_partials", "partial_interval_ms": 300, "beam_size": 5},
+    {"name": "small_beam", "partial_interval_ms": 300, "beam_size": 2},
+    {"name": "greedy", "partial_interval_ms": 600, "beam_size": 1},
+    {"name": "small_model", "partial_interval_ms": 600, "beam_size": 1, "model_tier": "small"},
+]
+quality = QualityController.from_env("ASR", "asr_worker", QUALITY_LEVELS, "asr_decode", default_budget_ms=300)
+if quality:
+    quality.add_listener(apply_to_engine(asr_engine))
+
+# Uploaded recordings; paused whenever live streams are at capacity or running degraded
+bulk = BulkTranscriber(
+    asr_engine, vad_engine, load_vad_processor,
+    should_yield=lambda: admission.remaining() == 0 or bool(quality and quality.index),
+)
+QUEUE_DEPTH.labels("asr_bulk_jobs").set_function(lambda: bulk.queue.qsize())
+# Queued jobs hold their upload until it is decoded, so uploads are capped
+BULK_MAX_UPLOAD_BYTES = int(float(os.getenv("ASR_BULK_MAX_UPLOAD_MB", "100")) * 1024 * 1024)
+UPLOAD_READ_BYTES = 1024 * 1024
+# Jobs live in the process that accepted them; with WORKER_PROCESSES>1 a poll could land elsewhere
+BULK_POLLING = process_info()["processes"] == 1
+
+# Opt-in (ASR_CAPTURE_DIR): record received frames and their arrival times for replay
+capture_store = CaptureStore.from_env()
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Initializing ASR service...")
-    await asr_service.initialize()
-    logger.info("ASR service ready")
+    logger.info("Loading ASR engines in the background...")
+    engines.start()
+    bulk.start()
+    if quality:
+        quality.start()
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "asr_worker"}
 
+async def read_upload(file: UploadFile) -> bytes:
+    """The upload's bytes; 413 once it passes ASR_BULK_MAX_UPLOAD_MB."""
+    data = bytearray()
+    while True:
+        chunk = await file.read(UPLOAD_READ_BYTES)
+        if not chunk:
+            return bytes(data)
+        data += chunk
+        if len(data) > BULK_MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413,
+                                detail=f"Upload exceeds {BULK_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+
+@app.post("/transcribe")
+async def transcribe_file(file: UploadFile = File(...), language: Optional[str] = None,
+                          wait: bool = False, stream: bool = False):
+    """Queue a recorded session for offline transcription.
+
+    Returns 202 with a job id to poll at GET /transcribe/{job_id}; `wait=true`
+    returns the finished transcript, `stream=true` streams NDJSON segments as
+    they are decoded. With several server processes a request without either
+    is answered as `wait=true`, since the poll could reach another process.
+    """
+    if not engines.ready:
+        raise HTTPException(status_code=503, detail="ASR engines are still loading", headers={"Retry-After": "5"})
+    if bulk.queue.full():
+        raise HTTPException(status_code=429, detail="Bulk transcription queue is full",
+                            headers={"Retry-After": "30"})
+    audio = await read_upload(file)
+    try:
+        job = bulk.submit(audio, language)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=429, detail="Bulk transcription queue is full",
+                            headers={"Retry-After": "30"})
+    if stream:
+        async def ndjson():
+            async for record in job.stream():
+                yield json.dumps(record) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    if wait or not BULK_POLLING:
+        await job.done.wait()
+        return job.to_dict()
+    return JSONResponse(job.to_dict(), status_code=202)
+
+@app.get("/transcribe/{job_id}")
+async def transcription_job(job_id: str):
+    job = bulk.jobs.get(job_id)
+    if job is None:
+        detail = "Unknown job" if BULK_POLLING else "Unknown job (jobs are not shared between server processes)"
+        raise HTTPException(status_code=404, detail=detail)
+    return job.to_dict()
+
 @app.websocket("/ws/asr")
 async def websocket_asr(websocket: WebSocket):
+    """Binary PCM16 frames in, JSON results out.
+
+    Each result carries `audio_end_ms`, the stream position (ms of audio
+    received) at the end of the frame it was decoded from.
+
+    `?language=xx` decodes in a fixed language; `?language=auto` detects it
+    from the first seconds of speech, locks it, and tags results with it.
+    """
     await websocket.accept()
+    if not engines.ready:
+        # 1013 Try Again Later: the client should retry once /ready reports ready
+        await websocket.close(code=1013)
+        return
+    if not admission.try_admit():
+        await admission.reject(websocket)
+        return
     logger.info("Client connected to ASR WebSocket")
+    # One trace id per utterance, rotated after every final result
+    trace_id = new_trace_id()
+    last_partial = 0.0
+    received_ms = 0.0
+    capture = None
 
+    # Everything after admission runs inside the try, so the slot is always released
     try:
-        while True:
-            # Receive audio data
-            audio_data = await websocket.receive_bytes()
+        asr_service = asr_engine.get()
+        vad_processor = vad_engine.get()
+        # Backends with recurrent state hand out one stream per connection
+        if hasattr(vad_processor, "new_stream"):
+            vad_processor = vad_processor.new_stream()
+        language = websocket.query_params.get("language")
+        language_lock = None
+        if language and not LanguageDetector.accepts_hint(asr_service):
+            logger.warning(f"ASR service takes no language hint; ignoring language={language}")
+            language = None
+        if language == "auto":
+            language = None
+            if LanguageDetector.supports(asr_service):
+                language_lock = LanguageLock(LanguageDetector(asr_service))
+            else:
+                logger.warning("ASR service cannot detect languages; decoding without a language hint")
+        if capture_store:
+            # Rotation and log creation touch the disk; keep them off the event loop
+            capture = await asyncio.get_running_loop().run_in_executor(
+                None, partial(capture_store.open, language=websocket.query_params.get("language")))
+
+        with ACTIVE_CONNECTIONS.labels("/ws/asr").track():
+            while True:
+                # Receive audio data (time spent waiting on the client for the next frame)
+                with CLIENT_WAIT_SECONDS.labels("/ws/asr").time():
+                    audio_data = await websocket.receive_bytes()
+                received_ms += len(audio_data) / BYTES_PER_MS
+                if capture:
+                    capture.append(audio_data)
+
+                # Check VAD
+                with stage("asr_vad").time():
+                    has_speech = vad_processor.process(audio_data)
 
-            # Check VAD
-            has_speech = vad_processor.process(audio_data)
+                if has_speech:
+                    if language_lock:
+                        language = await language_lock.observe(audio_data)
+                    options = {"language": language} if language else {}
 
-            if has_speech:
-                # Process with ASR
-                async for result in asr_service.transcribe_streaming(audio_data):
-                    await websocket.send_json(result)
+                    # Process with ASR
+                    started = time.perf_counter()
+                    async for result in asr_service.transcribe_streaming(audio_data, **options):
+                        now = time.perf_counter()
+                        stage("asr_decode").observe(now - started)
+                        if quality and result.get("type") == "asr_partial":
+                            # Degraded levels thin out partials; finals always go through
+                            if now - last_partial < quality.level.get("partial_interval_ms", 0) / 1000:
+                                started = now
+                                continue
+                            last_partial = now
+                        result["trace_id"] = trace_id
+                        result["audio_end_ms"] = round(received_ms)
+                        if language_lock:
+                            language_lock.annotate(result)
+                        with stage("asr_send").time():
+                            await websocket.send_json(result)
+                        if result.get("type") == "asr_final":
+                            trace_id = new_trace_id()
+                            if language_lock:
+                                language_lock.check(result.get("confidence"))
+                        started = time.perf_counter()
 
     except WebSocketDisconnect:
         logger.info("Client disconnected from ASR WebSocket")
     except Exception as e:
         logger.error(f"Error in ASR WebSocket: {e}")
         await websocket.close(code=1011)
+    finally:
+        admission.release()
+        if capture:
+            await asyncio.get_running_loop().run_in_executor(None, capture.close)
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
+    from common.server import serve
+    serve(app, "main:app", port=8001, app_dir=str(Path(__file__).resolve().parent))
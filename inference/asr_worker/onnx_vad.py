@@ -0,0 +1,184 @@
+"""Silero VAD on onnxruntime, without torch.
+
+One `InferenceSession` per process is shared by every stream. Input windows,
+recurrent state and the sample-rate scalar are preallocated per batch size and
+reused across calls. Each WebSocket gets its own `VADStream` (recurrent state
+plus a carry buffer for frames shorter than the model window), and
+`score_batch` scores one window from many streams in a single session run.
+
+Handles both Silero ONNX exports: v4 (`input`, `sr`, `h`, `c`) and v5
+(`input`, `state`, `sr`, with 64 samples of left context).
+"""
+import os
+import logging
+import threading
+import importlib.util
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import onnxruntime
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+WINDOW_SAMPLES = 512
+
+
+def default_model_path() -> str:
+    """VAD_ONNX_MODEL, else the model bundled with the silero-vad package (located without importing torch)."""
+    path = os.getenv("VAD_ONNX_MODEL")
+    if path:
+        return path
+    spec = importlib.util.find_spec("silero_vad")
+    if spec and spec.submodule_search_locations:
+        for location in spec.submodule_search_locations:
+            for candidate in (Path(location) / "data" / "silero_vad.onnx", Path(location) / "files" / "silero_vad.onnx"):
+                if candidate.exists():
+                    return str(candidate)
+    raise FileNotFoundError("Silero ONNX model not found; set VAD_ONNX_MODEL")
+
+
+class SileroOnnxModel:
+    def __init__(self, model_path: str, threads: int = 1):
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        self.session = onnxruntime.InferenceSession(model_path, sess_options=options,
+                                                    providers=["CPUExecutionProvider"])
+        inputs = {i.name: i for i in self.session.get_inputs()}
+        self.v5 = "state" in inputs
+        self.state_size = 128 if self.v5 else 64
+        self.context = 64 if self.v5 else 0
+        self.sr = np.array(SAMPLE_RATE, dtype=np.int64)
+        # Per thread, so bulk jobs scoring in an executor never share buffers with live streams
+        self._local = threading.local()
+        logger.info(f"Silero VAD ({'v5' if self.v5 else 'v4'}) loaded from {model_path}")
+
+    def new_state(self) -> np.ndarray:
+        """Recurrent state for one stream; v4's h and c are stacked along the first axis."""
+        return np.zeros((2 if self.v5 else 4, self.state_size), dtype=np.float32)
+
+    def _batch_buffers(self, batch: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        cache: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = self._local.__dict__.setdefault("buffers", {})
+        buffers = cache.get(batch)
+        if buffers is None:
+            window = np.zeros((batch, self.context + WINDOW_SAMPLES), dtype=np.float32)
+            state = np.zeros((2, batch, self.state_size), dtype=np.float32)
+            cell = np.zeros((2, batch, self.state_size), dtype=np.float32)
+            buffers = cache[batch] = (window, state, cell)
+        return buffers
+
+    def run(self, windows: np.ndarray, states: Sequence[np.ndarray]) -> np.ndarray:
+        """Score `windows` [batch, context + 512] in place of each stream's state; returns probabilities."""
+        batch = len(states)
+        _, state, cell = self._batch_buffers(batch)
+        for i, stream_state in enumerate(states):
+            state[:, i] = stream_state[:2]
+            if not self.v5:
+                cell[:, i] = stream_state[2:]
+        if self.v5:
+            probs, new_state = self.session.run(None, {"input": windows, "state": state, "sr": self.sr})
+            for i, stream_state in enumerate(states):
+                stream_state[:] = new_state[:, i]
+        else:
+            probs, h, c = self.session.run(None, {"input": windows, "sr": self.sr, "h": state, "c": cell})
+            for i, stream_state in enumerate(states):
+                stream_state[:2] = h[:, i]
+                stream_state[2:] = c[:, i]
+        return probs[:, 0]
+
+
+class VADStream:
+    """Per-connection VAD state: `process(pcm16_bytes) -> bool`, like VADProcessor."""
+
+    def __init__(self, model: SileroOnnxModel, threshold: float):
+        self.model = model
+        self.threshold = threshold
+        self.state = model.new_state()
+        # context + carried samples + room for one incoming frame of up to a second
+        self.buffer = np.zeros(model.context + WINDOW_SAMPLES + SAMPLE_RATE, dtype=np.float32)
+        self.filled = model.context
+        self.speech = False
+        self.last_prob = 0.0
+
+    def reset(self):
+        self.state[:] = 0
+        self.buffer[:self.model.context] = 0
+        self.filled = self.model.context
+        self.speech = False
+
+    def feed(self, audio_data: bytes):
+        samples = np.frombuffer(audio_data, dtype="<i2", count=len(audio_data) // 2)
+        if self.filled + len(samples) > len(self.buffer):
+            self.buffer = np.concatenate([self.buffer[:self.filled], np.zeros(len(samples), dtype=np.float32)])
+        np.multiply(samples, 1 / 32768, out=self.buffer[self.filled:self.filled + len(samples)], casting="unsafe")
+        self.filled += len(samples)
+
+    def ready(self) -> bool:
+        return self.filled >= self.model.context + WINDOW_SAMPLES
+
+    def window(self) -> np.ndarray:
+        return self.buffer[:self.model.context + WINDOW_SAMPLES]
+
+    def consume(self, prob: float):
+        """Record a window's score and slide the buffer, keeping the model's left context."""
+        self.last_prob = prob
+        self.speech = prob > self.threshold
+        shift = WINDOW_SAMPLES
+        remaining = self.filled - shift
+        self.buffer[:remaining] = self.buffer[shift:self.filled]
+        self.filled = remaining
+
+    def process(self, audio_data: bytes) -> bool:
+        """True if any complete window in this chunk was speech; short chunks repeat the last decision."""
+        self.feed(audio_data)
+        if not self.ready():
+            return self.speech
+        speech = False
+        while self.ready():
+            prob = float(self.model.run(self.window()[np.newaxis], [self.state])[0])
+            self.consume(prob)
+            speech = speech or self.speech
+        return speech
+
+
+class OnnxVADProcessor:
+    """VADProcessor backend (VAD_BACKEND=onnx).
+
+    There is no shared `process()`: a 20ms frame is shorter than the model
+    window, so scoring needs the carry buffer and recurrent state of a
+    `VADStream`. Every caller takes its own from `new_stream()` (the workers
+    and bulk transcription already check for it).
+    """
+
+    def __init__(self, model_path: Optional[str] = None, threshold: Optional[float] = None,
+                 threads: Optional[int] = None):
+        self.model = SileroOnnxModel(
+            model_path or default_model_path(),
+            threads=threads or int(os.getenv("VAD_ONNX_THREADS", "1")),
+        )
+        self.threshold = threshold if threshold is not None else float(os.getenv("VAD_THRESHOLD", "0.5"))
+
+    def new_stream(self) -> VADStream:
+        return VADStream(self.model, self.threshold)
+
+    def score_batch(self, streams: List[VADStream], chunks: List[bytes]) -> List[bool]:
+        """Feed one chunk to each stream and score every complete window across streams in batched runs."""
+        for stream, chunk in zip(streams, chunks):
+            stream.feed(chunk)
+        decisions = [stream.speech for stream in streams]
+        scored = [False] * len(streams)
+        pending = [i for i, stream in enumerate(streams) if stream.ready()]
+        while pending:
+            window, _, _ = self.model._batch_buffers(len(pending))
+            for row, i in enumerate(pending):
+                window[row] = streams[i].window()
+            probs = self.model.run(window, [streams[i].state for i in pending])
+            for row, i in enumerate(pending):
+                streams[i].consume(float(probs[row]))
+                decisions[i] = (scored[i] and decisions[i]) or streams[i].speech
+                scored[i] = True
+            pending = [i for i in pending if streams[i].ready()]
+        return decisions
@@ -0,0 +1,8 @@
+"""Latency benchmark and load-replay suite for the LumaTalk inference workers.
+
+Run from the `inference/` directory:
+
+    python -m benchmarks serve-stubs          # workers with stub engines, fully offline
+    python -m benchmarks run --asr-streams 8 --mt-qps 20 --tts-streams 4 --output run.json
+    python -m benchmarks compare run.json baseline.json
+"""
@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+import platform
+
+from . import audio, drivers, report
+
+
+async def run(args) -> dict:
+    samples = drivers.Samples()
+    speech = audio.load_wav(args.audio) if args.audio else audio.synthetic_speech(args.duration)
+    frames = audio.frames(speech, args.frame_ms)
+
+    tasks = [drivers.asr_stream(f"{args.asr_url}/ws/asr", frames, args.frame_ms, samples)
+             for _ in range(args.asr_streams)]
+    if args.mt_qps > 0:
+        tasks.append(drivers.mt_load(args.mt_url, args.mt_qps, args.duration, samples))
+    tasks += [drivers.tts_client(f"{args.tts_url}/ws/tts", args.duration, samples)
+              for _ in range(args.tts_streams)]
+
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+
+    counters = samples.counters
+    # How much of the sent audio the worker had decoded by the end of the run
+    sent = counters.get("asr_audio_seconds", 0)
+    keep_up = min(1.0, counters.get("asr_processed_seconds", 0) / sent) if sent else 0.0
+    return {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": platform.node(),
+            "asr_streams": args.asr_streams,
+            "mt_qps": args.mt_qps,
+            "tts_streams": args.tts_streams,
+            "audio": args.audio or "synthetic",
+            "wall_seconds": elapsed,
+        },
+        "stages": report.summarize(samples.latencies),
+        "throughput": {
+            "asr_realtime_factor": counters.get("asr_processed_seconds", 0) / elapsed,
+            "asr_keep_up_ratio": keep_up,
+            # Real-time streams the worker sustained (not the number requested), per core
+            "asr_streams_per_core": (args.asr_streams - counters.get("asr_rejected", 0)) * keep_up / args.server_cores,
+            "asr_late_frames": counters.get("asr_late_frames", 0),
+            "asr_rejected": counters.get("asr_rejected", 0),
+            "mt_requests_per_s": counters.get("mt_requests", 0) / args.duration,
+            "mt_errors": counters.get("mt_errors", 0),
+            "tts_utterances_per_s": counters.get("tts_utterances", 0) / args.duration,
+            "tts_rejected": counters.get("tts_rejected", 0),
+        },
+    }
+
+
+def bulk(args) -> str:
+    import io
+    import wave
+
+    import httpx
+
+    if args.audio:
+        with open(args.audio, "rb") as f:
+            data = f.read()
+    else:
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(audio.SAMPLE_RATE)
+            wav.writeframes(audio.synthetic_speech(args.duration))
+        data = buffer.getvalue()
+    started = time.perf_counter()
+    response = httpx.post(f"{args.url}/transcribe", params={"wait": "true"},
+                          files={"file": ("audio.wav", data)}, timeout=None)
+    response.raise_for_status()
+    job = response.json()
+    elapsed = time.perf_counter() - started
+    return (f"{job['duration_s']:.0f}s of audio, {len(job.get('segments', []))} segments in {elapsed:.1f}s "
+            f"({job['duration_s'] / elapsed:.0f}x real time; worker-side {job['realtime_factor']}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="LumaTalk inference benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Drive the workers and report per-stage latency")
+    run_parser.add_argument("--asr-url", default="ws://localhost:8001")
+    run_parser.add_argument("--mt-url", default="http://localhost:8002")
+    run_parser.add_argument("--tts-url", default="ws://localhost:8003")
+    run_parser.add_argument("--asr-streams", type=int, default=4)
+    run_parser.add_argument("--mt-qps", type=float, default=10)
+    run_parser.add_argument("--tts-streams", type=int, default=2)
+    run_parser.add_argument("--duration", type=float, default=30, help="Seconds of load (synthetic audio length)")
+    run_parser.add_argument("--audio", help="Recorded mono 16kHz PCM16 WAV to replay instead of synthetic speech")
+    run_parser.add_argument("--frame-ms", type=int, default=20)
+    run_parser.add_argument("--server-cores", type=int, default=os.cpu_count(),
+                            help="Cores available to the ASR worker, for streams-per-core")
+    run_parser.add_argument("--output", help="Write the run as JSON (usable as a baseline)")
+    run_parser.add_argument("--baseline", help="Compare against a stored run and fail on p95 regressions")
+    run_parser.add_argument("--tolerance", type=float, default=0.10)
+
+    compare_parser = commands.add_parser("compare", help="Compare two stored runs")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("--tolerance", type=float, default=0.10)
+
+    stubs_parser = commands.add_parser("serve-stubs", help="Run the workers offline with stub engines")
+    stubs_parser.add_argument("--workers", nargs="+", default=["asr_worker", "mt_worker", "tts_worker"])
+
+    replay_parser = commands.add_parser("replay", help="Replay captured /ws/asr sessions at their recorded pace")
+    replay_parser.add_argument("captures", nargs="+", help=".lcap files written with ASR_CAPTURE_DIR")
+    replay_parser.add_argument("--asr-url", default="ws://localhost:8001")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="Time compression, e.g. 4 = four times faster")
+    replay_parser.add_argument("--start", type=float, default=0.0, help="Skip the first seconds of each session")
+    replay_parser.add_argument("--all-at-once", action="store_true", help="Start every session immediately")
+    replay_parser.add_argument("--output", help="Write the run as JSON (usable as a baseline)")
+    replay_parser.add_argument("--baseline", help="Compare against a stored run and fail on p95 regressions")
+    replay_parser.add_argument("--tolerance", type=float, default=0.10)
+
+    bulk_parser = commands.add_parser("bulk", help="Time offline transcription of a file through POST /transcribe")
+    bulk_parser.add_argument("--url", default="http://localhost:8001")
+    bulk_parser.add_argument("--audio", help="Mono 16kHz PCM16 WAV (default: synthetic speech)")
+    bulk_parser.add_argument("--duration", type=float, default=600, help="Seconds of synthetic audio")
+
+    startup_parser = commands.add_parser("startup", help="Time each worker from spawn to /health and /ready")
+    startup_parser.add_argument("--workers", nargs="+", default=["asr_worker", "mt_worker", "tts_worker"])
+    startup_parser.add_argument("--real", action="store_true", help="Start the real workers instead of stub engines")
+    startup_parser.add_argument("--timeout", type=float, default=300)
+
+    scaling_parser = commands.add_parser("scaling", help="MT throughput across WORKER_PROCESSES settings")
+    scaling_parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    scaling_parser.add_argument("--concurrency", type=int, default=64, help="Closed-loop clients")
+    scaling_parser.add_argument("--duration", type=float, default=20)
+    scaling_parser.add_argument("--real", action="store_true", help="Start the real worker instead of stub engines")
+    scaling_parser.add_argument("--timeout", type=float, default=300)
+    scaling_parser.add_argument("--cpu-ms", type=float, default=None,
+                                help="Stub CPU time per request (default: STUB_MT_CPU_MS, else 20)")
+
+    args = parser.parse_args()
+
+    if args.command == "bulk":
+        print(bulk(args))
+        return
+
+    if args.command == "startup":
+        from .startup import measure, print_startup
+        print_startup([measure(worker, stubs=not args.real, timeout=args.timeout) for worker in args.workers])
+        return
+
+    if args.command == "scaling":
+        from .scaling import DEFAULT_CPU_MS, measure, print_scaling
+        cpu_ms = DEFAULT_CPU_MS if args.cpu_ms is None else args.cpu_ms
+        print_scaling([measure(n, args.concurrency, args.duration, stubs=not args.real, timeout=args.timeout,
+                               cpu_ms=cpu_ms)
+                       for n in args.processes])
+        return
+
+    if args.command == "serve-stubs":
+        from .serve_stubs import serve
+        serve(args.workers)
+        return
+
+    if args.command == "compare":
+        regressions = report.compare(report.load(args.current), report.load(args.baseline), args.tolerance)
+        sys.exit(1 if regressions else 0)
+
+    if args.command == "replay":
+        from .replay import replay
+        result = asyncio.run(replay(args.captures, args.asr_url, args.speed, args.start, args.all_at_once))
+    else:
+        result = asyncio.run(run(args))
+    report.print_report(result)
+    if args.output:
+        report.save(result, args.output)
+    if args.baseline:
+        print()
+        if report.compare(result, report.load(args.baseline), args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import math
+import wave
+from array import array
+from typing import List
+
+SAMPLE_RATE = 16000  # matches AppConstants.sampleRate in the app
+
+
+def load_wav(path: str) -> bytes:
+    """Mono PCM16 at 16kHz, as the app streams it."""
+    with wave.open(path, "rb") as wav:
+        if wav.getnchannels() != 1 or wav.getsampwidth() != 2 or wav.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path}: expected mono 16-bit {SAMPLE_RATE}Hz audio")
+        return wav.readframes(wav.getnframes())
+
+
+def synthetic_speech(seconds: float, utterance_s: float = 2.5, pause_s: float = 0.8) -> bytes:
+    """Voiced-like bursts separated by silence, so VAD and utterance boundaries get exercised."""
+    samples = array("h")
+    period = utterance_s + pause_s
+    for n in range(int(seconds * SAMPLE_RATE)):
+        t = n / SAMPLE_RATE
+        if t % period < utterance_s:
+            envelope = 0.5 + 0.5 * math.sin(2 * math.pi * 4 * t)  # ~syllable rate
+            value = envelope * (math.sin(2 * math.pi * 180 * t) + 0.5 * math.sin(2 * math.pi * 360 * t))
+            samples.append(int(6000 * value))
+        else:
+            samples.append(0)
+    return samples.tobytes()
+
+
+def frames(audio: bytes, frame_ms: int) -> List[bytes]:
+    frame_bytes = SAMPLE_RATE * 2 * frame_ms // 1000
+    return [audio[i:i + frame_bytes] for i in range(0, len(audio) - frame_bytes + 1, frame_bytes)]
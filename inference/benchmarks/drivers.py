@@ -0,0 +1,163 @@
+import json
+import time
+import bisect
+import random
+import asyncio
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+from .audio import SAMPLE_RATE
+
+SENTENCES = [
+    "Hello, how are you today?",
+    "Could you tell me where the train station is?",
+    "I would like a table for two, please.",
+    "The meeting has been moved to half past ten.",
+    "Thank you very much for your help.",
+    "What time does the museum open tomorrow?",
+]
+
+
+class Samples:
+    """Latency samples (ms) per stage plus simple counters, shared by all drivers of a run."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.counters: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.latencies.setdefault(stage, []).append(seconds * 1000)
+
+    def count(self, name: str, amount: float = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+
+async def asr_stream(url: str, frames: List[bytes], frame_ms: int, samples: Samples,
+                     offsets: Optional[List[float]] = None):
+    """Replay `frames` in real time on one /ws/asr socket.
+
+    Frames go out every `frame_ms`, or at `offsets` (seconds from the start,
+    e.g. captured arrival times) when given. A result's latency is measured
+    from the send time of the frame it covers: the worker tags results with
+    `audio_end_ms` (for a final, the end of the utterance), so a worker that
+    falls behind real time shows its backlog. Results without the tag fall
+    back to the most recently sent frame. The furthest position reached is
+    counted as `asr_processed_seconds`. A stream the worker turns away
+    (`overloaded`, or close code 1013) is counted as `asr_rejected`.
+    """
+    loop = asyncio.get_running_loop()
+    # Stream position (ms) at the end of each sent frame, and when it was sent
+    frame_ends: List[float] = []
+    sent_at: List[float] = []
+    processed_ms = [0.0]
+
+    async with websockets.connect(url, max_size=None) as ws:
+        async def receive():
+            async for message in ws:
+                if isinstance(message, bytes):
+                    continue
+                result = json.loads(message)
+                kind = result.get("type")
+                if kind == "overloaded":
+                    return
+                if kind not in ("asr_partial", "asr_final") or not sent_at:
+                    continue
+                audio_end_ms = result.get("audio_end_ms")
+                if audio_end_ms is None:
+                    samples.add(kind, loop.time() - sent_at[-1])
+                    continue
+                # Positions are rounded to whole ms by the worker
+                index = min(bisect.bisect_left(frame_ends, audio_end_ms - 0.5), len(sent_at) - 1)
+                samples.add(kind, loop.time() - sent_at[index])
+                processed_ms[0] = max(processed_ms[0], audio_end_ms)
+
+        receiver = asyncio.create_task(receive())
+        started = loop.time()
+        position_ms = 0.0
+        try:
+            for index, frame in enumerate(frames):
+                due = offsets[index] if offsets is not None else index * frame_ms / 1000
+                delay = started + due - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                elif delay < -frame_ms / 1000:
+                    samples.count("asr_late_frames")
+                position_ms += len(frame) / 2 / SAMPLE_RATE * 1000
+                frame_ends.append(position_ms)
+                sent_at.append(loop.time())
+                await ws.send(frame)
+                samples.count("asr_audio_seconds", len(frame) / 2 / SAMPLE_RATE)
+            # Let trailing results for the last utterance arrive
+            await asyncio.sleep(1.0)
+        except websockets.ConnectionClosed as e:
+            if not _rejected(e):
+                raise
+            samples.count("asr_rejected")
+        finally:
+            receiver.cancel()
+            await asyncio.gather(receiver, return_exceptions=True)
+            samples.count("asr_processed_seconds", processed_ms[0] / 1000)
+
+
+async def mt_load(base_url: str, qps: float, duration: float, samples: Samples,
+                  source_lang: str = "en", target_lang: str = "es"):
+    """Open-loop /translate load: requests start on a Poisson schedule regardless of completions."""
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        async def one(text: str):
+            started = time.perf_counter()
+            try:
+                response = await client.post("/translate", json={
+                    "text": text, "source_lang": source_lang, "target_lang": target_lang,
+                })
+                response.raise_for_status()
+                samples.add("mt", time.perf_counter() - started)
+                samples.count("mt_requests")
+            except httpx.HTTPError:
+                samples.count("mt_errors")
+
+        tasks = []
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            tasks.append(asyncio.create_task(one(random.choice(SENTENCES))))
+            await asyncio.sleep(random.expovariate(qps))
+        await asyncio.gather(*tasks)
+
+
+async def tts_client(url: str, duration: float, samples: Samples, lang: str = "en"):
+    """Closed-loop /ws/tts client: one utterance at a time, back to back.
+
+    A session the worker turns away is counted as `tts_rejected`.
+    """
+    async with websockets.connect(url, max_size=None) as ws:
+        deadline = time.perf_counter() + duration
+        try:
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                first_audio = None
+                await ws.send(json.dumps({"text": random.choice(SENTENCES), "lang": lang}))
+                async for message in ws:
+                    if isinstance(message, bytes):
+                        if first_audio is None:
+                            first_audio = time.perf_counter()
+                            samples.add("tts_first_audio", first_audio - started)
+                        samples.count("tts_audio_bytes", len(message))
+                        continue
+                    kind = json.loads(message).get("type")
+                    if kind == "overloaded":
+                        samples.count("tts_rejected")
+                        return
+                    if kind == "tts_complete":
+                        break
+                samples.add("tts_total", time.perf_counter() - started)
+                samples.count("tts_utterances")
+        except websockets.ConnectionClosed as e:
+            if not _rejected(e):
+                raise
+            samples.count("tts_rejected")
+
+
+def _rejected(error: websockets.ConnectionClosed) -> bool:
+    """Closed with 1013 Try Again Later: turned away at admission (or engines still loading)."""
+    return error.rcvd is not None and error.rcvd.code == 1013
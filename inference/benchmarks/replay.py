@@ -0,0 +1,56 @@
+"""Replay captured /ws/asr sessions (ASR_CAPTURE_DIR logs) against a worker.
+
+Each session's frames go out at their recorded arrival times, divided by
+`speed`. Sessions start at their recorded offsets from the earliest one (also
+divided by `speed`), so concurrency and burstiness follow production.
+"""
+import time
+import asyncio
+import platform
+from typing import List
+from urllib.parse import urlencode
+
+from common.capture import CaptureReader
+
+from . import drivers, report
+
+
+async def replay(paths: List[str], asr_url: str, speed: float = 1.0, start_s: float = 0.0,
+                 all_at_once: bool = False) -> dict:
+    samples = drivers.Samples()
+    sessions = sorted((CaptureReader(path) for path in paths), key=lambda r: r.header["started_at"])
+    first = sessions[0].header["started_at"] if sessions else 0.0
+
+    async def one(reader: CaptureReader):
+        records = list(reader.records(start_s))
+        if not records:
+            return
+        if not all_at_once:
+            await asyncio.sleep((reader.header["started_at"] - first) / speed)
+        base = records[0][0]
+        offsets = [(arrival - base) / speed for arrival, _ in records]
+        query = {"language": reader.header["language"]} if reader.header.get("language") else {}
+        url = f"{asr_url}/ws/asr" + (f"?{urlencode(query)}" if query else "")
+        # frame_ms only sets the lateness tolerance here; pacing follows the offsets
+        await drivers.asr_stream(url, [frame for _, frame in records], 20, samples, offsets=offsets)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(reader) for reader in sessions))
+    elapsed = time.perf_counter() - started
+
+    counters = samples.counters
+    return {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "host": platform.node(),
+            "captures": len(sessions),
+            "speed": speed,
+            "wall_seconds": elapsed,
+        },
+        "stages": report.summarize(samples.latencies),
+        "throughput": {
+            "asr_realtime_factor": counters.get("asr_audio_seconds", 0) / elapsed,
+            "asr_late_frames": counters.get("asr_late_frames", 0),
+            "asr_rejected": counters.get("asr_rejected", 0),
+        },
+    }
@@ -0,0 +1,71 @@
+import json
+import math
+from typing import Dict, List
+
+# Latency targets from the README (milliseconds)
+TARGETS_MS = {
+    "asr_partial": 300,
+    "asr_final": 800,
+    "mt": 400,
+    "tts_first_audio": 500,
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples_ms: Dict[str, List[float]]) -> Dict[str, dict]:
+    stages = {}
+    for stage, values in samples_ms.items():
+        summary = {
+            "count": len(values),
+            "p50": percentile(values, 50),
+            "p95": percentile(values, 95),
+            "p99": percentile(values, 99),
+        }
+        if stage in TARGETS_MS:
+            summary["target_ms"] = TARGETS_MS[stage]
+            summary["meets_target"] = bool(values) and summary["p95"] <= TARGETS_MS[stage]
+        stages[stage] = summary
+    return stages
+
+
+def print_report(result: dict):
+    print(f"{'stage':<18}{'count':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'target':>10}")
+    for stage, s in result["stages"].items():
+        target = f"{s['target_ms']}{'' if s.get('meets_target') else ' !'}" if "target_ms" in s else ""
+        print(f"{stage:<18}{s['count']:>8}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}{target:>10}")
+    print()
+    for name, value in result["throughput"].items():
+        print(f"{name:<28}{value:>12.2f}")
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.10) -> List[str]:
+    """Stages whose p95 regressed by more than `tolerance` against the baseline."""
+    regressions = []
+    for stage, s in current["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if not base or not base["count"] or not s["count"]:
+            continue
+        change = (s["p95"] - base["p95"]) / base["p95"]
+        marker = "REGRESSION" if change > tolerance else ""
+        print(f"{stage:<18} p95 {base['p95']:>8.1f} -> {s['p95']:>8.1f}ms ({change:+.1%}) {marker}")
+        if change > tolerance:
+            regressions.append(stage)
+    return regressions
+
+
+def save(result: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,84 @@
+"""MT throughput as WORKER_PROCESSES grows: one closed-loop run per process count."""
+import os
+import time
+import asyncio
+import subprocess
+
+import httpx
+
+from . import report
+from .serve_stubs import PORTS
+from .startup import _command
+
+# Stub CPU time per request; with none, the stub only sleeps and extra processes have nothing to scale
+DEFAULT_CPU_MS = float(os.getenv("STUB_MT_CPU_MS", "20"))
+
+
+def _wait_ready(base: str, process: subprocess.Popen, timeout: float):
+    deadline = time.perf_counter() + timeout
+    with httpx.Client(timeout=1.0) as client:
+        while time.perf_counter() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"worker exited with code {process.returncode}")
+            try:
+                if client.get(f"{base}/ready").status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            time.sleep(0.05)
+    raise RuntimeError("worker did not become ready")
+
+
+async def closed_loop(base: str, concurrency: int, duration: float) -> dict:
+    """`concurrency` clients each POST /translate back to back for `duration` seconds."""
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(client: httpx.AsyncClient, index: int):
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.post(f"{base}/translate", json={
+                    "text": f"Scaling request {index}", "source_lang": "en", "target_lang": "es"})
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+            except httpx.HTTPError:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=30.0, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "requests_per_s": len(latencies) / elapsed,
+        "errors": errors,
+        "p50_ms": report.percentile(latencies, 50),
+        "p95_ms": report.percentile(latencies, 95),
+    }
+
+
+def measure(processes: int, concurrency: int, duration: float, stubs: bool = True, timeout: float = 300.0,
+            cpu_ms: float = DEFAULT_CPU_MS) -> dict:
+    command, cwd = _command("mt_worker", stubs)
+    base = f"http://127.0.0.1:{PORTS['mt_worker']}"
+    env = {**os.environ, "WORKER_PROCESSES": str(processes), "STUB_MT_CPU_MS": str(cpu_ms)}
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(base, process, timeout)
+        # With several processes /ready answers once the first child is up; give the rest a moment
+        time.sleep(1.0 if processes > 1 else 0)
+        return {"processes": processes, **asyncio.run(closed_loop(base, concurrency, duration))}
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def print_scaling(results):
+    print(f"{'processes':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+    base = results[0]["requests_per_s"] if results else 0
+    for result in results:
+        speedup = f"  x{result['requests_per_s'] / base:.2f}" if base else ""
+        print(f"{result['processes']:>9} {result['requests_per_s']:>9.1f} {result['p50_ms']:>9.1f} "
+              f"{result['p95_ms']:>9.1f} {result['errors']:>7}{speedup}")
@@ -0,0 +1,64 @@
+import os
+import sys
+import runpy
+import signal
+import subprocess
+from pathlib import Path
+
+INFERENCE_ROOT = Path(__file__).resolve().parent.parent
+STUBS = Path(__file__).resolve().parent / "stubs"
+PORTS = {"asr_worker": 8001, "mt_worker": 8002, "tts_worker": 8003}
+
+
+def load_worker_app(worker: str):
+    """Execute one worker's real main.py with the stub engines shadowing its service modules."""
+    sys.path.insert(0, str(INFERENCE_ROOT))
+    sys.path.insert(0, str(INFERENCE_ROOT / worker))
+    # main.py imports the engines as top-level modules (asr_service, tts_service, ...)
+    sys.path.insert(0, str(STUBS))
+    namespace = runpy.run_path(str(INFERENCE_ROOT / worker / "main.py"), run_name="stub_main")
+    return namespace["app"]
+
+
+def stub_app():
+    """App factory for the server processes; STUB_WORKER names the worker."""
+    return load_worker_app(os.environ["STUB_WORKER"])
+
+
+def run_worker(worker: str):
+    # Same launcher as production, so WORKER_PROCESSES etc. apply to stub runs too
+    sys.path.insert(0, str(INFERENCE_ROOT))
+    from common.server import serve as serve_app
+
+    os.environ["STUB_WORKER"] = worker
+    os.environ.setdefault("WORKER_HOST", "127.0.0.1")
+    os.environ.setdefault("WORKER_LOG_LEVEL", "warning")
+    serve_app(stub_app, "benchmarks.serve_stubs:stub_app", PORTS[worker], app_dir=str(INFERENCE_ROOT), factory=True)
+
+
+def serve(workers):
+    processes = [
+        subprocess.Popen([sys.executable, "-m", "benchmarks.serve_stubs", worker], cwd=INFERENCE_ROOT)
+        for worker in workers
+    ]
+    print(", ".join(f"{worker} on :{PORTS[worker]}" for worker in workers) + " (stub engines, Ctrl-C to stop)")
+
+    def stop(*_):
+        # Forward the stop to every worker so none is orphaned holding its port
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGHUP, stop)
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        stop()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    run_worker(sys.argv[1])
@@ -0,0 +1,56 @@
+"""Worker cold-start timing: process spawn -> /health (server bound) -> /ready (engines loaded)."""
+import sys
+import time
+import subprocess
+
+import httpx
+
+from .serve_stubs import INFERENCE_ROOT, PORTS
+
+
+def _command(worker: str, stubs: bool):
+    if stubs:
+        return [sys.executable, "-m", "benchmarks.serve_stubs", worker], INFERENCE_ROOT
+    return [sys.executable, "main.py"], INFERENCE_ROOT / worker
+
+
+def measure(worker: str, stubs: bool = True, timeout: float = 300.0) -> dict:
+    command, cwd = _command(worker, stubs)
+    base = f"http://127.0.0.1:{PORTS[worker]}"
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    result = {"worker": worker, "health_s": None, "ready_s": None, "engines": {}}
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    result["error"] = f"exited with code {process.returncode}"
+                    break
+                try:
+                    if result["health_s"] is None:
+                        if client.get(f"{base}/health").status_code == 200:
+                            result["health_s"] = time.perf_counter() - started
+                    response = client.get(f"{base}/ready")
+                    if response.status_code == 200:
+                        result["ready_s"] = time.perf_counter() - started
+                        result["engines"] = response.json().get("engines", {})
+                        break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+            else:
+                result["error"] = "timed out"
+    finally:
+        process.terminate()
+        process.wait()
+    return result
+
+
+def print_startup(results):
+    print(f"{'worker':<12} {'health':>9} {'ready':>9}  engines")
+    for result in results:
+        health = f"{result['health_s']:.2f}s" if result["health_s"] is not None else "-"
+        ready = f"{result['ready_s']:.2f}s" if result["ready_s"] is not None else "-"
+        engines = ", ".join(f"{name} {status.get('load_seconds', 0):.2f}s"
+                            for name, status in result["engines"].items())
+        print(f"{result['worker']:<12} {health:>9} {ready:>9}  {engines or result.get('error', '')}")
@@ -0,0 +1,32 @@
+"""Stand-in engines for offline benchmarking.
+
+Each module mirrors the interface the worker's main.py imports and simulates
+the model/cloud cost with configurable latency and CPU time, so the real
+worker code paths run without GPUs, model downloads or API keys. The
+modules are imported top-level (`import asr_service`) exactly like the real
+ones; `serve_stubs` puts this directory first on sys.path.
+"""
+import os
+import time
+import asyncio
+
+
+def env_ms(name: str, default: float) -> float:
+    return float(os.getenv(name, default)) / 1000
+
+
+def simulate_import(engine: str):
+    """Stand in for importing torch/transformers/SDKs (STUB_<ENGINE>_IMPORT_MS)."""
+    time.sleep(env_ms(f"STUB_{engine}_IMPORT_MS", 0))
+
+
+async def simulate_initialize(engine: str):
+    """Stand in for loading model weights (STUB_<ENGINE>_INIT_MS)."""
+    await asyncio.sleep(env_ms(f"STUB_{engine}_INIT_MS", 0))
+
+
+def burn_cpu(seconds: float):
+    """Spin for `seconds` of CPU time to model compute-bound decoding."""
+    deadline = time.thread_time() + seconds
+    while time.thread_time() < deadline:
+        pass
@@ -0,0 +1,40 @@
+import os
+import random
+import asyncio
+
+from benchmarks.stubs import burn_cpu, env_ms, simulate_import, simulate_initialize
+
+simulate_import("ASR")
+
+DECODE_S = env_ms("STUB_ASR_DECODE_MS", 8)
+CPU_S = env_ms("STUB_ASR_CPU_MS", 2)
+FINAL_EVERY = int(os.getenv("STUB_ASR_FINAL_EVERY", "100"))
+LID_S = env_ms("STUB_ASR_LID_MS", 40)
+LID_LANGUAGE = os.getenv("STUB_ASR_LID_LANGUAGE", "en")
+WORDS = "the quick brown fox jumps over the lazy dog".split()
+
+
+class ASRService:
+    def __init__(self):
+        self.cost = 1.0
+
+    async def initialize(self):
+        await simulate_initialize("ASR")
+
+    def apply_quality(self, level: dict):
+        # Decode cost scales with the beam size (5 at full quality)
+        self.cost = level.get("beam_size", 5) / 5
+
+    def detect_language(self, audio):
+        # Confidence grows with the amount of speech seen, like whisper's detector
+        burn_cpu(LID_S)
+        return LID_LANGUAGE, min(0.99, 0.5 + len(audio) / 16000 * 0.2)
+
+    async def transcribe_streaming(self, audio_data: bytes, **kwargs):
+        burn_cpu(CPU_S * self.cost)
+        await asyncio.sleep(DECODE_S * self.cost)
+        text = " ".join(random.sample(WORDS, 5))
+        if random.randrange(FINAL_EVERY) == 0:
+            yield {"type": "asr_final", "text": text, "confidence": 0.95}
+        else:
+            yield {"type": "asr_partial", "text": text, "confidence": 0.9}
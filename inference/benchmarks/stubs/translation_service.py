@@ -0,0 +1,31 @@
+import asyncio
+
+from benchmarks.stubs import burn_cpu, env_ms, simulate_import, simulate_initialize
+
+simulate_import("MT")
+
+API_S = env_ms("STUB_MT_MS", 120)
+# CPU time per request, for local-model (CPU-bound) translation
+CPU_S = env_ms("STUB_MT_CPU_MS", 0)
+
+
+class TranslationService:
+    def __init__(self):
+        self.cost = 1.0
+
+    async def initialize(self):
+        await simulate_initialize("MT")
+
+    def apply_quality(self, level: dict):
+        # Decode cost scales with the beam count (4 at full quality)
+        self.cost = level.get("num_beams", 4) / 4
+
+    async def translate(self, text: str, source_lang: str, target_lang: str, **kwargs):
+        burn_cpu(CPU_S * self.cost)
+        await asyncio.sleep(API_S * self.cost)
+        return {
+            "translated_text": f"[{target_lang}] {text}",
+            "source_lang": source_lang,
+            "target_lang": target_lang,
+            "confidence": 0.9,
+        }
@@ -0,0 +1,24 @@
+import asyncio
+
+from audio_format import PCM16, AudioFormat
+from benchmarks.stubs import env_ms, simulate_import, simulate_initialize
+
+simulate_import("TTS")
+
+FIRST_CHUNK_S = env_ms("STUB_TTS_FIRST_CHUNK_MS", 150)
+CHUNK_S = env_ms("STUB_TTS_CHUNK_MS", 20)
+CHUNK = bytes(3200)  # 100ms of 16kHz PCM16 silence
+
+
+class TTSService:
+    output_format = AudioFormat(PCM16, 16000)
+
+    async def initialize(self):
+        await simulate_initialize("TTS")
+
+    async def synthesize_streaming(self, text: str, lang: str, voice=None):
+        await asyncio.sleep(FIRST_CHUNK_S)
+        # Roughly 60ms of audio per character, as a real voice would produce
+        for _ in range(max(1, len(text) * 60 // 100)):
+            yield CHUNK
+            await asyncio.sleep(CHUNK_S)
@@ -0,0 +1,125 @@
+"""Local fake of the cloud TTS streaming APIs (Azure and ElevenLabs).
+
+Point the TTS worker at it with the `=URL` override, adding a behaviour
+segment to the URL to script a backend:
+
+    TTS_UPSTREAMS=azure:a=http://127.0.0.1:9100/fail,azure:b=http://127.0.0.1:9100
+
+Behaviours: `ok` (the default), `fail` (HTTP 500 before any audio),
+`slow-<ms>` (first chunk after <ms>) and `drop` (one chunk, then the
+connection breaks). Only raw PCM16 output formats are accepted. Every
+synthesis request is logged and served back at `GET /_requests`; the client
+port of every request, warm-up probes included, at `GET /_connections`.
+
+Usage: python -m benchmarks.stubs.tts_upstream [--port 9100]
+"""
+import re
+import asyncio
+import argparse
+
+import numpy as np
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+
+from benchmarks.stubs import env_ms
+
+FIRST_CHUNK_S = env_ms("STUB_UPSTREAM_FIRST_CHUNK_MS", 50)
+CHUNK_S = env_ms("STUB_UPSTREAM_CHUNK_MS", 10)
+CHUNK_MS = 100
+
+_AZURE_FORMAT = re.compile(r"raw-(\d+)(khz|hz)-16bit-mono-pcm")
+_VOICE = re.compile(r"<voice name='([^']*)'>(.*)</voice>", re.DOTALL)
+
+app = FastAPI(title="Fake TTS upstream")
+requests_log = []
+connections_log = []
+
+
+def _parse(path: str):
+    """(behaviour, api, voice) from a request path such as `slow-500/v1/text-to-speech/abc/stream`."""
+    segments = [segment for segment in path.split("/") if segment]
+    behaviour = "ok"
+    if segments and segments[0] not in ("cognitiveservices", "v1"):
+        behaviour = segments.pop(0)
+    if segments[:2] == ["cognitiveservices", "v1"]:
+        return behaviour, "azure", None
+    if segments[:2] == ["v1", "text-to-speech"] and len(segments) >= 3:
+        return behaviour, "elevenlabs", segments[2]
+    return behaviour, None, None
+
+
+def _sample_rate(request: Request, api: str):
+    if api == "azure":
+        match = _AZURE_FORMAT.fullmatch(request.headers.get("X-Microsoft-OutputFormat", ""))
+        if match:
+            rate = int(match.group(1))
+            return rate * 1000 if match.group(2) == "khz" else rate
+        return None
+    output_format = request.query_params.get("output_format", "")
+    return int(output_format[4:]) if output_format.startswith("pcm_") else None
+
+
+def _tone(sample_rate: int, seconds: float) -> bytes:
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    return (4000 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+
+
+@app.get("/_requests")
+async def logged_requests():
+    return requests_log
+
+
+@app.get("/_connections")
+async def logged_connections():
+    return connections_log
+
+
+@app.api_route("/{path:path}", methods=["GET", "HEAD", "POST"])
+async def synthesize(path: str, request: Request):
+    connections_log.append(request.client.port)
+    behaviour, api, voice = _parse(path)
+    if request.method != "POST" or api is None:
+        # Warm-up probes and anything else
+        return Response(status_code=404)
+
+    body = await request.body()
+    if api == "azure":
+        match = _VOICE.search(body.decode("utf-8"))
+        voice, text = (match.group(1), match.group(2)) if match else (None, "")
+    else:
+        text = (await request.json()).get("text", "")
+    sample_rate = _sample_rate(request, api)
+    requests_log.append({"behaviour": behaviour, "api": api, "voice": voice, "sample_rate": sample_rate})
+
+    if sample_rate is None:
+        return Response("Only raw PCM16 output is supported", status_code=400)
+    if behaviour == "fail":
+        return Response("Scripted failure", status_code=500)
+
+    first_chunk_s = float(behaviour[5:]) / 1000 if behaviour.startswith("slow-") else FIRST_CHUNK_S
+    # Roughly 60ms of audio per character, streamed in 100ms chunks
+    chunk = _tone(sample_rate, CHUNK_MS / 1000)
+    chunks = max(1, len(text) * 60 // CHUNK_MS)
+
+    async def stream():
+        await asyncio.sleep(first_chunk_s)
+        for i in range(chunks):
+            yield chunk
+            if behaviour == "drop":
+                raise ConnectionResetError("Scripted connection drop")
+            await asyncio.sleep(CHUNK_S)
+
+    return StreamingResponse(stream(), media_type="application/octet-stream")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Fake cloud TTS streaming server")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+from array import array
+
+from benchmarks.stubs import burn_cpu, env_ms, simulate_import
+
+simulate_import("VAD")
+
+CPU_S = env_ms("STUB_VAD_CPU_MS", 0.1)
+
+
+class VADProcessor:
+    def __init__(self, threshold: int = 500):
+        self.threshold = threshold
+
+    def process(self, audio_data: bytes) -> bool:
+        burn_cpu(CPU_S)
+        samples = array("h", audio_data[:len(audio_data) & ~1])
+        return bool(samples) and max(map(abs, samples)) > self.threshold
@@ -0,0 +1 @@
+"""Code shared by the inference workers (importable as `common` from each worker)."""
@@ -0,0 +1,147 @@
+"""Capacity reporting and admission control.
+
+Each worker publishes `GET /load` (live streams, queue depths, recent p95 per
+stage and an estimated remaining capacity) so a router can pick the least
+loaded instance, and turns away new sessions once it is full instead of
+slowing every stream that is already running.
+"""
+import os
+import logging
+from typing import Optional, Sequence
+
+from fastapi import APIRouter, WebSocket
+
+from common.instrumentation import QUEUE_DEPTH, REGISTRY, STAGE_SECONDS, Counter, stage
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "lumatalk_admission_rejected",
+    "New sessions turned away because the worker was at capacity",
+    ("endpoint",),
+))
+
+
+class AdmissionController:
+    """Counts admitted sessions on one endpoint and decides whether another fits.
+
+    The worker is full when `max_streams` sessions are open, or when the p95
+    of `latency_stage` over the last `latency_window_s` seconds is over
+    `latency_budget_ms` while anything is running. An idle worker, or one
+    whose open sessions are silent, stops being judged by a past spike once
+    it ages out of the window. Either limit may be 0 to disable it.
+    """
+
+    def __init__(self, endpoint: str, max_streams: int = 0, latency_stage: Optional[str] = None,
+                 latency_budget_ms: float = 0, retry_after_s: float = 5, overflow_url: Optional[str] = None,
+                 latency_window_s: float = 30):
+        self.endpoint = endpoint
+        self.max_streams = max_streams
+        self.latency_stage = latency_stage
+        self.latency_budget_ms = latency_budget_ms
+        self.latency_window_s = latency_window_s
+        self.retry_after_s = retry_after_s
+        self.overflow_url = overflow_url
+        self.active = 0
+
+    @classmethod
+    def from_env(cls, prefix: str, endpoint: str, latency_stage: Optional[str] = None) -> "AdmissionController":
+        """Read <PREFIX>_MAX_STREAMS, _LATENCY_BUDGET_MS, _LATENCY_WINDOW_S, _RETRY_AFTER_S and _OVERFLOW_URL."""
+        return cls(
+            endpoint,
+            max_streams=int(os.getenv(f"{prefix}_MAX_STREAMS", "0")),
+            latency_stage=latency_stage,
+            latency_budget_ms=float(os.getenv(f"{prefix}_LATENCY_BUDGET_MS", "0")),
+            latency_window_s=float(os.getenv(f"{prefix}_LATENCY_WINDOW_S", "30")),
+            retry_after_s=float(os.getenv(f"{prefix}_RETRY_AFTER_S", "5")),
+            overflow_url=os.getenv(f"{prefix}_OVERFLOW_URL") or None,
+        )
+
+    def p95_ms(self) -> Optional[float]:
+        if not self.latency_stage:
+            return None
+        p95 = stage(self.latency_stage).percentile(95, window_s=self.latency_window_s)
+        return p95 * 1000 if p95 is not None else None
+
+    def over_budget(self) -> bool:
+        if not self.latency_budget_ms or not self.active:
+            return False
+        p95 = self.p95_ms()
+        return p95 is not None and p95 > self.latency_budget_ms
+
+    def remaining(self) -> Optional[int]:
+        """Sessions that still fit, or None when no limit is configured."""
+        if self.over_budget():
+            return 0
+        if self.max_streams:
+            return max(0, self.max_streams - self.active)
+        p95 = self.p95_ms()
+        if self.latency_budget_ms and self.active and p95:
+            # Assume latency grows roughly linearly with concurrent sessions
+            return max(0, int(self.active * self.latency_budget_ms / p95) - self.active)
+        return None
+
+    def acquire(self):
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+
+    def try_admit(self) -> bool:
+        """Take a slot if one is free; the caller must `release()` when the session ends."""
+        if self.max_streams and self.active >= self.max_streams or self.over_budget():
+            ADMISSION_REJECTED.labels(self.endpoint).inc()
+            return False
+        self.acquire()
+        return True
+
+    async def reject(self, websocket: WebSocket):
+        """Tell an accepted socket when (or where) to retry, then close it with 1013 Try Again Later."""
+        logger.warning(f"Rejecting {self.endpoint} session: {self.active} active, p95 {self.p95_ms()}ms")
+        message = {"type": "overloaded", "retry_after_s": self.retry_after_s}
+        if self.overflow_url:
+            message["redirect_url"] = self.overflow_url
+        await websocket.send_json(message)
+        await websocket.close(code=1013, reason="overloaded")
+
+    def status(self) -> dict:
+        p95 = self.p95_ms()
+        return {
+            "active": self.active,
+            "max_streams": self.max_streams or None,
+            "remaining": self.remaining(),
+            "p95_ms": round(p95, 1) if p95 is not None else None,
+            "latency_budget_ms": self.latency_budget_ms or None,
+        }
+
+
+def load_router(service: str, controllers: Sequence[AdmissionController],
+                window_s: Optional[float] = None) -> APIRouter:
+    """`/load`: cheap snapshot for load-aware routing; computed from in-memory counters only.
+
+    Stage p95s cover the last `window_s` seconds, by default the controllers'
+    latency window, so a router sees the same p95 that admission acts on.
+    """
+    router = APIRouter()
+    if window_s is None:
+        window_s = max((controller.latency_window_s for controller in controllers), default=None)
+
+    @router.get("/load")
+    async def load():
+        endpoints = {controller.endpoint: controller.status() for controller in controllers}
+        remaining = [status["remaining"] for status in endpoints.values() if status["remaining"] is not None]
+        p95_ms = {}
+        for (name,), child in STAGE_SECONDS.items():
+            p95 = child.percentile(95, window_s=window_s)
+            if p95 is not None:
+                p95_ms[name] = round(p95 * 1000, 1)
+        return {
+            "service": service,
+            "accepting": all(value > 0 for value in remaining),
+            "remaining_capacity": min(remaining) if remaining else None,
+            "endpoints": endpoints,
+            "queues": {name: child.get() for (name,), child in QUEUE_DEPTH.items()},
+            "p95_ms": p95_ms,
+        }
+
+    return router
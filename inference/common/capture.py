@@ -0,0 +1,194 @@
+"""Memory-mapped session capture logs.
+
+One file per captured session, preallocated to a fixed size and written
+through an mmap, so capturing a frame is a struct pack plus a memcpy with no
+syscalls on the hot path. Layout:
+
+    b"LTCAP1\\0\\0" | u32 header length | JSON header | records...
+    record: u64 arrival ns since session start | u32 length | payload
+
+A zero-length record marks the end of the data, so a log cut off by a crash
+still reads back. On close the file is truncated to the bytes used and a
+sidecar `.idx` (u64 arrival ns, u64 file offset, one entry per second of
+arrivals) is written for seeking. `CaptureStore` enforces a total size budget
+by deleting the oldest finished logs; logs still being written are never
+rotated out (mmap writes do not move their mtime, so age alone would pick them).
+"""
+import os
+import json
+import mmap
+import time
+import uuid
+import random
+import struct
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"LTCAP1\0\0"
+RECORD = struct.Struct("<QI")
+INDEX_ENTRY = struct.Struct("<QQ")
+INDEX_INTERVAL_NS = 1_000_000_000
+
+
+class CaptureLog:
+    def __init__(self, path: Path, max_bytes: int, header: dict,
+                 on_close: Optional[Callable[[Path], None]] = None):
+        self.path = path
+        self._on_close = on_close
+        self.started_ns = time.monotonic_ns()
+        header = {**header, "started_at": time.time()}
+        encoded = json.dumps(header).encode()
+        self._file = open(path, "w+b")
+        self._file.truncate(max_bytes)
+        self._map = mmap.mmap(self._file.fileno(), max_bytes)
+        self._map[:len(MAGIC)] = MAGIC
+        struct.pack_into("<I", self._map, len(MAGIC), len(encoded))
+        start = len(MAGIC) + 4
+        self._map[start:start + len(encoded)] = encoded
+        self.offset = start + len(encoded)
+        self.records = 0
+        self.full = False
+        self._index: List[Tuple[int, int]] = []
+        self._next_index_ns = 0
+
+    def append(self, payload: bytes, arrival_ns: Optional[int] = None) -> bool:
+        """Record one frame; returns False (and stops capturing) once the file is full."""
+        if self.full or not payload:
+            return not self.full
+        elapsed = (arrival_ns or time.monotonic_ns()) - self.started_ns
+        end = self.offset + RECORD.size + len(payload)
+        # Keep room for the zero terminator record
+        if end + RECORD.size > len(self._map):
+            self.full = True
+            logger.warning(f"Capture {self.path.name} reached its size limit; later frames are not captured")
+            return False
+        if elapsed >= self._next_index_ns:
+            self._index.append((elapsed, self.offset))
+            self._next_index_ns = elapsed + INDEX_INTERVAL_NS
+        RECORD.pack_into(self._map, self.offset, elapsed, len(payload))
+        self._map[self.offset + RECORD.size:end] = payload
+        self.offset = end
+        self.records += 1
+        return True
+
+    def close(self):
+        """Flush, truncate and write the index: blocking file I/O, so async callers
+        run it in an executor."""
+        try:
+            self._map.flush()
+            self._map.close()
+            self._file.truncate(self.offset + RECORD.size)
+            self._file.close()
+            with open(self.path.with_suffix(".idx"), "wb") as index:
+                for entry in self._index:
+                    index.write(INDEX_ENTRY.pack(*entry))
+        finally:
+            if self._on_close:
+                self._on_close(self.path)
+
+
+class CaptureStore:
+    """Hands out logs for new sessions under `directory` within a size budget.
+
+    Configured by ASR_CAPTURE_DIR (unset = capture off), ASR_CAPTURE_FRACTION
+    (share of sessions captured), ASR_CAPTURE_SESSION_MB (per-session cap) and
+    ASR_CAPTURE_MAX_MB (total; the oldest logs are rotated out).
+    """
+
+    def __init__(self, directory: str, fraction: float = 1.0, session_mb: float = 64, max_mb: float = 2048):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fraction = fraction
+        self.session_bytes = int(session_mb * 1024 * 1024)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        # Logs handed out and not yet closed; opening and closing happen on executor threads
+        self._open = set()
+        self._lock = threading.Lock()
+        # Serializes rotation with creation, so concurrent opens each see the others' logs
+        self._rotate_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["CaptureStore"]:
+        directory = os.getenv("ASR_CAPTURE_DIR")
+        if not directory:
+            return None
+        return cls(
+            directory,
+            fraction=float(os.getenv("ASR_CAPTURE_FRACTION", "1.0")),
+            session_mb=float(os.getenv("ASR_CAPTURE_SESSION_MB", "64")),
+            max_mb=float(os.getenv("ASR_CAPTURE_MAX_MB", "2048")),
+        )
+
+    def open(self, **header) -> Optional[CaptureLog]:
+        """A new log for one session, or None if this session is not sampled."""
+        if random.random() >= self.fraction:
+            return None
+        session_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        path = self.directory / f"{session_id}.lcap"
+        with self._rotate_lock:
+            self._rotate()
+            with self._lock:
+                self._open.add(path)
+            try:
+                return CaptureLog(path, self.session_bytes, {"session_id": session_id, **header},
+                                  on_close=self._closed)
+            except Exception:
+                self._closed(path)
+                raise
+
+    def _closed(self, path: Path):
+        with self._lock:
+            self._open.discard(path)
+
+    def _rotate(self):
+        with self._lock:
+            open_paths = set(self._open)
+        logs = sorted(self.directory.glob("*.lcap"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in logs)
+        # Make room for a full-size new session; open logs count towards the budget but stay
+        closed = [p for p in logs if p not in open_paths]
+        while closed and total + self.session_bytes > self.max_bytes:
+            oldest = closed.pop(0)
+            total -= oldest.stat().st_size
+            oldest.unlink(missing_ok=True)
+            oldest.with_suffix(".idx").unlink(missing_ok=True)
+
+
+class CaptureReader:
+    def __init__(self, path: str):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a capture log")
+        (header_len,) = struct.unpack_from("<I", self._data, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self._data[start:start + header_len])
+        self.data_offset = start + header_len
+
+    def index(self) -> List[Tuple[int, int]]:
+        index_path = self.path.with_suffix(".idx")
+        if not index_path.exists():
+            return []
+        data = index_path.read_bytes()
+        return [INDEX_ENTRY.unpack_from(data, i) for i in range(0, len(data), INDEX_ENTRY.size)]
+
+    def records(self, start_s: float = 0.0) -> Iterator[Tuple[float, bytes]]:
+        """(arrival seconds since session start, frame) pairs, optionally from `start_s` on."""
+        offset = self.data_offset
+        for elapsed_ns, entry_offset in self.index():
+            if elapsed_ns > start_s * 1e9:
+                break
+            offset = entry_offset
+        while offset + RECORD.size <= len(self._data):
+            elapsed_ns, length = RECORD.unpack_from(self._data, offset)
+            if length == 0:
+                return
+            offset += RECORD.size
+            if elapsed_ns >= start_s * 1e9:
+                yield elapsed_ns / 1e9, self._data[offset:offset + length]
+            offset += length
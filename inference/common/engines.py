@@ -0,0 +1,114 @@
+"""Background-loaded inference engines.
+
+Workers register each heavy engine (torch/transformers/cloud SDK imports plus
+model initialization) as a `LazyEngine` instead of importing it at module
+level. The HTTP server binds immediately, `/health` answers without touching
+any engine, and `/ready` reports per-engine load progress.
+"""
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+class EngineNotReady(RuntimeError):
+    pass
+
+
+class LazyEngine:
+    """One engine whose import and construction run in a thread, then `initialize()` on the loop.
+
+    `factory` does the heavy imports itself and returns the engine object;
+    if the object has an async `initialize()` it is awaited afterwards.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.state = "pending"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self._instance = None
+        self._ready = asyncio.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def get(self) -> Any:
+        if not self.ready:
+            raise EngineNotReady(f"{self.name} engine is {self.state}")
+        return self._instance
+
+    async def wait(self, timeout: Optional[float] = None) -> Any:
+        await asyncio.wait_for(self._ready.wait(), timeout)
+        return self.get()
+
+    async def load(self):
+        self.started_at = time.perf_counter()
+        try:
+            self.state = "importing"
+            instance = await asyncio.get_running_loop().run_in_executor(None, self.factory)
+            if hasattr(instance, "initialize"):
+                self.state = "initializing"
+                await instance.initialize()
+            self._instance = instance
+            self.state = "ready"
+            self.ready_at = time.perf_counter()
+            logger.info(f"{self.name} engine ready in {self.ready_at - self.started_at:.1f}s")
+        except Exception as e:
+            self.state = "failed"
+            self.error = str(e)
+            logger.error(f"{self.name} engine failed to load: {e}")
+        finally:
+            self._ready.set()
+
+    def status(self) -> dict:
+        status = {"state": self.state}
+        if self.started_at is not None:
+            end = self.ready_at or time.perf_counter()
+            status["load_seconds"] = round(end - self.started_at, 3)
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+class Engines:
+    def __init__(self):
+        self._engines: Dict[str, LazyEngine] = {}
+        self._tasks = []
+
+    def add(self, name: str, factory: Callable[[], Any]) -> LazyEngine:
+        engine = LazyEngine(name, factory)
+        self._engines[name] = engine
+        return engine
+
+    def start(self):
+        """Kick off every engine load in the background; returns immediately."""
+        for engine in self._engines.values():
+            self._tasks.append(asyncio.create_task(engine.load()))
+
+    @property
+    def ready(self) -> bool:
+        return all(engine.ready for engine in self._engines.values())
+
+    def status(self) -> dict:
+        return {name: engine.status() for name, engine in self._engines.items()}
+
+
+def readiness_router(engines: Engines, service: str) -> APIRouter:
+    """`/ready`: 200 once every engine is loaded, 503 with per-engine progress until then."""
+    router = APIRouter()
+
+    @router.get("/ready")
+    async def readiness_check():
+        body = {"ready": engines.ready, "service": service, "engines": engines.status()}
+        return JSONResponse(body, status_code=200 if engines.ready else 503)
+
+    return router
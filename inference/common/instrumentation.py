@@ -0,0 +1,240 @@
+"""Shared latency instrumentation for the inference workers.
+
+Histograms, gauges and counters rendered in the Prometheus text format at
+GET /metrics, plus per-utterance trace ids. Kept dependency-free so every
+worker (and the fused pipeline worker) can import it without extra packages.
+"""
+import time
+import uuid
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+# Seconds; dense below 1.5s where the latency budget lives
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3,
+                   0.4, 0.5, 0.75, 0.8, 1.0, 1.5, 2.5, 5.0, 10.0)
+RECENT_WINDOW = 1024
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """A fresh per-label-set child (the object `labels()` hands out)."""
+
+    @abstractmethod
+    def _render_child(self, values: Tuple[str, ...], child) -> Iterator[str]:
+        """Exposition lines for one child."""
+
+    def items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        return list(self._children.items())
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in self.items():
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        # Raw recent samples for cheap windowed percentiles (/load, adaptive quality),
+        # with their monotonic observation times for time-bounded windows
+        self.recent = deque(maxlen=RECENT_WINDOW)
+        self.recent_at = deque(maxlen=RECENT_WINDOW)
+
+    def observe(self, seconds: float):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+        self.recent.append(seconds)
+        self.recent_at.append(time.monotonic())
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def percentile(self, q: float, window_s: Optional[float] = None) -> Optional[float]:
+        """Percentile over the most recent samples (only those from the last `window_s`
+        seconds when given), or None if there are none."""
+        if window_s is None:
+            ordered = sorted(self.recent)
+        else:
+            cutoff = time.monotonic() - window_s
+            ordered = sorted(value for at, value in zip(self.recent_at, self.recent) if at >= cutoff)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q / 100))]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values, child: _HistogramChild):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, values, (('le', le),))} {cumulative}"
+        yield f"{self.name}_sum{_format_labels(self.labelnames, values)} {child.sum}"
+        yield f"{self.name}_count{_format_labels(self.labelnames, values)} {child.count}"
+
+
+class _GaugeChild:
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the value from `function` at scrape time (e.g. a queue's qsize)."""
+        self.function = function
+
+    def get(self) -> float:
+        return float(self.function()) if self.function else self.value
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        self.inc()
+        try:
+            yield
+        finally:
+            self.dec()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def _render_child(self, values, child: _GaugeChild):
+        yield f"{self.name}{_format_labels(self.labelnames, values)} {child.get()}"
+
+
+class _CounterChild:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _render_child(self, values, child: _CounterChild):
+        yield f"{self.name}_total{_format_labels(self.labelnames, values)} {child.value}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "lumatalk_stage_seconds",
+    "Time spent per pipeline stage (asr_vad, asr_decode, mt_translate, tts_first_chunk, ...)",
+    ("stage",),
+))
+ACTIVE_CONNECTIONS = REGISTRY.register(Gauge(
+    "lumatalk_active_connections",
+    "Open client connections per endpoint",
+    ("endpoint",),
+))
+# Time spent waiting on the client for its next message: client pacing, not worker
+# latency, so it is kept out of the stage histograms that /load and admission read
+CLIENT_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "lumatalk_client_wait_seconds",
+    "Time spent waiting for the client's next message per endpoint",
+    ("endpoint",),
+))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "lumatalk_queue_depth",
+    "Items waiting in internal queues",
+    ("queue",),
+))
+
+
+def stage(name: str) -> _HistogramChild:
+    return STAGE_SECONDS.labels(name)
+
+
+def new_trace_id() -> str:
+    """Per-utterance id carried from the ASR result through MT and TTS."""
+    return uuid.uuid4().hex[:16]
+
+
+metrics_router = APIRouter()
+
+
+@metrics_router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,172 @@
+"""On-demand profiling of a live worker.
+
+`/debug/profile` samples every thread's stack via `sys._current_frames()` for a
+bounded window and returns collapsed stacks (one `frame;frame;... count` line
+per unique stack, as consumed by flamegraph.pl and speedscope), together with
+event-loop lag measured over the same window. `/debug/memory` traces
+allocations with tracemalloc for a window and returns the top allocation
+sites. Nothing runs until a request arrives; tracemalloc is stopped again
+afterwards.
+
+Both endpoints require `DEBUG_TOKEN` (sent as `Authorization: Bearer <token>`)
+and answer 404 when it is unset. They profile the one server process the
+request lands on (see common.server): responses name it (`process`, or the
+`X-Worker-Pid` header for collapsed output), and `?pid=` answers 421 (and
+closes the connection) on any other process, so a client can retry until it
+reaches the one it wants.
+"""
+import os
+import sys
+import hmac
+import time
+import asyncio
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from common.server import process_info
+
+MAX_SECONDS = 60.0
+MAX_STACK_DEPTH = 128
+
+_profile_lock = asyncio.Lock()
+
+
+def _check_token(authorization: Optional[str]):
+    token = os.getenv("DEBUG_TOKEN")
+    if not token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = (authorization or "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(supplied.encode(), token.encode()):
+        raise HTTPException(status_code=401, detail="Invalid debug token")
+
+
+def _check_process(pid: Optional[int]) -> dict:
+    info = process_info()
+    if pid is not None and pid != info["pid"]:
+        raise HTTPException(status_code=421, detail=f"Served by pid {info['pid']}, not {pid}; retry",
+                            headers={"X-Worker-Pid": str(info["pid"]), "Connection": "close"})
+    return info
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter:
+    """Collapsed stack counts for every thread except the sampler, keyed by thread name."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    own = threading.get_ident()
+    stacks: Counter = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, f"thread-{ident}"))
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+async def measure_loop_lag(seconds: float, interval: float) -> List[float]:
+    """How late the event loop wakes from `interval` sleeps, in ms."""
+    lags = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append((time.perf_counter() - started - interval) * 1000)
+    return lags
+
+
+def _lag_summary(lags: List[float]) -> Dict[str, float]:
+    if not lags:
+        return {}
+    ordered = sorted(lags)
+    return {
+        "samples": len(ordered),
+        "p50_ms": round(ordered[len(ordered) // 2], 2),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def top_allocations(snapshot: tracemalloc.Snapshot, limit: int) -> List[dict]:
+    return [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:limit]
+    ]
+
+
+debug_router = APIRouter(prefix="/debug")
+
+
+@debug_router.get("/profile")
+async def profile(seconds: float = 10.0, interval_ms: float = 10.0, format: str = "json",
+                  pid: Optional[int] = None, authorization: Optional[str] = Header(None)):
+    """Sample all thread stacks for `seconds`; `format=collapsed` returns just the flamegraph input."""
+    _check_token(authorization)
+    process = _check_process(pid)
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    seconds = min(max(seconds, 0.1), MAX_SECONDS)
+    interval = max(interval_ms, 1.0) / 1000
+    async with _profile_lock:
+        loop = asyncio.get_running_loop()
+        sampler = loop.run_in_executor(None, sample_stacks, seconds, interval)
+        lags = await measure_loop_lag(seconds, interval)
+        stacks = await sampler
+
+    collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+    if format == "collapsed":
+        return PlainTextResponse(collapsed + "\n", headers={"X-Worker-Pid": str(process["pid"])})
+    return {
+        "process": process,
+        "seconds": seconds,
+        "interval_ms": interval * 1000,
+        "samples": sum(stacks.values()),
+        "loop_lag": {**_lag_summary(lags), "values_ms": [round(lag, 2) for lag in lags]},
+        "collapsed": collapsed,
+    }
+
+
+@debug_router.get("/memory")
+async def memory(seconds: float = 5.0, top: int = 25, pid: Optional[int] = None,
+                 authorization: Optional[str] = Header(None)):
+    """Trace allocations for `seconds` and return the top allocation sites still alive."""
+    _check_token(authorization)
+    process = _check_process(pid)
+    if _profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    async with _profile_lock:
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start()
+        try:
+            await asyncio.sleep(min(max(seconds, 0.0), MAX_SECONDS))
+            snapshot = tracemalloc.take_snapshot()
+            traced, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+    return {
+        "process": process,
+        "seconds": seconds,
+        "traced_kb": round(traced / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "top": top_allocations(snapshot, top),
+    }
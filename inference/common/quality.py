@@ -0,0 +1,137 @@
+"""Load-adaptive quality levels.
+
+A `QualityController` watches a stage's latency and an optional queue depth and
+steps through an ordered list of quality levels (index 0 = best): down one level
+while the worker is under pressure, back up once load subsides. Hysteresis
+(separate down/up thresholds plus a hold time between changes) keeps it from
+flapping. Every change is logged and exported so it can be lined up with
+quality metrics.
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from typing import Callable, List, Optional
+
+from common.instrumentation import REGISTRY, Counter, Gauge, stage
+
+logger = logging.getLogger(__name__)
+
+QUALITY_LEVEL = REGISTRY.register(Gauge(
+    "lumatalk_quality_level",
+    "Current adaptive quality level per service (0 = full quality)",
+    ("service",),
+))
+QUALITY_CHANGES = REGISTRY.register(Counter(
+    "lumatalk_quality_changes",
+    "Adaptive quality level changes",
+    ("service", "direction"),
+))
+
+
+class QualityController:
+    """Steps `levels` (dicts of engine settings, each with a "name") under load.
+
+    Pressure: p95 of `latency_stage` over the samples seen since the last check
+    exceeds `budget_ms`, or `queue_depth()` exceeds `max_queue`. Relief: p95
+    below `budget_ms * recover_ratio` (or no traffic) and the queue is empty.
+    """
+
+    def __init__(self, service: str, levels: List[dict], latency_stage: str, budget_ms: float,
+                 queue_depth: Optional[Callable[[], float]] = None, max_queue: float = 0,
+                 recover_ratio: float = 0.6, hold_s: float = 5.0, interval_s: float = 1.0):
+        self.service = service
+        self.levels = levels
+        self.latency_stage = latency_stage
+        self.budget_ms = budget_ms
+        self.queue_depth = queue_depth
+        self.max_queue = max_queue
+        self.recover_ratio = recover_ratio
+        self.hold_s = hold_s
+        self.interval_s = interval_s
+        self.index = 0
+        self.changed_at = 0.0
+        self._seen = 0
+        self._listeners: List[Callable[[dict], None]] = []
+        self._task = None
+        QUALITY_LEVEL.labels(service).set(0)
+
+    @classmethod
+    def from_env(cls, prefix: str, service: str, default_levels: List[dict], latency_stage: str,
+                 default_budget_ms: float, **kwargs) -> Optional["QualityController"]:
+        """None unless <PREFIX>_ADAPTIVE_QUALITY=true; levels may be overridden as JSON in <PREFIX>_QUALITY_LEVELS."""
+        if os.getenv(f"{prefix}_ADAPTIVE_QUALITY", "false").lower() != "true":
+            return None
+        levels = json.loads(os.getenv(f"{prefix}_QUALITY_LEVELS", "null")) or default_levels
+        return cls(
+            service, levels, latency_stage,
+            budget_ms=float(os.getenv(f"{prefix}_QUALITY_BUDGET_MS", str(default_budget_ms))),
+            hold_s=float(os.getenv(f"{prefix}_QUALITY_HOLD_S", "5")),
+            **kwargs,
+        )
+
+    @property
+    def level(self) -> dict:
+        return self.levels[self.index]
+
+    def add_listener(self, listener: Callable[[dict], None]):
+        """`listener(level)` runs on every change, e.g. to call an engine's `apply_quality`."""
+        self._listeners.append(listener)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_s)
+            try:
+                self.evaluate()
+            except Exception as e:
+                logger.error(f"{self.service} quality controller error: {e}")
+
+    def _fresh_p95_ms(self) -> Optional[float]:
+        """p95 over samples observed since the previous check (None when idle)."""
+        child = stage(self.latency_stage)
+        fresh = min(child.count - self._seen, len(child.recent))
+        self._seen = child.count
+        if fresh <= 0:
+            return None
+        samples = sorted(list(child.recent)[-fresh:])
+        return samples[min(fresh - 1, int(fresh * 0.95))] * 1000
+
+    def evaluate(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        p95 = self._fresh_p95_ms()
+        queued = self.queue_depth() if self.queue_depth else 0
+        if now - self.changed_at < self.hold_s:
+            return
+        reason = f"{'idle' if p95 is None else f'p95 {p95:.0f}ms'}, queue {queued:.0f}"
+        if (p95 is not None and p95 > self.budget_ms) or (self.max_queue and queued > self.max_queue):
+            if self.index < len(self.levels) - 1:
+                self._set(self.index + 1, now, reason)
+        elif (p95 is None or p95 < self.budget_ms * self.recover_ratio) and not queued:
+            if self.index > 0:
+                self._set(self.index - 1, now, reason)
+
+    def _set(self, index: int, now: float, reason: str):
+        direction = "down" if index > self.index else "up"
+        previous = self.level["name"]
+        self.index = index
+        self.changed_at = now
+        QUALITY_LEVEL.labels(self.service).set(index)
+        QUALITY_CHANGES.labels(self.service, direction).inc()
+        logger.warning(f"{self.service} quality {direction}: {previous} -> {self.level['name']} ({reason})")
+        for listener in self._listeners:
+            listener(self.level)
+
+    def status(self) -> dict:
+        return {"level": self.index, **self.level}
+
+
+def apply_to_engine(engine) -> Callable[[dict], None]:
+    """Listener that forwards a level to a loaded engine's optional `apply_quality(level)` hook."""
+    def apply(level: dict):
+        if engine.ready and hasattr(engine.get(), "apply_quality"):
+            engine.get().apply_quality(level)
+    return apply
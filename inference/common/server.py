@@ -0,0 +1,224 @@
+"""Production launcher for the inference workers.
+
+`serve()` replaces the bare `uvicorn.run(app, ...)` in each worker's `__main__`.
+Everything is configured from the environment:
+
+    WORKER_PROCESSES   server processes (default 1: run in this process)
+    WORKER_REUSE_PORT  each process binds its own SO_REUSEPORT socket and the
+                       kernel spreads connections (default true); false shares
+                       one listening socket bound by the supervisor
+    WORKER_LOOP        uvicorn loop: auto (uvloop when installed) | uvloop | asyncio
+    WORKER_HTTP        uvicorn HTTP parser: auto (httptools when installed) | httptools | h11
+    WORKER_CPUS        CPUs to pin to, e.g. "0-7" or "0-3,8-11"; split evenly across processes
+    WORKER_THREADS     per-process cap for torch/CTranslate2/BLAS/OpenMP threads
+                       (default: the process's CPU share)
+    WORKER_BACKLOG     listen backlog (default 2048)
+    WORKER_ACCESS_LOG  uvicorn access log (default true)
+    WORKER_LOG_LEVEL   uvicorn log level (default info)
+    WORKER_RESTART_MAX_S  cap on the restart backoff for crashing processes (default 30)
+
+With several processes the supervisor starts children with
+`python -m common.server`; each child imports the app by its import string,
+so nothing heavy is loaded in the supervisor. Children that exit unexpectedly
+are restarted, after a delay that doubles while they keep exiting within
+RESTART_RESET_S of starting (a port conflict would otherwise spin).
+
+State kept in memory (bulk jobs, a running profile) belongs to the process
+that served the request; `process_info()` says which one that is.
+"""
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import logging
+import subprocess
+import importlib.util
+from pathlib import Path
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_ROOT = Path(__file__).resolve().parent.parent
+CHILD_ENV = "LUMATALK_SERVER_CHILD"
+RESTART_MIN_S = 0.5
+RESTART_RESET_S = 30.0
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS",
+                   "VECLIB_MAXIMUM_THREADS")
+
+
+def process_info() -> dict:
+    """This server process: pid, index among the supervisor's children, and their count."""
+    config = json.loads(os.environ.get(CHILD_ENV, "{}"))
+    return {"pid": os.getpid(), "index": config.get("index", 0), "processes": config.get("processes", 1)}
+
+
+def parse_cpus(spec: str) -> List[int]:
+    cpus = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+class ServerOptions:
+    def __init__(self, port: int, host: str = "0.0.0.0"):
+        self.host = os.getenv("WORKER_HOST", host)
+        self.port = int(os.getenv("WORKER_PORT", str(port)))
+        self.processes = max(1, int(os.getenv("WORKER_PROCESSES", "1")))
+        self.reuse_port = os.getenv("WORKER_REUSE_PORT", "true").lower() == "true" and hasattr(socket, "SO_REUSEPORT")
+        self.loop = os.getenv("WORKER_LOOP", "auto")
+        self.http = os.getenv("WORKER_HTTP", "auto")
+        self.cpus = parse_cpus(os.getenv("WORKER_CPUS", ""))
+        self.threads = int(os.getenv("WORKER_THREADS", "0"))
+        self.backlog = int(os.getenv("WORKER_BACKLOG", "2048"))
+        self.access_log = os.getenv("WORKER_ACCESS_LOG", "true").lower() == "true"
+        self.log_level = os.getenv("WORKER_LOG_LEVEL", "info")
+        self.restart_max_s = float(os.getenv("WORKER_RESTART_MAX_S", "30"))
+
+    def cpus_for(self, index: int) -> List[int]:
+        if not self.cpus:
+            return []
+        share = max(1, len(self.cpus) // self.processes)
+        start = (index * share) % len(self.cpus)
+        return self.cpus[start:start + share]
+
+    def threads_for(self, index: int) -> int:
+        return self.threads or len(self.cpus_for(index)) or max(1, (os.cpu_count() or 1) // self.processes)
+
+    def uvicorn_kwargs(self) -> dict:
+        loop = self.loop
+        if loop == "auto":
+            loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+        http = self.http
+        if http == "auto":
+            http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+        return {"loop": loop, "http": http, "backlog": self.backlog, "access_log": self.access_log,
+                "log_level": self.log_level}
+
+
+def configure_process(options: ServerOptions, index: int):
+    """Pin this process to its CPU share and cap native thread pools before any model loads."""
+    cpus = options.cpus_for(index)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    threads = str(options.threads_for(index))
+    if options.threads or options.processes > 1 or cpus:
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = threads
+    # Engines load in the background after startup, but honour an already-imported torch too
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(int(threads))
+
+
+def bind_socket(options: ServerOptions, reuse_port: bool) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in options.host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((options.host, options.port))
+    sock.listen(options.backlog)
+    return sock
+
+
+def serve(app, app_import: str, port: int, app_dir: Optional[str] = None, factory: bool = False):
+    """Run `app` (single process) or `app_import` in WORKER_PROCESSES child processes."""
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+    options = ServerOptions(port)
+    kwargs = options.uvicorn_kwargs()
+    if options.processes == 1:
+        configure_process(options, 0)
+        logger.info(f"Serving on {options.host}:{options.port} ({kwargs['loop']}/{kwargs['http']})")
+        uvicorn.run(app, host=options.host, port=options.port, factory=factory, **kwargs)
+        return
+    Supervisor(options, app_import, app_dir or os.getcwd(), factory).run()
+
+
+class Supervisor:
+    def __init__(self, options: ServerOptions, app_import: str, app_dir: str, factory: bool):
+        self.options = options
+        self.app_import = app_import
+        self.app_dir = app_dir
+        self.factory = factory
+        self.stopping = False
+        self.shared_socket = None if options.reuse_port else bind_socket(options, reuse_port=False)
+        self.children: List[Optional[subprocess.Popen]] = [None] * options.processes
+        self.started_at = [0.0] * options.processes
+        self.restart_at: List[Optional[float]] = [None] * options.processes
+        self.backoff = [RESTART_MIN_S] * options.processes
+
+    def _spawn(self, index: int) -> subprocess.Popen:
+        fd = self.shared_socket.fileno() if self.shared_socket else None
+        env = dict(os.environ)
+        env[CHILD_ENV] = json.dumps({
+            "index": index, "processes": self.options.processes, "port": self.options.port, "fd": fd,
+            "app": self.app_import, "app_dir": self.app_dir, "factory": self.factory,
+        })
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(INFERENCE_ROOT), env.get("PYTHONPATH")]))
+        self.started_at[index] = time.monotonic()
+        return subprocess.Popen([sys.executable, "-m", "common.server"], cwd=self.app_dir, env=env,
+                                pass_fds=(fd,) if fd is not None else ())
+
+    def _check(self, index: int, now: float):
+        """Schedule a restart for an exited child, and start it once its backoff has passed."""
+        child = self.children[index]
+        if self.restart_at[index] is None:
+            if child.poll() is None:
+                return
+            if now - self.started_at[index] >= RESTART_RESET_S:
+                self.backoff[index] = RESTART_MIN_S
+            delay = self.backoff[index]
+            self.backoff[index] = min(delay * 2, self.options.restart_max_s)
+            self.restart_at[index] = now + delay
+            logger.error(f"Server process {index} exited with {child.returncode}; restarting in {delay:.1f}s")
+        elif now >= self.restart_at[index]:
+            self.restart_at[index] = None
+            self.children[index] = self._spawn(index)
+
+    def _stop(self, *_):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        mode = "SO_REUSEPORT" if self.options.reuse_port else "shared socket"
+        logger.info(f"Starting {self.options.processes} processes on {self.options.host}:{self.options.port} "
+                    f"({mode}, {self.options.threads_for(0)} threads each)")
+        for index in range(self.options.processes):
+            self.children[index] = self._spawn(index)
+        while not self.stopping:
+            time.sleep(RESTART_MIN_S)
+            for index in range(len(self.children)):
+                if not self.stopping:
+                    self._check(index, time.monotonic())
+        for child in self.children:
+            if child.poll() is None:
+                child.terminate()
+        for child in self.children:
+            try:
+                child.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                child.kill()
+
+
+def _run_child():
+    import uvicorn
+
+    config = json.loads(os.environ[CHILD_ENV])
+    sys.path.insert(0, config["app_dir"])
+    options = ServerOptions(config["port"])
+    configure_process(options, config["index"])
+    if config["fd"] is not None:
+        sock = socket.socket(fileno=config["fd"])
+    else:
+        sock = bind_socket(options, reuse_port=True)
+    server = uvicorn.Server(uvicorn.Config(config["app"], factory=config["factory"], host=options.host,
+                                           port=options.port, **options.uvicorn_kwargs()))
+    server.run(sockets=[sock])
+
+
+if __name__ == "__main__":
+    _run_child()
@@ -1,31 +1,77 @@
 import os
+import sys
+import asyncio
 import logging
+import time
+from pathlib import Path
+from typing import Optional
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from translation_service import TranslationService
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.capacity import AdmissionController, load_router
+from common.engines import Engines, readiness_router
+from common.instrumentation import QUEUE_DEPTH, metrics_router, new_trace_id, stage
+from common.profiling import debug_router
+from common.quality import QualityController, apply_to_engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# transformers/torch and the cloud SDKs are imported in the background
+def load_translation_service():
+    from translation_service import TranslationService
+    return TranslationService()
+
+engines = Engines()
+translation_engine = engines.add("translation", load_translation_service)
+
 app = FastAPI(title="LumaTalk MT Worker")
-translation_service = TranslationService()
+app.include_router(metrics_router)
+app.include_router(debug_router)
+app.include_router(readiness_router(engines, "mt_worker"))
+
+# Bound concurrent model/API calls; excess requests queue here instead of piling onto the backend
+MAX_CONCURRENCY = int(os.getenv("MT_MAX_CONCURRENCY", "32"))
+translate_slots = asyncio.Semaphore(MAX_CONCURRENCY)
+queued_requests = 0
+QUEUE_DEPTH.labels("mt_translate").set_function(lambda: queued_requests)
+
+# Reported on /load only; HTTP requests queue on the semaphore rather than being rejected
+capacity = AdmissionController("/translate", max_streams=MAX_CONCURRENCY, latency_stage="mt_translate",
+                               latency_budget_ms=float(os.getenv("MT_LATENCY_BUDGET_MS", "0")))
+app.include_router(load_router("mt_worker", [capacity]))
+
+# Under load, step down from beam search to greedy decoding
+QUALITY_LEVELS = [
+    {"name": "full", "num_beams": 4},
+    {"name": "reduced_beam", "num_beams": 2},
+    {"name": "greedy", "num_beams": 1},
+]
+quality = QualityController.from_env("MT", "mt_worker", QUALITY_LEVELS, "mt_translate", default_budget_ms=400,
+                                     queue_depth=lambda: queued_requests, max_queue=MAX_CONCURRENCY)
+if quality:
+    quality.add_listener(apply_to_engine(translation_engine))
 
 class TranslationRequest(BaseModel):
     text: str
     source_lang: str
     target_lang: str
+    trace_id: Optional[str] = None
 
 class TranslationResponse(BaseModel):
     translated_text: str
     source_lang: str
     target_lang: str
     confidence: float
+    trace_id: Optional[str] = None
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Initializing translation service...")
-    await translation_service.initialize()
-    logger.info("Translation service ready")
+    logger.info("Loading translation service in the background...")
+    engines.start()
+    if quality:
+        quality.start()
 
 @app.get("/health")
 async def health_check():
@@ -33,17 +79,41 @@ async def health_check():
 
 @app.post("/translate", response_model=TranslationResponse)
 async def translate(request: TranslationRequest):
+    global queued_requests
+    if not translation_engine.ready:
+        raise HTTPException(status_code=503, detail="Translation service is still loading",
+                            headers={"Retry-After": "5"})
+    translation_service = translation_engine.get()
+    trace_id = request.trace_id or new_trace_id()
+    capacity.acquire()
     try:
-        result = await translation_service.translate(
-            text=request.text,
-            source_lang=request.source_lang,
-            target_lang=request.target_lang
-        )
-        return result
+        queued_requests += 1
+        try:
+            with stage("mt_queue").time():
+                await translate_slots.acquire()
+        finally:
+            queued_requests -= 1
+
+        try:
+            started = time.perf_counter()
+            result = await translation_service.translate(
+                text=request.text,
+                source_lang=request.source_lang,
+                target_lang=request.target_lang
+            )
+            elapsed = time.perf_counter() - started
+            stage("mt_translate").observe(elapsed)
+        finally:
+            translate_slots.release()
+
+        logger.debug(f"[trace {trace_id}] translated in {elapsed * 1000:.0f}ms")
+        return {**result, "trace_id": trace_id}
     except Exception as e:
-        logger.error(f"Translation error: {e}")
+        logger.error(f"[trace {trace_id}] Translation error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        capacity.release()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8002)
+    from common.server import serve
+    serve(app, "main:app", port=8002, app_dir=str(Path(__file__).resolve().parent))
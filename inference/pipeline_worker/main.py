@@ -0,0 +1,299 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+from pathlib import Path
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+# The fused worker runs the split workers' services in-process
+INFERENCE_ROOT = Path(__file__).resolve().parent.parent
+for worker in ("asr_worker", "mt_worker", "tts_worker"):
+    sys.path.insert(0, str(INFERENCE_ROOT / worker))
+sys.path.insert(0, str(INFERENCE_ROOT))
+
+from stable_prefix import StablePrefix
+from language_id import LanguageDetector, LanguageLock
+from common.capacity import AdmissionController, load_router
+from common.engines import Engines, readiness_router
+from common.instrumentation import ACTIVE_CONNECTIONS, QUEUE_DEPTH, metrics_router, new_trace_id, stage
+from common.profiling import debug_router
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# All three model stacks load in parallel in the background; the server binds first
+
+def load_asr_service():
+    from asr_service import ASRService
+    return ASRService()
+
+def load_vad_processor():
+    # VAD_BACKEND=onnx runs Silero on onnxruntime and never imports torch
+    if os.getenv("VAD_BACKEND", "torch").lower() == "onnx":
+        from onnx_vad import OnnxVADProcessor
+        return OnnxVADProcessor()
+    from vad_processor import VADProcessor
+    return VADProcessor()
+
+def load_translation_service():
+    from translation_service import TranslationService
+    return TranslationService()
+
+def load_synthesis_stack():
+    # The TTS worker's full stack (upstream pool, voice residency, stitching, coalescing,
+    # post-processing) so split and fused deployments produce the same audio
+    from synthesis_stack import SynthesisStack
+    return SynthesisStack()
+
+engines = Engines()
+asr_engine = engines.add("asr", load_asr_service)
+vad_engine = engines.add("vad", load_vad_processor)
+translation_engine = engines.add("translation", load_translation_service)
+tts_engine = engines.add("tts", load_synthesis_stack)
+
+app = FastAPI(title="LumaTalk Pipeline Worker")
+app.include_router(metrics_router)
+app.include_router(debug_router)
+app.include_router(readiness_router(engines, "pipeline_worker"))
+
+# Turn new sessions away (with a retry hint) once PIPELINE_MAX_STREAMS or the decode latency budget is hit
+admission = AdmissionController.from_env("PIPELINE", "/ws/pipeline", latency_stage="asr_decode")
+app.include_router(load_router("pipeline_worker", [admission]))
+
+QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "16"))
+# Session audio is 16 kHz mono PCM16
+BYTES_PER_MS = 32
+# Translate stable partial prefixes for live captions (speech is only synthesized for finals)
+TRANSLATE_PARTIALS = os.getenv("PIPELINE_TRANSLATE_PARTIALS", "true").lower() == "true"
+
+sessions = set()
+for queue_name in ("mt_queue", "tts_queue", "out_queue"):
+    QUEUE_DEPTH.labels(f"pipeline_{queue_name}").set_function(
+        lambda queue_name=queue_name: sum(getattr(s, queue_name).qsize() for s in sessions))
+
+@app.on_event("startup")
+async def startup_event():
+    logger.info("Loading ASR, translation and TTS services in the background...")
+    engines.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if tts_engine.ready:
+        await tts_engine.get().close()
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "service": "pipeline_worker"}
+
+@app.websocket("/ws/pipeline")
+async def websocket_pipeline(websocket: WebSocket):
+    """One socket per session: audio frames in, ASR/MT events and TTS audio out.
+
+    The first message is a JSON session config
+    {"source_lang": "en", "target_lang": "es", "voice": null}; every message
+    after that is a binary audio frame, as on /ws/asr. A source_lang of
+    "auto" detects and locks the spoken language from the first speech; it is
+    refused (1008) when the ASR engine cannot detect languages.
+    """
+    await websocket.accept()
+    if not engines.ready:
+        # 1013 Try Again Later: the client should retry once /ready reports ready
+        await websocket.close(code=1013)
+        return
+    if not admission.try_admit():
+        await admission.reject(websocket)
+        return
+    logger.info("Client connected to pipeline WebSocket")
+
+    try:
+        config = await websocket.receive_json()
+        if not isinstance(config, dict) or not config.get("target_lang"):
+            # 1008 Policy Violation: the session config is unusable
+            await websocket.close(code=1008, reason="Session config needs a target_lang")
+            return
+        if config.get("source_lang") == "auto" and not LanguageDetector.supports(asr_engine.get()):
+            await websocket.close(code=1008, reason="ASR engine cannot detect languages; set a source_lang")
+            return
+        session = PipelineSession(
+            websocket,
+            source_lang=config.get("source_lang", "en"),
+            target_lang=config["target_lang"],
+            voice=config.get("voice"),
+        )
+        await session.run()
+    except WebSocketDisconnect:
+        logger.info("Client disconnected from pipeline WebSocket")
+    finally:
+        admission.release()
+
+class PipelineSession:
+    """ASR -> MT -> TTS for one session, connected by in-memory queues.
+
+    A single sender task owns the socket so the stages never write to it
+    concurrently. A failed translation or synthesis only fails that utterance:
+    the client gets an `error` event and the session carries on, as with the
+    split workers.
+    """
+
+    def __init__(self, websocket: WebSocket, source_lang: str, target_lang: str, voice=None):
+        self.websocket = websocket
+        self.source_lang = source_lang
+        # source_lang "auto": detect from the first seconds of speech and feed it to MT
+        # (and to ASR as a hint, when it takes one); never passed on as the literal "auto"
+        self.language_lock = None
+        if source_lang == "auto":
+            self.language_lock = LanguageLock(LanguageDetector(asr_engine.get()))
+        self.language_hint = LanguageDetector.accepts_hint(asr_engine.get())
+        self.target_lang = target_lang
+        self.voice = voice
+        self.synthesis = tts_engine.get()
+        self.postprocessor = self.synthesis.new_postprocessor()
+        self.mt_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.tts_queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.out_queue = asyncio.Queue(maxsize=QUEUE_SIZE * 4)
+        self.stable_prefix = StablePrefix()
+
+    async def run(self):
+        sessions.add(self)
+        ACTIVE_CONNECTIONS.labels("/ws/pipeline").inc()
+        tasks = [
+            asyncio.create_task(self._asr_stage()),
+            asyncio.create_task(self._mt_stage()),
+            asyncio.create_task(self._tts_stage()),
+            asyncio.create_task(self._send_stage()),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        except WebSocketDisconnect:
+            logger.info("Client disconnected from pipeline WebSocket")
+        except Exception as e:
+            logger.error(f"Error in pipeline WebSocket: {e}")
+            await self.websocket.close(code=1011)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            sessions.discard(self)
+            ACTIVE_CONNECTIONS.labels("/ws/pipeline").dec()
+
+    async def _asr_stage(self):
+        trace_id = new_trace_id()
+        received_ms = 0.0
+        vad = vad_engine.get()
+        if hasattr(vad, "new_stream"):
+            vad = vad.new_stream()
+        while True:
+            audio_data = await self.websocket.receive_bytes()
+            received_ms += len(audio_data) / BYTES_PER_MS
+            with stage("asr_vad").time():
+                has_speech = vad.process(audio_data)
+            if not has_speech:
+                continue
+
+            options = {}
+            source_lang = self.source_lang
+            if self.language_lock:
+                source_lang = await self.language_lock.observe(audio_data)
+                if source_lang and self.language_hint:
+                    options = {"language": source_lang}
+
+            started = time.perf_counter()
+            async for result in asr_engine.get().transcribe_streaming(audio_data, **options):
+                stage("asr_decode").observe(time.perf_counter() - started)
+                is_final = result.get("type") == "asr_final"
+                if is_final and self.language_lock and source_lang is None:
+                    # Final before the first scheduled detection: detect on the speech so far
+                    source_lang = await self.language_lock.resolve()
+                result["trace_id"] = trace_id
+                result["audio_end_ms"] = round(received_ms)
+                if self.language_lock:
+                    self.language_lock.annotate(result)
+                await self.out_queue.put(result)
+
+                if is_final:
+                    self.stable_prefix.reset()
+                    await self.mt_queue.put((result["text"], True, trace_id, time.perf_counter(), source_lang))
+                    trace_id = new_trace_id()
+                    if self.language_lock:
+                        self.language_lock.check(result.get("confidence"))
+                elif TRANSLATE_PARTIALS and source_lang:
+                    # Partials before the language is known are not translated
+                    prefix = self.stable_prefix.update(result.get("text", ""))
+                    if prefix:
+                        self._offer_partial(prefix, trace_id, source_lang)
+                started = time.perf_counter()
+
+    def _offer_partial(self, text: str, trace_id: str, source_lang: str):
+        # Partial captions are disposable: never block audio intake on them
+        try:
+            self.mt_queue.put_nowait((text, False, trace_id, time.perf_counter(), source_lang))
+        except asyncio.QueueFull:
+            logger.debug("MT queue full, dropping partial translation")
+
+    async def _mt_stage(self):
+        while True:
+            text, is_final, trace_id, queued_at, source_lang = await self.mt_queue.get()
+            stage("mt_queue").observe(time.perf_counter() - queued_at)
+            try:
+                with stage("mt_translate").time():
+                    result = await translation_engine.get().translate(
+                        text=text,
+                        source_lang=source_lang,
+                        target_lang=self.target_lang
+                    )
+            except Exception as e:
+                logger.error(f"[trace {trace_id}] Translation failed: {e}")
+                await self._error("mt", trace_id, e)
+                continue
+            await self.out_queue.put({
+                "type": "mt_final" if is_final else "mt_partial",
+                "text": result["translated_text"],
+                "sourceLang": source_lang,
+                "targetLang": self.target_lang,
+                "trace_id": trace_id,
+            })
+            if is_final:
+                await self.tts_queue.put((result["translated_text"], trace_id))
+
+    async def _tts_stage(self):
+        while True:
+            text, trace_id = await self.tts_queue.get()
+            if self.postprocessor:
+                self.postprocessor.reset()
+            started = time.perf_counter()
+            first_chunk = True
+            try:
+                async for audio_chunk in self.synthesis.synthesizer.synthesize_streaming(
+                        text, self.target_lang, self.voice):
+                    if first_chunk:
+                        stage("tts_first_chunk").observe(time.perf_counter() - started)
+                        first_chunk = False
+                    if self.postprocessor:
+                        audio_chunk = self.postprocessor.process(audio_chunk)
+                        if not audio_chunk:
+                            continue
+                    await self.out_queue.put(audio_chunk)
+            except Exception as e:
+                logger.error(f"[trace {trace_id}] Synthesis failed: {e}")
+                await self._error("tts", trace_id, e)
+                continue
+            stage("tts_total").observe(time.perf_counter() - started)
+            await self.out_queue.put({"type": "tts_complete", "trace_id": trace_id})
+
+    async def _error(self, failed_stage: str, trace_id: str, error: Exception):
+        await self.out_queue.put({"type": "error", "stage": failed_stage, "message": str(error), "trace_id": trace_id})
+
+    async def _send_stage(self):
+        while True:
+            message = await self.out_queue.get()
+            if isinstance(message, bytes):
+                await self.websocket.send_bytes(message)
+            else:
+                await self.websocket.send_json(message)
+
+if __name__ == "__main__":
+    from common.server import serve
+    serve(app, "main:app", port=8004, app_dir=str(Path(__file__).resolve().parent))
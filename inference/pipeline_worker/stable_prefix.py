@@ -0,0 +1,35 @@
+import os
+from typing import List, Optional
+
+MIN_NEW_WORDS = int(os.getenv("PIPELINE_STABLE_MIN_WORDS", "3"))
+
+
+class StablePrefix:
+    """Tracks the word prefix that consecutive ASR partials agree on.
+
+    Partial hypotheses get rewritten at the tail; words that survive two
+    partials in a row rarely change again. `update` returns the stable prefix
+    once it has grown by at least `min_new_words` since the last one returned.
+    """
+
+    def __init__(self, min_new_words: int = MIN_NEW_WORDS):
+        self.min_new_words = min_new_words
+        self.reset()
+
+    def reset(self):
+        self._previous: List[str] = []
+        self._emitted = 0
+
+    def update(self, text: str) -> Optional[str]:
+        words = text.split()
+        stable = 0
+        for current, previous in zip(words, self._previous):
+            if current != previous:
+                break
+            stable += 1
+        self._previous = words
+
+        if stable - self._emitted < self.min_new_words:
+            return None
+        self._emitted = stable
+        return " ".join(words[:stable])
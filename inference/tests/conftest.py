@@ -0,0 +1,36 @@
+import sys
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+INFERENCE_ROOT = Path(__file__).resolve().parent.parent
+# Worker modules are imported top-level, as each worker's main.py does
+for path in (INFERENCE_ROOT, INFERENCE_ROOT / "asr_worker", INFERENCE_ROOT / "tts_worker"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture(scope="session")
+def fake_upstream():
+    """Base URL of the fake cloud TTS server (benchmarks/stubs/tts_upstream.py), run in a thread."""
+    import uvicorn
+    from benchmarks.stubs import tts_upstream
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(tts_upstream.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    yield f"http://127.0.0.1:{port}"
+    server.should_exit = True
+    thread.join(timeout=5)
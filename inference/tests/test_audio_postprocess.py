@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from audio_format import AudioFormat
+from audio_postprocess import AudioPostProcessor
+
+
+def tone(frequency: float, rate: int, seconds: float = 1.0) -> bytes:
+    t = np.arange(int(rate * seconds)) / rate
+    return (8000 * np.sin(2 * np.pi * frequency * t)).astype("<i2").tobytes()
+
+
+def run(processor: AudioPostProcessor, audio: bytes, chunk_bytes: int) -> np.ndarray:
+    out = b"".join(processor.process(audio[i:i + chunk_bytes]) for i in range(0, len(audio), chunk_bytes))
+    return np.frombuffer(out, dtype="<i2").astype(np.float64)
+
+
+def rms(samples: np.ndarray) -> float:
+    return float(np.sqrt(np.mean(samples ** 2)))
+
+
+def fixed_gain(**kwargs) -> AudioPostProcessor:
+    # Unity gain so levels can be compared between runs
+    return AudioPostProcessor(24000, 16000, max_gain_db=0.0, target_dbfs=0.0, **kwargs)
+
+
+def test_downsampling_rejects_content_above_output_nyquist():
+    passed = rms(run(fixed_gain(), tone(1000, 24000), 960)[200:])
+    aliased = rms(run(fixed_gain(), tone(11000, 24000), 960)[200:])
+    assert aliased < passed / 100
+
+
+def test_oversized_chunk_keeps_carried_samples():
+    audio = tone(440, 24000)
+    reference = run(fixed_gain(max_chunk_samples=48000), audio, 960)
+    processor = fixed_gain(max_chunk_samples=256)
+    # Chunks larger than max_chunk_samples force a reallocation mid-stream
+    mixed = np.concatenate([run(processor, audio[:19200], 960), run(processor, audio[19200:], 9600)])
+    assert len(mixed) == len(reference)
+    assert np.max(np.abs(mixed - reference)) <= 1
+
+
+class Source:
+    def __init__(self, output_format):
+        self.output_format = output_format
+
+
+def test_input_rate_comes_from_the_source():
+    processor = AudioPostProcessor.for_source(Source(AudioFormat("pcm16", 22050)))
+    assert processor.input_rate == 22050
+
+
+def test_non_pcm_source_is_refused():
+    with pytest.raises(ValueError):
+        AudioPostProcessor.for_source(Source(AudioFormat("ogg_opus", 24000)))
@@ -0,0 +1,39 @@
+import numpy as np
+
+from bulk import BulkTranscriber
+
+
+class Engine:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+class ThresholdVAD:
+    """Per-call VAD with no `new_stream()`, like the torch backend."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def process(self, audio_data: bytes) -> bool:
+        self.calls += 1
+        return bool(np.abs(np.frombuffer(audio_data, dtype="<i2")).max() > 500)
+
+
+def test_split_speech_keeps_off_the_shared_vad():
+    shared, loaded = ThresholdVAD(), []
+
+    def load_vad():
+        loaded.append(ThresholdVAD())
+        return loaded[-1]
+
+    bulk = BulkTranscriber(Engine(None), Engine(shared), load_vad)
+    audio = np.zeros(16000 * 3, dtype="<i2")
+    audio[16000:32000] = 4000
+    regions = bulk._split_speech(audio)
+    bulk._split_speech(audio)
+    assert shared.calls == 0
+    assert len(loaded) == 1 and loaded[0].calls > 0
+    assert len(regions) == 1
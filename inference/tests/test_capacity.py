@@ -0,0 +1,43 @@
+import time
+
+from common.capacity import AdmissionController
+from common.instrumentation import stage
+
+
+def test_latency_spike_ages_out_of_the_admission_window():
+    admission = AdmissionController("/ws/test", latency_stage="test_admission_window", latency_budget_ms=100,
+                                    latency_window_s=0.2)
+    for _ in range(50):
+        stage("test_admission_window").observe(1.0)
+    # A silent session stays connected, so `active` never drops to zero
+    assert admission.try_admit()
+    assert not admission.try_admit()
+    time.sleep(0.3)
+    assert admission.try_admit()
+
+
+def test_max_streams():
+    admission = AdmissionController("/ws/test", max_streams=1)
+    assert admission.try_admit()
+    assert not admission.try_admit()
+    admission.release()
+    assert admission.try_admit()
+
+
+def test_load_reports_the_admission_window():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from common.capacity import load_router
+
+    admission = AdmissionController("/ws/test", latency_stage="test_load_window", latency_budget_ms=100,
+                                    latency_window_s=0.2)
+    app = FastAPI()
+    app.include_router(load_router("test", [admission]))
+    client = TestClient(app)
+    stage("test_load_window").observe(1.0)
+    assert client.get("/load").json()["p95_ms"]["test_load_window"] == 1000.0
+    time.sleep(0.3)
+    stage("test_load_window").observe(0.01)
+    body = client.get("/load").json()
+    assert body["p95_ms"]["test_load_window"] == body["endpoints"]["/ws/test"]["p95_ms"] == 10.0
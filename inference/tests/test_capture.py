@@ -0,0 +1,47 @@
+from common.capture import CaptureReader, CaptureStore
+
+
+def test_rotation_skips_open_logs(tmp_path):
+    # Room for two sessions: opening a third must rotate, but only finished logs
+    store = CaptureStore(str(tmp_path), session_mb=1, max_mb=2)
+    live = store.open()
+    live.append(b"\x01\x02" * 160)
+    finished = store.open()
+    finished.append(b"\x03\x04" * 160)
+    finished.close()
+
+    newest = store.open()
+    assert live.path.exists()
+    assert not finished.path.exists() and not finished.path.with_suffix(".idx").exists()
+
+    live.append(b"\x05\x06" * 160)
+    live.close()
+    newest.close()
+    frames = [frame for _, frame in CaptureReader(str(live.path)).records()]
+    assert frames == [b"\x01\x02" * 160, b"\x05\x06" * 160]
+    assert live.path.with_suffix(".idx").exists()
+
+
+def test_only_open_logs_leaves_budget_exceeded(tmp_path):
+    store = CaptureStore(str(tmp_path), session_mb=1, max_mb=1.5)
+    first = store.open()
+    second = store.open()
+    assert first.path.exists() and second.path.exists()
+    first.close()
+    second.close()
+
+
+def test_concurrent_opens_rotate_safely(tmp_path):
+    # Opens run on executor threads; their rotations must not stat or unlink the same old logs
+    from concurrent.futures import ThreadPoolExecutor
+
+    store = CaptureStore(str(tmp_path), session_mb=0.01, max_mb=0.05)
+
+    def session(_):
+        log = store.open()
+        log.append(b"\x01" * 8000)
+        log.close()
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(session, range(64)))
+    assert sum(p.stat().st_size for p in tmp_path.glob("*.lcap")) <= store.max_bytes
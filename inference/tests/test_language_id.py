@@ -0,0 +1,128 @@
+import asyncio
+
+import numpy as np
+
+from bulk import BulkDecoder
+from language_id import SAMPLE_RATE, LanguageDetector, LanguageLock
+
+
+class PlainASR:
+    """An ASR service whose `transcribe_streaming` takes no language hint."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def transcribe_streaming(self, audio_data):
+        self.calls += 1
+        yield {"type": "asr_final", "text": "hello"}
+
+
+class HintedASR:
+    async def transcribe_streaming(self, audio_data, language=None):
+        yield {"type": "asr_final", "text": language or ""}
+
+
+class KwargsASR:
+    async def transcribe_streaming(self, audio_data, **kwargs):
+        yield {"type": "asr_final", "text": kwargs.get("language", "")}
+
+
+def test_accepts_hint():
+    assert not LanguageDetector.accepts_hint(PlainASR())
+    assert LanguageDetector.accepts_hint(HintedASR())
+    assert LanguageDetector.accepts_hint(KwargsASR())
+    assert not LanguageDetector.accepts_hint(object())
+
+
+def test_bulk_decode_drops_unsupported_hint():
+    service = PlainASR()
+    words, _ = asyncio.run(BulkDecoder(service, None).decode(np.zeros(1600, dtype="<i2"), 0.0, "0.0", "de"))
+    assert service.calls == 1
+    assert [w["text"] for w in words] == [" hello"]
+
+
+def test_bulk_decode_passes_supported_hint():
+    words, language = asyncio.run(BulkDecoder(HintedASR(), None).decode(np.zeros(1600, dtype="<i2"), 0.0, "0.0", "de"))
+    assert [w["text"] for w in words] == [" de"]
+    assert language == "de"
+
+
+class ScriptedDetector:
+    """Returns the scripted (language, probability) pairs in turn, repeating the last."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    async def detect(self, pcm16: bytes):
+        result = self.results[min(self.calls, len(self.results) - 1)]
+        self.calls += 1
+        return result
+
+
+SECOND = b"\0\0" * SAMPLE_RATE
+
+
+def observe_seconds(lock: LanguageLock, seconds: int):
+    async def run():
+        return [await lock.observe(SECOND) for _ in range(seconds)]
+
+    return asyncio.run(run())
+
+
+def new_lock(detector) -> LanguageLock:
+    return LanguageLock(detector, window_s=3, step_s=1, lock_confidence=0.8, recheck_confidence=0.5)
+
+
+def test_locks_once_detection_is_confident():
+    detector = ScriptedDetector(("de", 0.6), ("de", 0.9))
+    lock = new_lock(detector)
+    assert observe_seconds(lock, 2) == ["de", "de"]
+    assert lock.locked
+    # Locked: later speech is decoded in the locked language without detecting again
+    assert observe_seconds(lock, 5) == ["de"] * 5
+    assert detector.calls == 2
+
+
+def test_stays_locked_while_confidence_holds_and_rechecks_on_a_drop():
+    detector = ScriptedDetector(("de", 0.9), ("fr", 0.95))
+    lock = new_lock(detector)
+    observe_seconds(lock, 1)
+    lock.check(0.9)
+    assert lock.locked and detector.calls == 1
+    lock.check(0.3)
+    assert not lock.locked
+    assert observe_seconds(lock, 1) == ["fr"]
+    assert lock.locked and detector.calls == 2
+
+
+def test_low_confidence_locks_the_last_guess_at_the_window():
+    detector = ScriptedDetector(("it", 0.3), ("es", 0.4))
+    lock = new_lock(detector)
+    assert observe_seconds(lock, 2) == ["it", "es"]
+    assert not lock.locked
+    observe_seconds(lock, 1)
+    assert lock.locked and lock.language == "es"
+    assert detector.calls == 3
+
+
+def test_resolve_detects_before_the_first_step():
+    detector = ScriptedDetector(("pt", 0.6))
+    lock = new_lock(detector)
+
+    async def run():
+        await lock.observe(SECOND[:len(SECOND) // 2])
+        return await lock.resolve(), await lock.resolve()
+
+    assert asyncio.run(run()) == ("pt", "pt")
+    assert detector.calls == 1
+
+
+def test_annotate_tags_results_once_detected():
+    lock = new_lock(ScriptedDetector(("de", 0.9)))
+    untagged = {}
+    lock.annotate(untagged)
+    observe_seconds(lock, 1)
+    tagged = {}
+    lock.annotate(tagged)
+    assert untagged == {} and tagged == {"language": "de", "language_probability": 0.9}
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+from onnx_vad import WINDOW_SAMPLES, VADStream  # noqa: E402
+
+
+class CountingModel:
+    """Stands in for SileroOnnxModel: every window scores 0.9."""
+
+    context = 64
+
+    def __init__(self):
+        self.windows = 0
+
+    def new_state(self):
+        return np.zeros((2, 128), dtype=np.float32)
+
+    def run(self, windows, states):
+        self.windows += len(windows)
+        return np.full(len(windows), 0.9, dtype=np.float32)
+
+
+def test_20ms_frames_fill_windows_across_calls():
+    model = CountingModel()
+    stream = VADStream(model, threshold=0.5)
+    frame = np.ones(320, dtype="<i2").tobytes()
+    decisions = [stream.process(frame) for _ in range(50)]
+    assert model.windows == 50 * 320 // WINDOW_SAMPLES
+    assert any(decisions)
@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+import pytest
+
+from audio_format import AudioFormat
+from phrase_stitcher import FragmentIndex, StitchingSynthesizer
+
+
+class Source:
+    def __init__(self, output_format: AudioFormat):
+        self.output_format = output_format
+
+    async def synthesize_streaming(self, text, lang, voice=None):
+        yield b""
+
+
+def write_index(tmp_path, sample_rate: int = 24000, **manifest) -> str:
+    np.zeros(480, dtype="<i2").tofile(tmp_path / "hello.pcm")
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({
+        "sample_rate": sample_rate,
+        "fragments": [{"lang": "en", "voice": None, "text": "hello", "file": "hello.pcm"}],
+        **manifest,
+    }))
+    return str(path)
+
+
+def test_accepts_matching_pcm_source(tmp_path):
+    stitcher = StitchingSynthesizer(Source(AudioFormat("pcm16", 24000)), FragmentIndex.load(write_index(tmp_path)))
+    assert stitcher.output_format == AudioFormat("pcm16", 24000)
+
+
+def test_rejects_sample_rate_mismatch(tmp_path):
+    with pytest.raises(ValueError):
+        StitchingSynthesizer(Source(AudioFormat("pcm16", 16000)), FragmentIndex.load(write_index(tmp_path)))
+
+
+def test_rejects_non_pcm_source(tmp_path):
+    with pytest.raises(ValueError):
+        StitchingSynthesizer(Source(AudioFormat("ogg_opus", 24000)), FragmentIndex.load(write_index(tmp_path)))
+
+
+def test_rejects_non_pcm_fragments(tmp_path):
+    with pytest.raises(ValueError):
+        FragmentIndex.load(write_index(tmp_path, format="ogg_opus"))
+
+
+def constant_index(tmp_path, fragments: dict, crossfade_ms: float = 8) -> FragmentIndex:
+    """An index of constant-level fragments: {text: number of samples}."""
+    entries = []
+    for n, (text, samples) in enumerate(fragments.items()):
+        np.full(samples, 1000, dtype="<i2").tofile(tmp_path / f"{n}.pcm")
+        entries.append({"lang": "en", "voice": None, "text": text, "file": f"{n}.pcm"})
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"sample_rate": 24000, "crossfade_ms": crossfade_ms, "fragments": entries}))
+    return FragmentIndex.load(str(path))
+
+
+def test_match_prefers_the_longest_cover(tmp_path):
+    index = constant_index(tmp_path, {"good": 100, "morning": 200, "good morning": 300, "everyone": 400})
+    pieces = index.match("Good morning, everyone!", "en", None)
+    assert [len(piece) for piece in pieces] == [300, 400]
+    assert index.match("good evening", "en", None) is None
+    assert index.match("good morning", "de", None) is None
+
+
+def test_stitch_length_and_seams_are_continuous(tmp_path):
+    index = constant_index(tmp_path, {"one": 2400, "two": 1200, "three": 3600})
+    pieces = index.match("one two three", "en", None)
+    audio = index.stitch(pieces)
+    assert len(audio) == 2400 + 1200 + 3600 - 2 * index.crossfade
+    # The crossfade ramps are complementary: no dip at either seam
+    assert np.all(audio == 1000)
+
+
+def test_empty_fragments_are_skipped(tmp_path):
+    index = constant_index(tmp_path, {"hello": 0, "there": 480})
+    assert index.match("hello", "en", None) is None
+    assert len(index.stitch(index.match("there", "en", None))) == 480
@@ -0,0 +1,41 @@
+from common import server
+from common.server import ServerOptions, Supervisor
+
+
+class ExitedChild:
+    returncode = 1
+
+    def poll(self):
+        return 1
+
+
+def test_restart_backoff_doubles_while_crashing(monkeypatch):
+    monkeypatch.setenv("WORKER_PROCESSES", "1")
+    monkeypatch.setenv("WORKER_RESTART_MAX_S", "2")
+    supervisor = Supervisor(ServerOptions(0), "main:app", ".", factory=False)
+    spawned = []
+
+    def spawn(index):
+        supervisor.started_at[index] = now
+        spawned.append(now)
+        return ExitedChild()
+
+    monkeypatch.setattr(supervisor, "_spawn", spawn)
+    now = 0.0
+    supervisor.children[0] = spawn(0)
+    while now < 10:
+        now += server.RESTART_MIN_S
+        supervisor._check(0, now)
+    gaps = [b - a for a, b in zip(spawned, spawned[1:])]
+    assert gaps[:3] == [1.0, 1.5, 2.5]
+    assert max(gaps) <= 2.5
+
+
+def test_backoff_resets_after_a_healthy_run(monkeypatch):
+    monkeypatch.setenv("WORKER_PROCESSES", "1")
+    supervisor = Supervisor(ServerOptions(0), "main:app", ".", factory=False)
+    supervisor.children[0] = ExitedChild()
+    supervisor.backoff[0] = 16.0
+    supervisor.started_at[0] = 0.0
+    supervisor._check(0, server.RESTART_RESET_S + 1)
+    assert supervisor.restart_at[0] == server.RESTART_RESET_S + 1 + server.RESTART_MIN_S
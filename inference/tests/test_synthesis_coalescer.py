@@ -0,0 +1,117 @@
+import asyncio
+
+from synthesis_coalescer import SynthesisCoalescer
+
+
+class ScriptedTTS:
+    """Streams `chunks` with a gate before each one, so tests control the pace."""
+
+    def __init__(self, chunks=(b"a", b"b", b"c"), fail_after=None):
+        self.chunks = list(chunks)
+        self.fail_after = fail_after
+        self.calls = 0
+        self.cancelled = False
+        self.gates = [asyncio.Event() for _ in self.chunks]
+
+    def release(self, count=None):
+        for gate in self.gates[:count]:
+            gate.set()
+
+    async def synthesize_streaming(self, text, lang, voice=None):
+        self.calls += 1
+        try:
+            for n, (gate, chunk) in enumerate(zip(self.gates, self.chunks)):
+                if n == self.fail_after:
+                    raise RuntimeError("upstream broke")
+                await gate.wait()
+                yield chunk
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+async def collect(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_concurrent_requests_share_one_flight():
+    async def run():
+        tts = ScriptedTTS()
+        coalescer = SynthesisCoalescer(tts)
+        first = asyncio.create_task(collect(coalescer.synthesize_streaming("hi", "en")))
+        second = asyncio.create_task(collect(coalescer.synthesize_streaming("hi", "en")))
+        other = asyncio.create_task(collect(coalescer.synthesize_streaming("hi", "de")))
+        await asyncio.sleep(0)
+        tts.release()
+        results = await asyncio.gather(first, second, other)
+        return tts, coalescer, results
+
+    tts, coalescer, results = asyncio.run(run())
+    assert results == [[b"a", b"b", b"c"]] * 3
+    assert tts.calls == 2
+    assert coalescer.stats() == {"requests": 3, "coalesced": 1, "in_flight": 0}
+
+
+def test_late_joiner_replays_produced_chunks():
+    async def run():
+        tts = ScriptedTTS()
+        coalescer = SynthesisCoalescer(tts)
+        first = asyncio.create_task(collect(coalescer.synthesize_streaming("hi", "en")))
+        await asyncio.sleep(0)
+        tts.release(2)
+        while coalescer._flights[("hi", "en", None)].chunks != [b"a", b"b"]:
+            await asyncio.sleep(0)
+        late = asyncio.create_task(collect(coalescer.synthesize_streaming("hi", "en")))
+        await asyncio.sleep(0)
+        tts.release()
+        return tts, await first, await late
+
+    tts, first, late = asyncio.run(run())
+    assert first == late == [b"a", b"b", b"c"]
+    assert tts.calls == 1
+
+
+def test_last_subscriber_leaving_cancels_upstream():
+    async def run():
+        tts = ScriptedTTS()
+        coalescer = SynthesisCoalescer(tts)
+        subscribers = [asyncio.create_task(collect(coalescer.synthesize_streaming("hi", "en"))) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        subscribers[0].cancel()
+        await asyncio.sleep(0.01)
+        still_running = not tts.cancelled
+        subscribers[1].cancel()
+        await asyncio.gather(*subscribers, return_exceptions=True)
+        await asyncio.sleep(0.01)
+        return tts, coalescer, still_running
+
+    tts, coalescer, still_running = asyncio.run(run())
+    assert still_running
+    assert tts.cancelled
+    assert coalescer.in_flight == 0
+
+
+def test_upstream_error_reaches_every_subscriber():
+    async def run():
+        tts = ScriptedTTS(fail_after=1)
+        coalescer = SynthesisCoalescer(tts)
+        tts.release()
+        return await asyncio.gather(*(collect(coalescer.synthesize_streaming("hi", "en")) for _ in range(3)),
+                                    return_exceptions=True), coalescer
+
+    results, coalescer = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert coalescer.in_flight == 0
+
+
+def test_finished_flight_is_not_reused():
+    async def run():
+        tts = ScriptedTTS()
+        tts.release()
+        coalescer = SynthesisCoalescer(tts)
+        await collect(coalescer.synthesize_streaming("hi", "en"))
+        await collect(coalescer.synthesize_streaming("hi", "en"))
+        return tts
+
+    assert asyncio.run(run()).calls == 2
+
@@ -0,0 +1,169 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from upstream_pool import UpstreamPool, parse_upstreams
+
+
+def synthesize(spec: str, text: str = "Hello there", lang: str = "en", hedge_deadline_ms: float = 400):
+    """Run one request through a pool built from `spec`; returns (audio, stats, seconds)."""
+    async def run():
+        pool = UpstreamPool(parse_upstreams(spec, pool_size=2), hedge_deadline_ms=hedge_deadline_ms)
+        started = time.perf_counter()
+        try:
+            audio = b"".join([chunk async for chunk in pool.synthesize_streaming(text, lang)])
+            return audio, pool.stats(), time.perf_counter() - started
+        finally:
+            await pool.close()
+
+    return asyncio.run(run())
+
+
+def logged(base: str) -> list:
+    return httpx.get(f"{base}/_requests").json()
+
+
+def test_fails_over_when_primary_errors_before_hedge_deadline(fake_upstream):
+    before = len(logged(fake_upstream))
+    audio, stats, _ = synthesize(f"azure:a={fake_upstream}/fail,azure:b={fake_upstream}")
+    assert audio
+    assert stats["failovers"] == 1 and stats["hedges"] == 0
+    assert [entry["behaviour"] for entry in logged(fake_upstream)[before:]] == ["fail", "ok"]
+
+
+def test_fails_over_past_the_hedge_target(fake_upstream):
+    audio, stats, _ = synthesize(f"azure:a={fake_upstream}/fail,azure:b={fake_upstream}/fail,"
+                                 f"elevenlabs:c={fake_upstream}")
+    assert audio
+    assert stats["failovers"] == 2
+
+
+def test_raises_when_every_backend_fails(fake_upstream):
+    with pytest.raises(httpx.HTTPStatusError):
+        synthesize(f"azure:a={fake_upstream}/fail,azure:b={fake_upstream}/fail")
+
+
+def test_hedges_a_slow_primary(fake_upstream):
+    audio, stats, seconds = synthesize(f"azure:a={fake_upstream}/slow-2000,azure:b={fake_upstream}",
+                                       hedge_deadline_ms=100)
+    assert audio
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    assert seconds < 1.5
+
+
+def test_no_hedge_when_primary_is_fast(fake_upstream):
+    before = len(logged(fake_upstream))
+    _, stats, _ = synthesize(f"azure:a={fake_upstream},azure:b={fake_upstream}", hedge_deadline_ms=1000)
+    assert stats["hedges"] == 0
+    assert len(logged(fake_upstream)) - before == 1
+
+
+def test_backends_stream_the_same_pcm_format(fake_upstream):
+    before = len(logged(fake_upstream))
+    azure, stats, _ = synthesize(f"azure:a={fake_upstream}")
+    eleven, _, _ = synthesize(f"elevenlabs:a={fake_upstream}")
+    assert stats["output_format"] == {"encoding": "pcm16", "sample_rate": 24000}
+    assert [entry["sample_rate"] for entry in logged(fake_upstream)[before:]] == [24000, 24000]
+    assert len(azure) == len(eleven)
+
+
+def test_mixed_sample_rates_are_rejected():
+    backends = parse_upstreams("azure:a=http://127.0.0.1:1", sample_rate=16000) + \
+        parse_upstreams("azure:b=http://127.0.0.1:1", sample_rate=24000)
+    with pytest.raises(ValueError):
+        UpstreamPool(backends)
+
+
+def test_default_voice_follows_language(fake_upstream):
+    before = len(logged(fake_upstream))
+    synthesize(f"azure:a={fake_upstream}", text="Hola", lang="es")
+    synthesize(f"azure:a={fake_upstream}", text="Bonjour", lang="fr-CA")
+    synthesize(f"azure:a={fake_upstream}", text="Sawubona", lang="zu")
+    voices = [entry["voice"] for entry in logged(fake_upstream)[before:]]
+    assert voices == ["es-ES-ElviraNeural", "fr-FR-DeniseNeural", "en-US-JennyMultilingualNeural"]
+
+
+def client_ports(base: str, since: int) -> set:
+    return set(httpx.get(f"{base}/_connections").json()[since:])
+
+
+def test_initialize_pre_opens_the_pool(fake_upstream):
+    async def run():
+        pool = UpstreamPool(parse_upstreams(f"azure:a={fake_upstream}", pool_size=3), keepwarm_s=0)
+        before = len(httpx.get(f"{fake_upstream}/_connections").json())
+        try:
+            await pool.initialize()
+            warmed = client_ports(fake_upstream, before)
+            for _ in range(3):
+                b"".join([chunk async for chunk in pool.synthesize_streaming("Hi", "en")])
+            return warmed, client_ports(fake_upstream, before)
+        finally:
+            await pool.close()
+
+    warmed, used = asyncio.run(run())
+    assert len(warmed) == 3
+    # Requests ride the pre-opened connections: no new handshakes
+    assert used == warmed
+
+
+def test_concurrent_requests_stay_within_pool_size(fake_upstream):
+    async def run():
+        pool = UpstreamPool(parse_upstreams(f"azure:a={fake_upstream}", pool_size=2))
+        before = len(httpx.get(f"{fake_upstream}/_connections").json())
+
+        async def one():
+            return b"".join([chunk async for chunk in pool.synthesize_streaming("Hello there", "en")])
+
+        try:
+            audio = await asyncio.gather(*(one() for _ in range(6)))
+            return audio, client_ports(fake_upstream, before)
+        finally:
+            await pool.close()
+
+    audio, ports = asyncio.run(run())
+    assert all(audio)
+    assert len(ports) <= 2
+
+
+def test_keep_warm_outlives_the_keepalive_expiry(fake_upstream):
+    async def run(keepwarm_s):
+        backends = parse_upstreams(f"azure:a={fake_upstream}", pool_size=2, keepalive_s=0.3)
+        pool = UpstreamPool(backends, keepwarm_s=keepwarm_s)
+        before = len(httpx.get(f"{fake_upstream}/_connections").json())
+        try:
+            await pool.initialize()
+            warmed = client_ports(fake_upstream, before)
+            await asyncio.sleep(0.8)
+            b"".join([chunk async for chunk in pool.synthesize_streaming("Hi", "en")])
+            return warmed, client_ports(fake_upstream, before)
+        finally:
+            await pool.close()
+
+    warmed, used = asyncio.run(run(keepwarm_s=0.1))
+    assert used == warmed
+    # Without re-warming the pre-opened connections expire and the request opens a new one
+    warmed, used = asyncio.run(run(keepwarm_s=0))
+    assert used - warmed
+
+
+def test_mid_stream_drop_reaches_the_caller(fake_upstream):
+    async def run():
+        pool = UpstreamPool(parse_upstreams(f"azure:a={fake_upstream}/drop,azure:b={fake_upstream}"))
+        received = []
+        try:
+            async for chunk in pool.synthesize_streaming("Hello there, a longer sentence", "en"):
+                received.append(chunk)
+        except httpx.HTTPError as e:
+            return received, e, pool.stats()
+        finally:
+            await pool.close()
+        return received, None, pool.stats()
+
+    before = len(logged(fake_upstream))
+    received, error, stats = asyncio.run(run())
+    assert received and error is not None
+    # Audio already reached the caller, so nothing is replayed from another backend
+    assert stats["failovers"] == 0 and stats["hedges"] == 0
+    assert [entry["behaviour"] for entry in logged(fake_upstream)[before:]] == ["drop"]
@@ -0,0 +1,104 @@
+import asyncio
+
+import numpy as np
+
+from voice_residency import VoiceResidencyManager
+
+
+def load_all(manager: VoiceResidencyManager, voice_ids):
+    async def run():
+        loaded = {}
+        for voice_id in voice_ids:
+            async with manager.use(voice_id) as voice_model:
+                loaded[voice_id] = voice_model
+        return loaded
+
+    return asyncio.run(run())
+
+
+def embedding_for(voice_id: str) -> np.ndarray:
+    return np.frombuffer(voice_id.encode().ljust(8, b"\0"), dtype=np.uint8).astype(np.float32)
+
+
+def test_similar_voice_ids_never_share_an_embedding_file(tmp_path):
+    voice_ids = ["a/b", "a:b", "a_b"]
+    load_all(VoiceResidencyManager(embedding_for, embedding_dir=str(tmp_path)), voice_ids)
+    assert len(list(tmp_path.glob("*.npy"))) == 3
+
+    # A fresh manager reads each voice's own embedding back from disk
+    loaded = load_all(VoiceResidencyManager(lambda _: None, embedding_dir=str(tmp_path)), voice_ids)
+    for voice_id in voice_ids:
+        assert np.array_equal(loaded[voice_id], embedding_for(voice_id))
+
+
+def test_model_version_separates_embeddings(tmp_path):
+    load_all(VoiceResidencyManager(embedding_for, embedding_dir=str(tmp_path), model_version="v1"), ["voice"])
+    reloaded = load_all(VoiceResidencyManager(lambda _: np.zeros(2), embedding_dir=str(tmp_path),
+                                              model_version="v2"), ["voice"])
+    assert np.array_equal(reloaded["voice"], np.zeros(2))
+
+
+def test_embedding_dir_expands_user(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    manager = VoiceResidencyManager(embedding_for, embedding_dir="~/voices")
+    assert manager.embedding_dir == tmp_path / "voices"
+
+
+def test_per_voice_stats_are_bounded(tmp_path):
+    manager = VoiceResidencyManager(embedding_for, memory_budget_mb=1e-6, embedding_dir=None,
+                                    max_tracked_voices=10)
+    load_all(manager, [f"voice-{i}" for i in range(100)])
+    stats = manager.stats()
+    assert len(stats["voices"]) <= 10
+    assert stats["totals"]["misses"] == 100
+
+
+class Voice:
+    def __init__(self, mb: float):
+        self.size_bytes = int(mb * 1024 * 1024)
+
+
+def test_default_budget_is_finite():
+    assert VoiceResidencyManager(embedding_for, embedding_dir=None).memory_budget > 0
+
+
+def test_new_voice_over_remaining_budget_stays_resident():
+    sizes = {"a": 3, "b": 3, "big": 8}
+    manager = VoiceResidencyManager(lambda voice_id: Voice(sizes[voice_id]), memory_budget_mb=10,
+                                    embedding_dir=None)
+
+    async def run():
+        # "a" and "b" are mid-synthesis, so loading "big" cannot make room for it
+        async with manager.use("a"), manager.use("b"):
+            async with manager.use("big") as first:
+                assert "big" in manager._resident
+                async with manager.use("big") as second:
+                    assert second is first
+
+    asyncio.run(run())
+    assert manager.stats()["voices"]["big"]["loads"] == 1
+
+
+def test_concurrent_loaders_share_one_pinned_load():
+    manager = VoiceResidencyManager(lambda _: Voice(8), memory_budget_mb=4, embedding_dir=None)
+
+    async def run():
+        async def synth():
+            async with manager.use("big") as voice_model:
+                await asyncio.sleep(0.01)
+                return voice_model
+        return await asyncio.gather(synth(), synth(), synth())
+
+    models = asyncio.run(run())
+    assert models[0] is models[1] is models[2]
+    # Over budget on its own: resident while pinned, evicted once every caller is done
+    assert manager.stats()["totals"]["loads"] == 1
+    assert manager.resident_bytes == 0 and not manager._waiting
+
+
+def test_disk_hits_are_counted(tmp_path):
+    load_all(VoiceResidencyManager(embedding_for, embedding_dir=str(tmp_path)), ["voice"])
+    manager = VoiceResidencyManager(embedding_for, embedding_dir=str(tmp_path))
+    load_all(manager, ["voice"])
+    assert manager.stats()["totals"]["disk_hits"] == 1
+    assert manager.stats()["voices"]["voice"]["disk_hits"] == 1
@@ -0,0 +1,46 @@
+import os
+from typing import Optional
+
+PCM16 = "pcm16"
+
+ENGINE_ENCODING = os.getenv("TTS_ENGINE_ENCODING", PCM16)
+ENGINE_SAMPLE_RATE = int(os.getenv("TTS_INPUT_SAMPLE_RATE", "24000"))
+
+
+class AudioFormat:
+    """Encoding and sample rate of the audio a synthesis source streams.
+
+    Sources declare it as an `output_format` attribute; wrappers (coalescing,
+    stitching, voice residency, the upstream pool) report their source's.
+    """
+
+    def __init__(self, encoding: str, sample_rate: int):
+        self.encoding = encoding
+        self.sample_rate = int(sample_rate)
+
+    @property
+    def is_pcm(self) -> bool:
+        return self.encoding == PCM16
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, AudioFormat)
+                and (self.encoding, self.sample_rate) == (other.encoding, other.sample_rate))
+
+    def __hash__(self) -> int:
+        return hash((self.encoding, self.sample_rate))
+
+    def __repr__(self) -> str:
+        return f"{self.encoding}@{self.sample_rate}"
+
+    def as_dict(self) -> dict:
+        return {"encoding": self.encoding, "sample_rate": self.sample_rate}
+
+
+def source_format(source) -> AudioFormat:
+    """`source.output_format`, else what the local engine is configured to emit.
+
+    Local engines that do not declare a format are described by
+    TTS_ENGINE_ENCODING (default pcm16) and TTS_INPUT_SAMPLE_RATE.
+    """
+    declared: Optional[AudioFormat] = getattr(source, "output_format", None)
+    return declared if declared is not None else AudioFormat(ENGINE_ENCODING, ENGINE_SAMPLE_RATE)
@@ -0,0 +1,154 @@
+import os
+import math
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from audio_format import ENGINE_SAMPLE_RATE, source_format
+
+OUTPUT_SAMPLE_RATE = int(os.getenv("TTS_OUTPUT_SAMPLE_RATE", "16000"))
+TARGET_DBFS = float(os.getenv("TTS_TARGET_DBFS", "-20"))
+MAX_CHUNK_SAMPLES = int(os.getenv("TTS_MAX_CHUNK_SAMPLES", "8192"))
+ANTI_ALIAS_TAPS = int(os.getenv("TTS_ANTI_ALIAS_TAPS", "63"))
+
+
+def lowpass_taps(cutoff: float, taps: int) -> np.ndarray:
+    """Blackman-windowed sinc low-pass, `cutoff` in cycles per input sample, unity DC gain."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class AudioPostProcessor:
+    """Streaming resample + loudness normalization for mono PCM16 TTS output.
+
+    One instance per connection; call `reset()` between utterances. State
+    carried across chunks: the anti-alias filter's input tail, the last input
+    sample and fractional read position for the linear-interpolation
+    resampler, the smoothed loudness estimate and the gain applied at the end
+    of the previous chunk. All working arrays are allocated up front; `process`
+    only writes into them (the returned bytes object handed to the socket is
+    the one allocation per chunk).
+
+    Downsampling first low-passes the input with a FIR below the output
+    Nyquist frequency, so content above it does not alias.
+    """
+
+    def __init__(self, input_rate: int = ENGINE_SAMPLE_RATE, output_rate: int = OUTPUT_SAMPLE_RATE,
+                 target_dbfs: float = TARGET_DBFS, max_chunk_samples: int = MAX_CHUNK_SAMPLES,
+                 max_gain_db: float = 18.0, smoothing: float = 0.9, anti_alias_taps: int = ANTI_ALIAS_TAPS):
+        self.input_rate = input_rate
+        self.output_rate = output_rate
+        self.step = input_rate / output_rate
+        self.target_rms = 32768.0 * 10 ** (target_dbfs / 20)
+        self.max_gain = 10 ** (max_gain_db / 20)
+        self.smoothing = smoothing
+        # Pass band up to 90% of the output Nyquist frequency
+        self._fir = lowpass_taps(0.45 / self.step, anti_alias_taps) if self.step > 1 and anti_alias_taps > 1 else None
+        self._history = len(self._fir) - 1 if self._fir is not None else 0
+        self._allocate(max_chunk_samples)
+        self.reset()
+
+    @classmethod
+    def for_source(cls, source, **kwargs) -> "AudioPostProcessor":
+        """A post-processor for the stream `source` produces; only PCM16 can be processed."""
+        input_format = source_format(source)
+        if not input_format.is_pcm:
+            raise ValueError(f"TTS post-processing needs PCM16 input, the synthesis source streams {input_format}")
+        return cls(input_rate=input_format.sample_rate, **kwargs)
+
+    def _allocate(self, max_chunk_samples: int):
+        # Reallocation happens mid-utterance for oversized chunks, so carried samples are kept
+        previous_input = getattr(self, "_input", None)
+        previous_raw = getattr(self, "_raw", None)
+        self.max_chunk_samples = max_chunk_samples
+        max_out = int(math.ceil((max_chunk_samples + 1) / self.step)) + 1
+        # Input is kept with one sample of history in front of it
+        self._input = np.zeros(max_chunk_samples + 1, dtype=np.float32)
+        # Unfiltered input with the FIR's tail from the previous chunk in front of it
+        self._raw = np.zeros(self._history + max_chunk_samples, dtype=np.float32)
+        if previous_input is not None:
+            self._input[0] = previous_input[0]
+            self._raw[:self._history] = previous_raw[:self._history]
+        self._counter = np.arange(max_out, dtype=np.float64)
+        self._positions = np.empty(max_out, dtype=np.float64)
+        self._frac = np.empty(max_out, dtype=np.float64)
+        self._index = np.empty(max_out, dtype=np.intp)
+        self._left = np.empty(max_out, dtype=np.float32)
+        self._right = np.empty(max_out, dtype=np.float32)
+        self._ramp = np.empty(max_out, dtype=np.float32)
+        self._output = np.empty(max_out, dtype=np.int16)
+
+    def reset(self):
+        self._position = 1.0  # read position into `_input`, index 0 is history
+        self._input[0] = 0.0
+        self._raw[:self._history] = 0.0
+        self._mean_square: Optional[float] = None
+        self._gain = 1.0
+        self._carry = b""
+
+    def process(self, chunk: bytes) -> bytes:
+        if self._carry:
+            chunk = self._carry + chunk
+        self._carry = chunk[len(chunk) & ~1:]
+        samples = np.frombuffer(chunk, dtype="<i2", count=len(chunk) // 2)
+        if len(samples) > self.max_chunk_samples:
+            self._allocate(len(samples))
+        if not len(samples):
+            return b""
+
+        n_in = len(samples)
+        source = self._input[:n_in + 1]
+        if self._fir is None:
+            source[1:] = samples
+        else:
+            raw = self._raw[:self._history + n_in]
+            raw[self._history:] = samples
+            np.dot(sliding_window_view(raw, len(self._fir)), self._fir[::-1], out=source[1:])
+            raw[:self._history] = raw[n_in:]
+
+        # Output sample k reads input position `_position + k * step` (linear interpolation)
+        n_out = int((n_in - self._position) // self.step) + 1
+        if n_out <= 0:
+            self._position -= n_in
+            source[0] = source[n_in]
+            return b""
+        positions = np.multiply(self._counter[:n_out], self.step, out=self._positions[:n_out])
+        positions += self._position
+        index = self._index[:n_out]
+        np.floor(positions, out=self._frac[:n_out])
+        index[:] = self._frac[:n_out]
+        frac = np.subtract(positions, self._frac[:n_out], out=self._frac[:n_out])
+        left = np.take(source, index, out=self._left[:n_out])
+        np.add(index, 1, out=index)
+        np.minimum(index, n_in, out=index)
+        right = np.take(source, index, out=self._right[:n_out])
+        right -= left
+        right *= frac
+        left += right
+        resampled = left
+
+        # Carry state: the next chunk's index 0 is this chunk's last sample
+        self._position = positions[-1] + self.step - n_in
+        source[0] = source[n_in]
+
+        # Running loudness: exponentially smoothed mean square across chunks
+        mean_square = float(np.dot(resampled, resampled)) / n_out
+        if self._mean_square is None:
+            self._mean_square = mean_square
+        else:
+            self._mean_square = self.smoothing * self._mean_square + (1 - self.smoothing) * mean_square
+        rms = math.sqrt(self._mean_square)
+        gain = min(self.target_rms / rms, self.max_gain) if rms > 1.0 else self._gain
+
+        # Ramp from the previous chunk's gain to avoid zipper noise at chunk seams
+        ramp = np.multiply(self._counter[:n_out], (gain - self._gain) / n_out, out=self._ramp[:n_out])
+        ramp += self._gain
+        resampled *= ramp
+        self._gain = gain
+
+        np.clip(resampled, -32768, 32767, out=resampled)
+        output = self._output[:n_out]
+        output[:] = resampled
+        return output.tobytes()
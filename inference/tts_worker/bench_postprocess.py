@@ -0,0 +1,47 @@
+"""Microbenchmark for the TTS post-processing stage.
+
+Usage: python bench_postprocess.py [--chunk-ms 40] [--input-rate 24000] [--output-rate 16000]
+"""
+import time
+import argparse
+
+import numpy as np
+
+from audio_postprocess import AudioPostProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunk-ms", type=float, default=40)
+    parser.add_argument("--input-rate", type=int, default=24000)
+    parser.add_argument("--output-rate", type=int, default=16000)
+    parser.add_argument("--seconds", type=float, default=60, help="Audio duration to process")
+    args = parser.parse_args()
+
+    chunk_samples = int(args.input_rate * args.chunk_ms / 1000)
+    n_chunks = int(args.seconds * 1000 / args.chunk_ms)
+    t = np.arange(chunk_samples * n_chunks) / args.input_rate
+    audio = (8000 * np.sin(2 * np.pi * 220 * t)).astype("<i2").tobytes()
+    chunk_bytes = chunk_samples * 2
+    chunks = [audio[i:i + chunk_bytes] for i in range(0, len(audio), chunk_bytes)]
+
+    processor = AudioPostProcessor(args.input_rate, args.output_rate, max_chunk_samples=chunk_samples)
+    for chunk in chunks[:50]:
+        processor.process(chunk)
+    processor.reset()
+
+    timings = np.empty(len(chunks))
+    for i, chunk in enumerate(chunks):
+        started = time.perf_counter()
+        processor.process(chunk)
+        timings[i] = time.perf_counter() - started
+
+    timings *= 1e6
+    print(f"{len(chunks)} chunks of {args.chunk_ms:g}ms, {args.input_rate}Hz -> {args.output_rate}Hz")
+    print(f"per chunk: mean {timings.mean():.1f}us  p50 {np.percentile(timings, 50):.1f}us  "
+          f"p99 {np.percentile(timings, 99):.1f}us")
+    print(f"real-time factor: {timings.sum() / 1e6 / args.seconds:.5f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,108 @@
+import sys
+import time
 import logging
+from pathlib import Path
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from tts_service import TTSService
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from common.capacity import AdmissionController, load_router
+from common.engines import Engines, readiness_router
+from common.instrumentation import ACTIVE_CONNECTIONS, metrics_router, new_trace_id, stage
+from common.profiling import debug_router
+from synthesis_stack import SynthesisStack
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+engines = Engines()
+tts_engine = engines.add("tts", SynthesisStack)
+
 app = FastAPI(title="LumaTalk TTS Worker")
-tts_service = TTSService()
+app.include_router(metrics_router)
+app.include_router(debug_router)
+app.include_router(readiness_router(engines, "tts_worker"))
+
+# Turn new sessions away (with a retry hint) once TTS_MAX_STREAMS or the first-chunk budget is hit
+admission = AdmissionController.from_env("TTS", "/ws/tts", latency_stage="tts_first_chunk")
+app.include_router(load_router("tts_worker", [admission]))
 
 @app.on_event("startup")
 async def startup_event():
-    logger.info("Initializing TTS service...")
-    await tts_service.initialize()
-    logger.info("TTS service ready")
+    logger.info("Loading TTS service in the background...")
+    engines.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if tts_engine.ready:
+        await tts_engine.get().close()
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "tts_worker"}
 
+@app.get("/stats")
+async def stats():
+    if not tts_engine.ready:
+        return {}
+    return tts_engine.get().stats()
+
 @app.websocket("/ws/tts")
 async def websocket_tts(websocket: WebSocket):
     await websocket.accept()
+    if not engines.ready:
+        # 1013 Try Again Later: the client should retry once /ready reports ready
+        await websocket.close(code=1013)
+        return
+    if not admission.try_admit():
+        await admission.reject(websocket)
+        return
     logger.info("Client connected to TTS WebSocket")
 
+    # Everything after admission runs inside the try, so the slot is always released
     try:
-        while True:
-            # Receive text to synthesize
-            data = await websocket.receive_json()
-            text = data.get("text")
-            lang = data.get("lang", "en")
-            voice = data.get("voice")
+        stack = tts_engine.get()
+        synthesizer = stack.synthesizer
+        postprocessor = stack.new_postprocessor()
+
+        with ACTIVE_CONNECTIONS.labels("/ws/tts").track():
+            while True:
+                # Receive text to synthesize
+                data = await websocket.receive_json()
+                text = data.get("text")
+                lang = data.get("lang", "en")
+                voice = data.get("voice")
+                trace_id = data.get("trace_id") or new_trace_id()
 
-            # Stream TTS audio
-            async for audio_chunk in tts_service.synthesize_streaming(text, lang, voice):
-                await websocket.send_bytes(audio_chunk)
+                # Stream TTS audio
+                if postprocessor:
+                    postprocessor.reset()
+                started = time.perf_counter()
+                first_chunk = None
+                async for audio_chunk in synthesizer.synthesize_streaming(text, lang, voice):
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - started
+                        stage("tts_first_chunk").observe(first_chunk)
+                    if postprocessor:
+                        audio_chunk = postprocessor.process(audio_chunk)
+                        if not audio_chunk:
+                            continue
+                    await websocket.send_bytes(audio_chunk)
+                total = time.perf_counter() - started
+                stage("tts_total").observe(total)
+                logger.debug(f"[trace {trace_id}] first chunk {(first_chunk or total) * 1000:.0f}ms, "
+                             f"total {total * 1000:.0f}ms")
 
-            # Send completion signal
-            await websocket.send_json({"type": "tts_complete"})
+                # Send completion signal
+                await websocket.send_json({"type": "tts_complete", "trace_id": trace_id})
 
     except WebSocketDisconnect:
         logger.info("Client disconnected from TTS WebSocket")
     except Exception as e:
         logger.error(f"Error in TTS WebSocket: {e}")
         await websocket.close(code=1011)
+    finally:
+        admission.release()
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8003)
+    from common.server import serve
+    serve(app, "main:app", port=8003, app_dir=str(Path(__file__).resolve().parent))
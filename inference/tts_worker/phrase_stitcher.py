@@ -0,0 +1,161 @@
+import os
+import re
+import json
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from audio_format import PCM16, AudioFormat, source_format
+
+logger = logging.getLogger(__name__)
+
+CHUNK_BYTES = int(os.getenv("TTS_STITCH_CHUNK_BYTES", "4096"))
+
+_PUNCTUATION = re.compile(r"[^\w\s:']+", re.UNICODE)
+
+
+def normalize(text: str) -> List[str]:
+    """Lower-case word tokens; punctuation is dropped, times like 10:30 stay one token."""
+    return _PUNCTUATION.sub(" ", text.lower()).split()
+
+
+class FragmentIndex:
+    """Pre-synthesized PCM16 fragments keyed by (lang, voice, normalized phrase).
+
+    Built from a manifest JSON:
+
+        {
+          "format": "pcm16",
+          "sample_rate": 24000,
+          "crossfade_ms": 8,
+          "fragments": [
+            {"lang": "en", "voice": null, "text": "good morning", "file": "en/good_morning.pcm"},
+            ...
+          ]
+        }
+
+    Fragment files are raw little-endian mono PCM16 at `sample_rate`; paths are
+    relative to the manifest. Opus fragments are not accepted because a
+    crossfade needs decoded samples. Empty fragment files are skipped. `sample_rate` must match what the
+    fallback synthesis source streams.
+    """
+
+    def __init__(self, fragments: Dict[Tuple[str, Optional[str], Tuple[str, ...]], np.ndarray],
+                 sample_rate: int, crossfade_ms: float):
+        self.fragments = fragments
+        self.sample_rate = sample_rate
+        self.crossfade = int(sample_rate * crossfade_ms / 1000)
+        self.max_words = max((len(words) for _, _, words in fragments), default=0)
+
+    @classmethod
+    def load(cls, manifest_path: str) -> "FragmentIndex":
+        manifest_path = Path(manifest_path)
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+        if manifest.get("format", PCM16) != PCM16:
+            raise ValueError(f"{manifest_path}: fragments must be raw PCM16, not {manifest['format']}")
+        fragments = {}
+        for fragment in manifest["fragments"]:
+            pcm = np.fromfile(manifest_path.parent / fragment["file"], dtype="<i2")
+            if not len(pcm):
+                logger.warning(f"Skipping empty TTS fragment {fragment['file']}")
+                continue
+            key = (fragment["lang"], fragment.get("voice"), tuple(normalize(fragment["text"])))
+            fragments[key] = pcm.astype(np.float32)
+        logger.info(f"Loaded {len(fragments)} TTS fragments from {manifest_path}")
+        return cls(fragments, manifest["sample_rate"], manifest.get("crossfade_ms", 8))
+
+    def match(self, text: str, lang: str, voice: Optional[str]) -> Optional[List[np.ndarray]]:
+        """Greedy longest-phrase cover of `text`, or None if any word is not covered."""
+        words = normalize(text)
+        if not words:
+            return None
+
+        pieces = []
+        position = 0
+        while position < len(words):
+            for length in range(min(self.max_words, len(words) - position), 0, -1):
+                fragment = self.fragments.get((lang, voice, tuple(words[position:position + length])))
+                if fragment is not None:
+                    pieces.append(fragment)
+                    position += length
+                    break
+            else:
+                return None
+        return pieces
+
+    def stitch(self, pieces: List[np.ndarray]) -> np.ndarray:
+        """Concatenate fragments with linear crossfades in a single vectorized overlap-add.
+
+        The fade-out and fade-in ramps sum to exactly 1 across every seam, so a
+        steady signal passes through at constant level.
+        """
+        lengths = np.array([len(piece) for piece in pieces])
+        fade = int(min(self.crossfade, lengths.min() // 2)) if len(pieces) > 1 else 0
+        samples = np.concatenate(pieces)
+
+        # Gain envelope over the concatenated samples: ramp down before and up after every seam
+        gain = np.ones(len(samples))
+        if fade:
+            seams = np.cumsum(lengths[:-1])[:, None]
+            fade_in = (np.arange(fade) + 0.5) / fade
+            gain[seams - fade + np.arange(fade)] = 1.0 - fade_in
+            gain[seams + np.arange(fade)] = fade_in
+
+        # Each fragment is shifted left by `fade` samples per preceding seam so the ramps overlap
+        shifts = np.repeat(np.arange(len(pieces)) * fade, lengths)
+        positions = np.arange(len(samples)) - shifts
+        output = np.bincount(positions, weights=samples * gain, minlength=int(positions[-1]) + 1)
+
+        return np.clip(np.rint(output), -32768, 32767).astype("<i2")
+
+
+class StitchingSynthesizer:
+    """Serves templated utterances from cached fragments, falling back to full synthesis.
+
+    Both paths reach the same client, so the fallback source must stream PCM16
+    at the index's sample rate; anything else is refused at load.
+    """
+
+    def __init__(self, source, index: FragmentIndex):
+        fallback = source_format(source)
+        if not fallback.is_pcm:
+            raise ValueError(f"TTS_STITCH_INDEX needs a PCM16 synthesis source, got {fallback}")
+        if fallback.sample_rate != index.sample_rate:
+            raise ValueError(f"TTS_STITCH_INDEX fragments are {index.sample_rate}Hz but synthesis "
+                             f"streams {fallback.sample_rate}Hz")
+        self.source = source
+        self.index = index
+        self.output_format = AudioFormat(PCM16, index.sample_rate)
+        self.stitched = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_env(cls, source):
+        manifest = os.getenv("TTS_STITCH_INDEX", "")
+        if not manifest:
+            return None
+        return cls(source, FragmentIndex.load(manifest))
+
+    async def synthesize_streaming(self, text: str, lang: str, voice: Optional[str] = None) -> AsyncIterator[bytes]:
+        pieces = self.index.match(text, lang, voice)
+        if pieces is None:
+            self.fallbacks += 1
+            async for chunk in self.source.synthesize_streaming(text, lang, voice):
+                yield chunk
+            return
+
+        self.stitched += 1
+        audio = self.index.stitch(pieces).tobytes()
+        for offset in range(0, len(audio), CHUNK_BYTES):
+            yield audio[offset:offset + CHUNK_BYTES]
+
+    def stats(self) -> dict:
+        total = self.stitched + self.fallbacks
+        return {
+            "stitched": self.stitched,
+            "fallbacks": self.fallbacks,
+            "stitched_fraction": self.stitched / total if total else 0.0,
+            "fragments": len(self.index.fragments),
+        }
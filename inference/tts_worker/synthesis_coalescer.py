@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from audio_format import source_format
+
+logger = logging.getLogger(__name__)
+
+FlightKey = Tuple[str, str, Optional[str]]
+
+
+class _Flight:
+    """One in-progress synthesis whose chunks are fanned out to every subscriber."""
+
+    def __init__(self, key: FlightKey):
+        self.key = key
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: bytes):
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.done = True
+        self.error = error
+        self._notify()
+
+    def _notify(self):
+        # Wake everyone waiting on the current event, then arm a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        # Late joiners start at index 0 and replay what was already produced
+        index = 0
+        while True:
+            if index < len(self.chunks):
+                yield self.chunks[index]
+                index += 1
+                continue
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class SynthesisCoalescer:
+    """Single-flight wrapper around TTSService.synthesize_streaming.
+
+    Concurrent requests for the same (text, lang, voice) attach to a single
+    upstream synthesis. The flight is forgotten as soon as it completes, so
+    later requests always trigger a fresh synthesis.
+    """
+
+    def __init__(self, tts_service):
+        self.tts_service = tts_service
+        self.output_format = source_format(tts_service)
+        self._flights: Dict[FlightKey, _Flight] = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def synthesize_streaming(self, text: str, lang: str, voice: Optional[str] = None) -> AsyncIterator[bytes]:
+        key = (text, lang, voice)
+        self.requests += 1
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(key)
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._produce(flight))
+        else:
+            self.coalesced += 1
+            logger.debug(f"Coalescing TTS request onto in-flight synthesis ({len(flight.chunks)} chunks buffered)")
+
+        flight.subscribers += 1
+        try:
+            async for chunk in flight.stream():
+                yield chunk
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more, stop paying for the upstream
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+
+    async def _produce(self, flight: _Flight):
+        text, lang, voice = flight.key
+        try:
+            async for chunk in self.tts_service.synthesize_streaming(text, lang, voice):
+                flight.publish(chunk)
+            flight.finish()
+        except asyncio.CancelledError:
+            flight.finish(ConnectionAbortedError("TTS synthesis cancelled"))
+            raise
+        except Exception as e:
+            logger.error(f"TTS synthesis failed for coalesced request: {e}")
+            flight.finish(e)
+        finally:
+            if self._flights.get(flight.key) is flight:
+                del self._flights[flight.key]
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "coalesced": self.coalesced,
+            "in_flight": self.in_flight,
+        }
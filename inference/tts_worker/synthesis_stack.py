@@ -0,0 +1,82 @@
+import os
+import logging
+
+from common.instrumentation import QUEUE_DEPTH
+
+logger = logging.getLogger(__name__)
+
+
+class SynthesisStack:
+    """TTSService plus the optional stages wrapped around it.
+
+    Shared by the TTS worker and the fused pipeline worker so both emit the
+    same audio.
+
+    Built by the background loader so torch, the cloud SDKs and numpy are
+    imported off the event loop after the server is already listening.
+    """
+
+    def __init__(self):
+        from tts_service import TTSService
+        from synthesis_coalescer import SynthesisCoalescer
+        from upstream_pool import UpstreamPool
+        from voice_residency import VoiceResidencyManager, ResidentVoiceSynthesizer
+        from phrase_stitcher import StitchingSynthesizer
+
+        # Warm pooled connections straight to the cloud backends, hedged across regions;
+        # they replace the local TTSService, which is then never built or initialized
+        self.upstream_pool = UpstreamPool.from_env()
+        self.tts_service = None if self.upstream_pool else TTSService()
+        synthesis_source = self.upstream_pool or self.tts_service
+
+        # Local engines keep hot custom/cloned voices resident within a memory budget
+        self.voice_residency = None
+        if self.upstream_pool is None and ResidentVoiceSynthesizer.supports(self.tts_service):
+            self.voice_residency = VoiceResidencyManager(
+                self.tts_service.load_voice, model_version=str(getattr(self.tts_service, "model_version", "")))
+            synthesis_source = ResidentVoiceSynthesizer(self.tts_service, self.voice_residency)
+
+        # Templated utterances can be assembled from cached fragments instead
+        self.stitcher = StitchingSynthesizer.from_env(synthesis_source)
+        synthesis_source = self.stitcher or synthesis_source
+
+        # Identical concurrent requests (group/broadcast sessions) share one synthesis
+        if os.getenv("TTS_COALESCE_ENABLED", "true").lower() == "true":
+            self.synthesizer = SynthesisCoalescer(synthesis_source)
+            QUEUE_DEPTH.labels("tts_in_flight").set_function(lambda: self.synthesizer.in_flight)
+        else:
+            self.synthesizer = synthesis_source
+
+        # Resample and loudness-normalize PCM16 output before it leaves the worker, from the
+        # rate the synthesis source actually streams (refused at load if it is not PCM16)
+        self.postprocess = os.getenv("TTS_POSTPROCESS_ENABLED", "false").lower() == "true"
+        if self.postprocess:
+            from audio_postprocess import AudioPostProcessor
+            AudioPostProcessor.for_source(self.synthesizer)
+
+    async def initialize(self):
+        if self.tts_service:
+            await self.tts_service.initialize()
+        if self.upstream_pool:
+            logger.info("Pre-opening TTS upstream connections...")
+            await self.upstream_pool.initialize()
+
+    async def close(self):
+        if self.upstream_pool:
+            await self.upstream_pool.close()
+
+    def new_postprocessor(self):
+        if not self.postprocess:
+            return None
+        from audio_postprocess import AudioPostProcessor
+        return AudioPostProcessor.for_source(self.synthesizer)
+
+    def stats(self) -> dict:
+        components = {
+            "coalescing": self.synthesizer,
+            "upstreams": self.upstream_pool,
+            "voices": self.voice_residency,
+            "stitching": self.stitcher,
+        }
+        return {name: component.stats() if hasattr(component, "stats") else None
+                for name, component in components.items()}
@@ -0,0 +1,331 @@
+import os
+import json
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+import httpx
+
+from audio_format import PCM16, AudioFormat
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.getenv("TTS_UPSTREAM_POOL_SIZE", "4"))
+DEFAULT_HEDGE_DEADLINE_MS = float(os.getenv("TTS_HEDGE_DEADLINE_MS", "400"))
+# Every backend is asked for raw PCM16 at this rate, so a hedged request reaches
+# the client in the same format whichever backend wins
+DEFAULT_SAMPLE_RATE = int(os.getenv("TTS_UPSTREAM_SAMPLE_RATE", "24000"))
+CHUNK_BYTES = int(os.getenv("TTS_UPSTREAM_CHUNK_BYTES", "4096"))
+# Idle connections close after the keep-alive expiry; the pool re-warms every
+# keep-warm interval (default half the expiry) so it never goes cold between requests
+DEFAULT_KEEPALIVE_S = float(os.getenv("TTS_UPSTREAM_KEEPALIVE_S", "60"))
+DEFAULT_KEEPWARM_S = float(os.getenv("TTS_UPSTREAM_KEEPWARM_S", str(DEFAULT_KEEPALIVE_S / 2)))
+
+# Raw PCM16 output formats per sample rate
+AZURE_PCM_FORMATS = {
+    16000: "raw-16khz-16bit-mono-pcm",
+    22050: "raw-22050hz-16bit-mono-pcm",
+    24000: "raw-24khz-16bit-mono-pcm",
+    44100: "raw-44100hz-16bit-mono-pcm",
+}
+ELEVENLABS_PCM_RATES = (16000, 22050, 24000, 44100)
+
+# Default Azure neural voice per language; AZURE_SPEECH_VOICES (JSON) adds or overrides entries
+AZURE_DEFAULT_VOICES = {
+    "ar": "ar-SA-ZariyahNeural",
+    "de": "de-DE-KatjaNeural",
+    "en": "en-US-JennyNeural",
+    "es": "es-ES-ElviraNeural",
+    "fr": "fr-FR-DeniseNeural",
+    "hi": "hi-IN-SwaraNeural",
+    "it": "it-IT-ElsaNeural",
+    "ja": "ja-JP-NanamiNeural",
+    "ko": "ko-KR-SunHiNeural",
+    "nl": "nl-NL-ColetteNeural",
+    "pl": "pl-PL-ZofiaNeural",
+    "pt": "pt-BR-FranciscaNeural",
+    "ru": "ru-RU-SvetlanaNeural",
+    "tr": "tr-TR-EmelNeural",
+    "zh": "zh-CN-XiaoxiaoNeural",
+}
+
+
+class UpstreamBackend:
+    """A cloud TTS endpoint (one backend in one region) with its own warm connection pool."""
+
+    kind = "generic"
+
+    def __init__(self, region: str, base_url: str, pool_size: int = DEFAULT_POOL_SIZE,
+                 sample_rate: int = DEFAULT_SAMPLE_RATE, keepalive_s: float = DEFAULT_KEEPALIVE_S):
+        self.region = region
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = pool_size
+        self.output_format = AudioFormat(PCM16, sample_rate)
+        self.name = f"{self.kind}:{region}" if region else self.kind
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=keepalive_s,
+            ),
+            timeout=httpx.Timeout(10.0, connect=3.0),
+        )
+
+    def build_request(self, text: str, lang: str, voice: Optional[str]) -> httpx.Request:
+        raise NotImplementedError
+
+    async def warm_up(self, log: bool = True):
+        """Open `pool_size` connections concurrently so they sit idle in the keep-alive pool.
+
+        Any response, including a 4xx, leaves a handshaken connection behind;
+        connections that are already open are reused, which restarts their expiry.
+        """
+        async def _open():
+            try:
+                await self.client.head("/")
+            except httpx.HTTPError as e:
+                logger.warning(f"Warm-up connection to {self.name} failed: {e}")
+
+        await asyncio.gather(*(_open() for _ in range(self.pool_size)))
+        if log:
+            logger.info(f"Pre-opened {self.pool_size} connections to {self.name}")
+
+    async def synthesize_streaming(self, text: str, lang: str, voice: Optional[str] = None) -> AsyncIterator[bytes]:
+        request = self.build_request(text, lang, voice)
+        response = await self.client.send(request, stream=True)
+        try:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes(CHUNK_BYTES):
+                yield chunk
+        finally:
+            await response.aclose()
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class AzureUpstream(UpstreamBackend):
+    kind = "azure"
+
+    def __init__(self, region: str, base_url: Optional[str] = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 sample_rate: int = DEFAULT_SAMPLE_RATE, keepalive_s: float = DEFAULT_KEEPALIVE_S):
+        if sample_rate not in AZURE_PCM_FORMATS:
+            raise ValueError(f"Azure has no raw PCM16 output at {sample_rate}Hz")
+        super().__init__(region, base_url or f"https://{region}.tts.speech.microsoft.com", pool_size, sample_rate,
+                         keepalive_s)
+        self.api_key = os.getenv("AZURE_SPEECH_KEY", "")
+        # Languages without a mapped voice go to a multilingual voice rather than an English one
+        self.fallback_voice = os.getenv("AZURE_SPEECH_DEFAULT_VOICE", "en-US-JennyMultilingualNeural")
+        self.voices: Dict[str, str] = {**AZURE_DEFAULT_VOICES, **json.loads(os.getenv("AZURE_SPEECH_VOICES", "{}"))}
+
+    def default_voice(self, lang: str) -> str:
+        """Voice for `lang` ("es-MX" first, then "es")."""
+        return self.voices.get(lang) or self.voices.get(lang.split("-")[0].lower()) or self.fallback_voice
+
+    def build_request(self, text, lang, voice):
+        voice = voice or self.default_voice(lang)
+        ssml = (
+            f"<speak version='1.0' xml:lang='{escape(lang)}'>"
+            f"<voice name='{escape(voice)}'>{escape(text)}</voice>"
+            f"</speak>"
+        )
+        return self.client.build_request(
+            "POST",
+            "/cognitiveservices/v1",
+            content=ssml.encode("utf-8"),
+            headers={
+                "Ocp-Apim-Subscription-Key": self.api_key,
+                "Content-Type": "application/ssml+xml",
+                "X-Microsoft-OutputFormat": AZURE_PCM_FORMATS[self.output_format.sample_rate],
+                "User-Agent": "lumatalk-tts-worker",
+            },
+        )
+
+
+class ElevenLabsUpstream(UpstreamBackend):
+    kind = "elevenlabs"
+
+    def __init__(self, region: str = "", base_url: Optional[str] = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 sample_rate: int = DEFAULT_SAMPLE_RATE, keepalive_s: float = DEFAULT_KEEPALIVE_S):
+        if sample_rate not in ELEVENLABS_PCM_RATES:
+            raise ValueError(f"ElevenLabs has no PCM16 output at {sample_rate}Hz")
+        super().__init__(region, base_url or "https://api.elevenlabs.io", pool_size, sample_rate, keepalive_s)
+        self.api_key = os.getenv("ELEVENLABS_API_KEY", "")
+        # The multilingual model speaks the language of the text, so one default voice covers every `lang`
+        self.default_voice = os.getenv("ELEVENLABS_DEFAULT_VOICE_ID", "21m00Tcm4TlvDq8ikWAM")
+        self.model_id = os.getenv("ELEVENLABS_MODEL_ID", "eleven_multilingual_v2")
+
+    def build_request(self, text, lang, voice):
+        return self.client.build_request(
+            "POST",
+            f"/v1/text-to-speech/{voice or self.default_voice}/stream",
+            params={"output_format": f"pcm_{self.output_format.sample_rate}"},
+            json={"text": text, "model_id": self.model_id},
+            headers={"xi-api-key": self.api_key},
+        )
+
+
+BACKENDS = {
+    "azure": AzureUpstream,
+    "elevenlabs": ElevenLabsUpstream,
+}
+
+
+def parse_upstreams(spec: str, pool_size: int = DEFAULT_POOL_SIZE, sample_rate: int = DEFAULT_SAMPLE_RATE,
+                    keepalive_s: float = DEFAULT_KEEPALIVE_S) -> List[UpstreamBackend]:
+    """Parse TTS_UPSTREAMS, e.g. "azure:eastus,azure:westeurope,elevenlabs".
+
+    An optional "=URL" suffix overrides the endpoint, which is how a local
+    fake streaming server is plugged in: "azure:local=http://127.0.0.1:9100"
+    (see benchmarks/stubs/tts_upstream.py). Order is preference order; the
+    second entry is the hedge target and later ones are only used on failover.
+    """
+    backends = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        target, _, base_url = entry.partition("=")
+        kind, _, region = target.partition(":")
+        if kind not in BACKENDS:
+            raise ValueError(f"Unknown TTS upstream backend: {kind}")
+        backends.append(BACKENDS[kind](region, base_url or None, pool_size, sample_rate, keepalive_s))
+    return backends
+
+
+class UpstreamPool:
+    """Warm, bounded connections to the cloud TTS backends with first-chunk hedging.
+
+    A request goes to the preferred backend first. If it has not produced its
+    first chunk within `hedge_deadline_ms`, the same request is sent to the
+    next backend and whichever answers first wins; the loser is cancelled.
+    A backend that fails before its first chunk is failed over to the next
+    one immediately. Once audio has been streamed there is no failover: the
+    error reaches the caller, since a restart elsewhere would repeat audio.
+
+    `initialize()` pre-opens every backend's connections and re-warms them
+    every `keepwarm_s`, ahead of the keep-alive expiry.
+    """
+
+    def __init__(self, backends: List[UpstreamBackend], hedge_deadline_ms: float = DEFAULT_HEDGE_DEADLINE_MS,
+                 keepwarm_s: float = DEFAULT_KEEPWARM_S):
+        if not backends:
+            raise ValueError("UpstreamPool needs at least one backend")
+        formats = {backend.output_format for backend in backends}
+        if len(formats) > 1:
+            raise ValueError(f"TTS upstreams disagree on output format: {formats}")
+        self.backends = backends
+        self.output_format = backends[0].output_format
+        self.hedge_deadline = hedge_deadline_ms / 1000.0
+        self.keepwarm_s = keepwarm_s
+        self._keepwarm_task: Optional[asyncio.Task] = None
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["UpstreamPool"]:
+        spec = os.getenv("TTS_UPSTREAMS", "")
+        if not spec:
+            return None
+        return cls(parse_upstreams(spec))
+
+    async def initialize(self):
+        await asyncio.gather(*(backend.warm_up() for backend in self.backends))
+        if self.keepwarm_s > 0:
+            self._keepwarm_task = asyncio.create_task(self._keep_warm())
+
+    async def _keep_warm(self):
+        while True:
+            await asyncio.sleep(self.keepwarm_s)
+            await asyncio.gather(*(backend.warm_up(log=False) for backend in self.backends))
+
+    async def close(self):
+        if self._keepwarm_task:
+            self._keepwarm_task.cancel()
+            await asyncio.gather(self._keepwarm_task, return_exceptions=True)
+        await asyncio.gather(*(backend.close() for backend in self.backends))
+
+    async def synthesize_streaming(self, text: str, lang: str, voice: Optional[str] = None) -> AsyncIterator[bytes]:
+        self.requests += 1
+        candidates = [backend.synthesize_streaming(text, lang, voice) for backend in self.backends]
+        pending = {}
+        hedged = False
+        winner = None
+        first = None
+        errors = []
+
+        def launch():
+            index = len(pending) + len(errors)
+            pending[asyncio.ensure_future(_first_chunk(candidates[index]))] = index
+
+        try:
+            launch()
+            hedge_at = asyncio.get_running_loop().time() + self.hedge_deadline
+            while winner is None:
+                started = len(pending) + len(errors)
+                if not pending:
+                    # Everything started so far failed before producing audio: fail over
+                    if started == len(candidates):
+                        break
+                    self.failovers += 1
+                    logger.info(f"Failing over to {self.backends[started].name}")
+                    launch()
+                    continue
+
+                can_hedge = not hedged and started < len(candidates)
+                timeout = max(0.0, hedge_at - asyncio.get_running_loop().time()) if can_hedge else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    hedged = True
+                    self.hedges += 1
+                    logger.info(f"No first chunk from {self.backends[0].name} after "
+                                f"{self.hedge_deadline * 1000:.0f}ms, hedging to {self.backends[started].name}")
+                    launch()
+                    continue
+
+                for task in done:
+                    index = pending.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        logger.warning(f"TTS upstream {self.backends[index].name} failed: {task.exception()}")
+                    elif winner is None:
+                        winner, first = index, task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            for index, candidate in enumerate(candidates):
+                if index != winner:
+                    await candidate.aclose()
+
+        if winner is None:
+            raise errors[-1] if errors else RuntimeError("No TTS upstream available")
+        if winner > 0 and hedged:
+            self.hedge_wins += 1
+
+        try:
+            if first is not None:
+                yield first
+                async for chunk in candidates[winner]:
+                    yield chunk
+        finally:
+            await candidates[winner].aclose()
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "output_format": self.output_format.as_dict(),
+            "backends": [backend.name for backend in self.backends],
+        }
+
+
+async def _first_chunk(stream: AsyncIterator[bytes]) -> Optional[bytes]:
+    """First chunk of `stream`, or None if it finished without producing audio."""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return None
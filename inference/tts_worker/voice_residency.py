@@ -0,0 +1,252 @@
+import os
+import time
+import hashlib
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from audio_format import source_format
+
+logger = logging.getLogger(__name__)
+
+# 0 disables eviction (every voice ever used stays resident)
+DEFAULT_MEMORY_BUDGET_MB = float(os.getenv("TTS_VOICE_MEMORY_BUDGET_MB", "2048"))
+DEFAULT_EMBEDDING_DIR = os.path.expanduser(os.getenv("TTS_VOICE_EMBEDDING_DIR", "~/.cache/lumatalk/voices"))
+# Per-voice counters are kept for this many recently used voices
+MAX_TRACKED_VOICES = int(os.getenv("TTS_VOICE_STATS_MAX", "1024"))
+
+
+def _sizeof(voice_model: Any) -> int:
+    """Best-effort resident size of a loaded voice (numpy/torch tensors, or an explicit size_bytes)."""
+    if hasattr(voice_model, "size_bytes"):
+        return int(voice_model.size_bytes)
+    if hasattr(voice_model, "nbytes"):
+        return int(voice_model.nbytes)
+    if hasattr(voice_model, "element_size") and hasattr(voice_model, "nelement"):
+        return int(voice_model.element_size() * voice_model.nelement())
+    if isinstance(voice_model, dict):
+        return sum(_sizeof(value) for value in voice_model.values())
+    return 0
+
+
+class _VoiceEntry:
+    def __init__(self, voice_model: Any, size: int):
+        self.voice_model = voice_model
+        self.size = size
+        self.pins = 0
+
+
+class _VoiceStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.loads = 0
+        self.load_seconds = 0.0
+        self.last_load_ms = 0.0
+        self.evictions = 0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "disk_hits": self.disk_hits,
+            "loads": self.loads,
+            "avg_load_ms": self.load_seconds * 1000 / self.loads if self.loads else 0.0,
+            "last_load_ms": self.last_load_ms,
+            "evictions": self.evictions,
+        }
+
+
+class VoiceResidencyManager:
+    """Keeps custom/cloned voice models resident within a memory budget.
+
+    Voices are evicted least-recently-used first once the budget is exceeded;
+    voices pinned by an in-progress synthesis are never evicted, and a voice
+    is pinned for its callers before the eviction that makes room for it.
+    Concurrent requests for a voice that is still loading share the same load. Speaker
+    embeddings (numpy arrays) are persisted to `embedding_dir` so a cold load
+    after eviction or restart is a file read instead of a recomputation.
+    Embedding files are named by a hash of the voice id and `model_version`,
+    so distinct ids never share a file and a model upgrade never reads
+    embeddings computed by the previous model.
+    """
+
+    def __init__(self, loader: Callable[[str], Any], memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB,
+                 embedding_dir: Optional[str] = DEFAULT_EMBEDDING_DIR, model_version: str = "",
+                 max_tracked_voices: int = MAX_TRACKED_VOICES):
+        self.loader = loader
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self.embedding_dir = Path(embedding_dir).expanduser() if embedding_dir else None
+        self.model_version = model_version
+        self.max_tracked_voices = max_tracked_voices
+        self._resident: "OrderedDict[str, _VoiceEntry]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Callers waiting on each load; _load pins the voice for all of them
+        self._waiting: Dict[str, int] = {}
+        self._stats: "OrderedDict[str, _VoiceStats]" = OrderedDict()
+        self._totals = _VoiceStats()
+        self.resident_bytes = 0
+
+        if self.embedding_dir:
+            self.embedding_dir.mkdir(parents=True, exist_ok=True)
+
+    @asynccontextmanager
+    async def use(self, voice_id: str) -> AsyncIterator[Any]:
+        """Pin a voice for the duration of a synthesis and yield the loaded model."""
+        entry = await self._acquire(voice_id)
+        try:
+            yield entry.voice_model
+        finally:
+            entry.pins -= 1
+            self._evict()
+
+    def _stats_for(self, voice_id: str) -> _VoiceStats:
+        """Counters for `voice_id`; the least recently used non-resident voices are forgotten."""
+        stats = self._stats.get(voice_id)
+        if stats is None:
+            stats = self._stats[voice_id] = _VoiceStats()
+        self._stats.move_to_end(voice_id)
+        for candidate in list(self._stats):
+            if len(self._stats) <= self.max_tracked_voices:
+                break
+            if candidate not in self._resident and candidate not in self._loading and candidate != voice_id:
+                del self._stats[candidate]
+        return stats
+
+    async def _acquire(self, voice_id: str) -> _VoiceEntry:
+        """The voice's entry, already pinned for this caller."""
+        stats = self._stats_for(voice_id)
+        entry = self._resident.get(voice_id)
+        if entry is not None:
+            stats.hits += 1
+            self._totals.hits += 1
+            self._resident.move_to_end(voice_id)
+            entry.pins += 1
+            return entry
+
+        stats.misses += 1
+        self._totals.misses += 1
+        future = self._loading.get(voice_id)
+        if future is None:
+            future = asyncio.ensure_future(self._load(voice_id, stats))
+            self._loading[voice_id] = future
+            future.add_done_callback(lambda _: self._loading.pop(voice_id, None))
+        self._waiting[voice_id] = self._waiting.get(voice_id, 0) + 1
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Give back this caller's pin, whether or not the load got to take it
+            if not future.done():
+                self._waiting[voice_id] -= 1
+            elif not future.cancelled() and future.exception() is None:
+                future.result().pins -= 1
+            raise
+
+    async def _load(self, voice_id: str, stats: _VoiceStats) -> _VoiceEntry:
+        started = time.perf_counter()
+        try:
+            voice_model, from_disk = await asyncio.get_running_loop().run_in_executor(
+                None, self._load_blocking, voice_id)
+        except BaseException:
+            self._waiting.pop(voice_id, None)
+            raise
+        elapsed = time.perf_counter() - started
+
+        for counters in (stats, self._totals):
+            counters.loads += 1
+            counters.disk_hits += from_disk
+            counters.load_seconds += elapsed
+            counters.last_load_ms = elapsed * 1000
+        logger.info(f"Loaded voice {voice_id} in {elapsed * 1000:.0f}ms")
+
+        entry = _VoiceEntry(voice_model, _sizeof(voice_model))
+        entry.pins = self._waiting.pop(voice_id, 0)
+        self._resident[voice_id] = entry
+        self.resident_bytes += entry.size
+        self._evict()
+        return entry
+
+    def _load_blocking(self, voice_id: str) -> Tuple[Any, bool]:
+        """(voice model, whether it came from the embedding cache); runs on an executor thread."""
+        path = self._embedding_path(voice_id)
+        if path is not None and path.exists():
+            return np.load(path), True
+
+        voice_model = self.loader(voice_id)
+        if path is not None and isinstance(voice_model, np.ndarray):
+            # Write-then-rename so a crash never leaves a truncated embedding behind
+            tmp_path = path.with_suffix(".tmp.npy")
+            np.save(tmp_path, voice_model)
+            os.replace(tmp_path, path)
+        return voice_model, False
+
+    def _embedding_path(self, voice_id: str) -> Optional[Path]:
+        if self.embedding_dir is None:
+            return None
+        digest = hashlib.sha256(f"{self.model_version}\0{voice_id}".encode("utf-8")).hexdigest()
+        return self.embedding_dir / f"{digest}.npy"
+
+    def _evict(self):
+        if self.memory_budget <= 0:
+            return
+        for voice_id in list(self._resident):
+            if self.resident_bytes <= self.memory_budget:
+                return
+            entry = self._resident[voice_id]
+            if entry.pins:
+                continue
+            del self._resident[voice_id]
+            self.resident_bytes -= entry.size
+            if voice_id in self._stats:
+                self._stats[voice_id].evictions += 1
+            self._totals.evictions += 1
+            logger.info(f"Evicted voice {voice_id} ({entry.size / 1024 / 1024:.1f}MB)")
+
+        if self.resident_bytes > self.memory_budget:
+            logger.warning(f"Voice memory budget exceeded by pinned voices "
+                           f"({self.resident_bytes / 1024 / 1024:.1f}MB resident)")
+
+    def stats(self) -> dict:
+        return {
+            "resident_voices": len(self._resident),
+            "resident_mb": self.resident_bytes / 1024 / 1024,
+            "budget_mb": self.memory_budget / 1024 / 1024,
+            "totals": self._totals.as_dict(),
+            "voices": {voice_id: stats.as_dict() for voice_id, stats in self._stats.items()},
+        }
+
+
+class ResidentVoiceSynthesizer:
+    """Synthesis source for a local engine that keeps the requested voice resident.
+
+    The engine provides `load_voice(voice_id)` to build a voice model or speaker
+    embedding and `synthesize_with_speaker(text, lang, speaker)` to stream audio
+    with it. Requests without a custom voice go straight to the engine.
+    """
+
+    def __init__(self, tts_service, residency: VoiceResidencyManager):
+        self.tts_service = tts_service
+        self.residency = residency
+        self.output_format = source_format(tts_service)
+
+    @staticmethod
+    def supports(tts_service) -> bool:
+        return hasattr(tts_service, "load_voice") and hasattr(tts_service, "synthesize_with_speaker")
+
+    async def synthesize_streaming(self, text: str, lang: str, voice: Optional[str] = None) -> AsyncIterator[bytes]:
+        if not voice:
+            async for chunk in self.tts_service.synthesize_streaming(text, lang, voice):
+                yield chunk
+            return
+
+        async with self.residency.use(voice) as speaker:
+            async for chunk in self.tts_service.synthesize_with_speaker(text, lang, speaker):
+                yield chunk